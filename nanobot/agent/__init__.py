@@ -1,8 +1,27 @@
 """Agent core module."""
 
-from nanobot.agent.loop import AgentLoop
-from nanobot.agent.context import ContextBuilder
-from nanobot.agent.memory import MemoryStore
-from nanobot.agent.skills import SkillsLoader
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from nanobot.agent.context import ContextBuilder
+    from nanobot.agent.loop import AgentLoop
+    from nanobot.agent.memory import MemoryStore
+    from nanobot.agent.skills import SkillsLoader
 
 __all__ = ["AgentLoop", "ContextBuilder", "MemoryStore", "SkillsLoader"]
+
+# Imported on first access so that tool worker processes, which only need
+# nanobot.agent.tools, do not pay for the provider stack (litellm) on start-up.
+_EXPORTS = {
+    "AgentLoop": "nanobot.agent.loop",
+    "ContextBuilder": "nanobot.agent.context",
+    "MemoryStore": "nanobot.agent.memory",
+    "SkillsLoader": "nanobot.agent.skills",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _EXPORTS:
+        return getattr(import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,95 @@
+"""In-turn compaction of tool results the model has already acted on."""
+
+from typing import Any
+
+from nanobot.agent.tools.spill import SpillStore
+from nanobot.utils.tokens import estimate_tokens, message_tokens
+
+COMPACTED_PREFIX = "[Compacted "
+
+
+class TurnCompactor:
+    """
+    Keeps one agent turn's prompt under a token budget.
+
+    Within a turn every iteration re-sends all earlier tool results, so long
+    turns cost roughly quadratic input tokens. Once the next prompt would
+    exceed the budget, tool results that precede the latest assistant message
+    (which the model has therefore already seen and acted on) are replaced,
+    oldest first, by a short extract plus a read_output handle for the full
+    text, and reasoning blocks of earlier assistant messages are dropped.
+    Messages are replaced, never removed, so every tool call keeps its result.
+    """
+
+    MIN_CHARS = 600  # results shorter than this are left alone
+    EXTRACT_LINES = 5
+    EXTRACT_CHARS = 400
+
+    def __init__(self, budget_tokens: int, fixed_tokens: int = 0, spill: SpillStore | None = None):
+        self.budget_tokens = budget_tokens
+        self.fixed_tokens = fixed_tokens  # e.g. tool definitions
+        self.spill = spill
+        self._sizes: dict[int, int] = {}  # id(message) -> tokens
+
+    def _size(self, msg: dict[str, Any]) -> int:
+        size = self._sizes.get(id(msg))
+        if size is None:
+            size = message_tokens(msg) + estimate_tokens(msg.get("reasoning_content") or "")
+            self._sizes[id(msg)] = size
+        return size
+
+    def prompt_tokens(self, messages: list[dict[str, Any]]) -> int:
+        """Estimated tokens of a prompt made of these messages."""
+        return self.fixed_tokens + sum(self._size(m) for m in messages)
+
+    def _stub(self, msg: dict[str, Any]) -> str:
+        content = msg["content"]
+        lines = content.splitlines()
+        extract = "\n".join(lines[:self.EXTRACT_LINES])[:self.EXTRACT_CHARS]
+        if self.spill is not None:
+            where = f'Full text: read_output(handle="{self.spill.put(content)}")'
+        else:
+            where = "Call the tool again if you need the full text"
+        return (
+            f"{COMPACTED_PREFIX}{msg.get('name', 'tool')} result, already used: "
+            f"{len(content)} chars, {len(lines)} lines. {where}. Beginning:]\n{extract}"
+        )
+
+    def compact(self, messages: list[dict[str, Any]], start: int = 0) -> list[tuple[str, int, int]]:
+        """
+        Compact ``messages[start:]`` in place until the prompt fits the budget.
+
+        Returns (section, tokens saved, chars saved) for each change, where
+        section is ``tool:<name>`` or ``reasoning``; empty if nothing changed.
+        """
+        total = self.prompt_tokens(messages)
+        if total <= self.budget_tokens:
+            return []
+        last_assistant = max(
+            (i for i in range(start, len(messages)) if messages[i].get("role") == "assistant"), default=-1,
+        )
+
+        saved: list[tuple[str, int, int]] = []
+        for i in range(start, last_assistant):
+            if total <= self.budget_tokens:
+                break
+            msg = messages[i]
+            if msg.get("role") == "assistant" and msg.get("reasoning_content"):
+                new = {k: v for k, v in msg.items() if k != "reasoning_content"}
+                section, chars = "reasoning", len(msg["reasoning_content"])
+            elif (msg.get("role") == "tool" and isinstance(msg.get("content"), str)
+                  and len(msg["content"]) >= self.MIN_CHARS
+                  and not msg["content"].startswith(COMPACTED_PREFIX)):
+                new = {**msg, "content": self._stub(msg)}
+                section, chars = f"tool:{msg.get('name', '')}", len(msg["content"]) - len(new["content"])
+            else:
+                continue
+            tokens = self._size(msg) - self._size(new)
+            if tokens <= 0:
+                self._sizes.pop(id(new), None)
+                continue
+            messages[i] = new
+            self._sizes.pop(id(msg), None)  # ids of freed dicts get reused
+            total -= tokens
+            saved.append((section, tokens, chars))
+        return saved
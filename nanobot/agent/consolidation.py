@@ -0,0 +1,333 @@
+"""Memory consolidation: folding old session messages into MEMORY.md and HISTORY.md."""
+
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import json_repair
+from loguru import logger
+
+from nanobot.agent.memory import MemoryStore
+from nanobot.providers.base import LLMProvider
+from nanobot.session.manager import Session
+from nanobot.utils.tokens import message_tokens
+
+SYSTEM_PROMPT = "You are a memory consolidation agent. Respond only with valid JSON."
+
+MEMORY_OPS_SPEC = """"memory_ops": A list of changes to long-term memory, one per fact, using the [id] numbers shown:
+   {"op": "add", "section": "Preferences", "fact": "..."} for a new fact (user location, preferences, personal info, project context, technical decisions),
+   {"op": "update", "id": 3, "fact": "..."} when a fact changed,
+   {"op": "delete", "id": 5} when a fact is no longer true,
+   {"op": "reinforce", "id": 2} when the conversation confirms or uses a fact.
+   Do not repeat unchanged facts. Use [] if nothing changed."""
+
+
+class ConsolidationSupervisor:
+    """
+    Runs memory consolidation in the background, one job per session at most.
+
+    Triggering a session that already has a job running marks it pending,
+    and the job runs once more when the current run finishes, however many
+    triggers arrived. At most ``max_concurrent`` jobs run at once across all
+    sessions. Sessions with an unfinished job are recorded in ``state_path``
+    so that ``resume`` can restart them after the process was interrupted.
+    """
+
+    DRAIN_TIMEOUT = 120.0
+
+    def __init__(
+        self,
+        run: Callable[[str], Awaitable[None]],
+        state_path: Path,
+        max_concurrent: int = 1,
+    ):
+        self._run = run  # consolidates one session, by key
+        self.state_path = state_path
+        self.max_concurrent = max(max_concurrent, 1)
+        self._semaphore: asyncio.Semaphore | None = None
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._pending: set[str] = set()
+        self._interrupted: set[str] = set()  # cancelled jobs, kept in the state file
+        self._resumed = False
+
+    def trigger(self, key: str) -> None:
+        """Request consolidation of a session; coalesced with a running job."""
+        if key in self._tasks:
+            self._pending.add(key)
+            return
+        self._interrupted.discard(key)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._tasks[key] = asyncio.create_task(self._job(key))
+        self._save_state()
+
+    def resume(self) -> None:
+        """Restart jobs recorded as unfinished by an earlier process (once)."""
+        if self._resumed:
+            return
+        self._resumed = True
+        for key in self._load_state():
+            logger.info(f"Resuming interrupted memory consolidation for {key}")
+            self.trigger(key)
+
+    @property
+    def active(self) -> list[str]:
+        """Sessions with a running or queued job."""
+        return sorted(self._tasks)
+
+    async def _job(self, key: str) -> None:
+        try:
+            while True:
+                self._pending.discard(key)
+                async with self._semaphore:
+                    try:
+                        await self._run(key)
+                    except Exception as e:
+                        logger.error(f"Memory consolidation for {key} failed: {e}")
+                if key not in self._pending:
+                    break
+            del self._tasks[key]
+            self._save_state()
+        except asyncio.CancelledError:
+            self._tasks.pop(key, None)
+            self._interrupted.add(key)
+            raise
+
+    async def drain(self, timeout: float | None = None) -> None:
+        """Wait for running and pending jobs; cancel what is left after ``timeout``."""
+        timeout = self.DRAIN_TIMEOUT if timeout is None else timeout
+        tasks = list(self._tasks.values())
+        if not tasks:
+            return
+        logger.info(f"Waiting for {len(tasks)} memory consolidation job(s)")
+        _, unfinished = await asyncio.wait(tasks, timeout=timeout)
+        for task in unfinished:
+            task.cancel()
+        if unfinished:
+            logger.warning(f"{len(unfinished)} memory consolidation job(s) interrupted; they resume on next start")
+            await asyncio.gather(*unfinished, return_exceptions=True)
+
+    def _load_state(self) -> list[str]:
+        try:
+            data = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return []
+        return [key for key in data.get("sessions", []) if isinstance(key, str)]
+
+    def _save_state(self) -> None:
+        keys = sorted(set(self._tasks) | self._interrupted)
+        try:
+            if keys:
+                self.state_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.state_path.with_suffix(".tmp")
+                tmp.write_text(json.dumps({"sessions": keys}), encoding="utf-8")
+                tmp.replace(self.state_path)
+            else:
+                self.state_path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.debug(f"Could not save consolidation state: {e}")
+
+
+class MemoryConsolidator:
+    """
+    Summarizes a range of session messages into the two memory files.
+
+    A backlog that fits in one chunk of ``chunk_tokens`` takes a single LLM
+    call. Larger backlogs are split into chunks that are summarized
+    concurrently (map), then merged with the current memory in one final
+    call (reduce). Chunk results are staged in the session metadata and
+    ``last_consolidated`` advances as each leading chunk completes, so an
+    interrupted run keeps its progress and the next run picks it up.
+    """
+
+    MAP_CONCURRENCY = 4
+    STAGE_KEY = "consolidation_staged"
+    PROMPT_FACTS = 80  # existing facts shown to the model, most relevant first
+
+    def __init__(self, provider: LLMProvider, model: str, memory: MemoryStore, chunk_tokens: int):
+        self.provider = provider
+        self.model = model
+        self.memory = memory
+        self.chunk_tokens = max(chunk_tokens, 1)
+
+    async def consolidate(
+        self, session: Session, start: int, end: int, save: Callable[[Session], None],
+    ) -> bool:
+        """
+        Consolidate ``session.messages[start:end]``.
+
+        Args:
+            save: Persists the session after each advance of last_consolidated.
+
+        Returns:
+            True if the memory files were updated.
+        """
+        chunks = self._chunk(session.messages, start, end)
+        staged = session.metadata.get(self.STAGE_KEY)
+        if len(chunks) == 1 and not staged:
+            return await self._consolidate_once(session, *chunks[0])
+
+        staged = staged or {"summaries": [], "facts": []}
+        logger.info(f"Memory consolidation: {end - start} messages in {len(chunks)} chunks")
+        semaphore = asyncio.Semaphore(self.MAP_CONCURRENCY)
+        results: list[dict[str, Any] | None] = [None] * len(chunks)
+        done = [False] * len(chunks)
+        next_chunk = 0
+
+        async def map_chunk(i: int) -> None:
+            nonlocal next_chunk
+            async with semaphore:
+                results[i] = await self._summarize_chunk(session.messages[chunks[i][0]:chunks[i][1]])
+            done[i] = True
+            # Stage the completed prefix in order; a failed chunk blocks everything after it
+            advanced = False
+            while next_chunk < len(chunks) and done[next_chunk] and results[next_chunk] is not None:
+                result = results[next_chunk]
+                staged["summaries"].append(result["summary"])
+                staged["facts"].extend(result["facts"])
+                session.last_consolidated = chunks[next_chunk][1]
+                next_chunk += 1
+                advanced = True
+            if advanced:
+                session.metadata[self.STAGE_KEY] = staged
+                save(session)
+
+        await asyncio.gather(*(map_chunk(i) for i in range(len(chunks))))
+        if next_chunk < len(chunks):
+            logger.warning(f"Memory consolidation: {len(chunks) - next_chunk} chunks left for the next run")
+        if not staged["summaries"]:
+            return False
+        return await self._reduce(session, staged, save)
+
+    def _chunk(self, messages: list[dict[str, Any]], start: int, end: int) -> list[tuple[int, int]]:
+        """Split [start, end) into consecutive ranges of about chunk_tokens each."""
+        chunks: list[tuple[int, int]] = []
+        chunk_start, size = start, 0
+        for i in range(start, end):
+            tokens = messages[i].get("tokens") or message_tokens(messages[i])
+            if size and size + tokens > self.chunk_tokens:
+                chunks.append((chunk_start, i))
+                chunk_start, size = i, 0
+            size += tokens
+        if chunk_start < end:
+            chunks.append((chunk_start, end))
+        return chunks
+
+    @staticmethod
+    def _format(messages: list[dict[str, Any]]) -> str:
+        lines = []
+        for m in messages:
+            if not m.get("content"):
+                continue
+            tools = f" [tools: {', '.join(m['tools_used'])}]" if m.get("tools_used") else ""
+            lines.append(f"[{m.get('timestamp', '?')[:16]}] {m['role'].upper()}{tools}: {m['content']}")
+        return "\n".join(lines)
+
+    async def _call_json(self, prompt: str) -> dict[str, Any] | None:
+        response = await self.provider.chat(
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            model=self.model,
+        )
+        text = (response.content or "").strip()
+        if not text:
+            logger.warning("Memory consolidation: LLM returned empty response")
+            return None
+        if text.startswith("```"):
+            text = text.split("\n", 1)[-1].rsplit("```", 1)[0].strip()
+        result = json_repair.loads(text)
+        if not isinstance(result, dict):
+            logger.warning("Memory consolidation: unexpected response type")
+            return None
+        return result
+
+    def _current_memory(self, query: str) -> tuple[str, dict[int, str]]:
+        """Facts for the prompt, and the id -> text map the model's ops refer to."""
+        facts = self.memory.facts()
+        text = self.memory.format_facts(query, limit=self.PROMPT_FACTS, facts=facts)
+        return text, {fact_id: fact for fact_id, _, fact in facts}
+
+    def _write(self, result: dict[str, Any], ids: dict[int, str]) -> None:
+        if entry := result.get("history_entry"):
+            self.memory.append_history(entry)
+        ops = result.get("memory_ops")
+        if isinstance(ops, list) and ops:
+            counts = self.memory.apply_ops(ops, ids=ids)
+            logger.info(f"Memory updated: {', '.join(f'{k} {v}' for k, v in counts.items() if v)}")
+
+    async def _consolidate_once(self, session: Session, start: int, end: int) -> bool:
+        conversation = self._format(session.messages[start:end])
+        current_memory, ids = self._current_memory(conversation)
+        prompt = f"""You are a memory consolidation agent. Process this conversation and return a JSON object with exactly two keys:
+
+1. "history_entry": A paragraph (2-5 sentences) summarizing the key events. Start with a timestamp like [YYYY-MM-DD HH:MM].
+
+2. {MEMORY_OPS_SPEC}
+
+## Current Long-term Memory
+{current_memory or "(empty)"}
+
+## Conversation to Process
+{conversation}
+
+Respond with ONLY valid JSON, no markdown fences."""
+        result = await self._call_json(prompt)
+        if result is None:
+            return False
+        self._write(result, ids)
+        session.last_consolidated = end
+        return True
+
+    async def _summarize_chunk(self, messages: list[dict[str, Any]]) -> dict[str, Any] | None:
+        prompt = f"""You are a memory consolidation agent. Process this part of a longer conversation and return a JSON object with exactly two keys:
+
+1. "summary": 1-3 sentences on the key events in this part. Start with a timestamp like [YYYY-MM-DD HH:MM].
+
+2. "facts": A list of short facts worth keeping in long-term memory: user location, preferences, personal info, project context, technical decisions. Use [] if there are none.
+
+## Conversation Part
+{self._format(messages)}
+
+Respond with ONLY valid JSON, no markdown fences."""
+        try:
+            result = await self._call_json(prompt)
+        except Exception as e:
+            logger.error(f"Memory consolidation chunk failed: {e}")
+            return None
+        if result is None or not result.get("summary"):
+            return None
+        facts = result.get("facts") or []
+        if not isinstance(facts, list):
+            facts = [facts]
+        return {"summary": str(result["summary"]), "facts": [str(f) for f in facts]}
+
+    async def _reduce(self, session: Session, staged: dict[str, Any], save: Callable[[Session], None]) -> bool:
+        summaries = "\n".join(f"- {s}" for s in staged["summaries"])
+        facts = "\n".join(f"- {f}" for f in staged["facts"]) or "(none)"
+        current_memory, ids = self._current_memory(f"{summaries}\n{facts}")
+        prompt = f"""You are a memory consolidation agent. A long conversation was summarized in parts. Merge the parts and return a JSON object with exactly two keys:
+
+1. "history_entry": A paragraph (2-5 sentences) summarizing the key events across all parts. Start with the timestamp of the first part, like [YYYY-MM-DD HH:MM].
+
+2. {MEMORY_OPS_SPEC} Merge the new facts below into it.
+
+## Current Long-term Memory
+{current_memory or "(empty)"}
+
+## Part Summaries (oldest first)
+{summaries}
+
+## New Facts
+{facts}
+
+Respond with ONLY valid JSON, no markdown fences."""
+        result = await self._call_json(prompt)
+        if result is None:
+            return False
+        self._write(result, ids)
+        session.metadata.pop(self.STAGE_KEY, None)
+        save(session)
+        return True
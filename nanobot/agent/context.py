@@ -1,10 +1,23 @@
 """Context builder for assembling agent prompts."""
 
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
 from nanobot.agent.memory import MemoryStore
 from nanobot.agent.skills import SkillsLoader
+from nanobot.agent.stats import PromptStats
+from nanobot.utils.tokens import estimate_tokens, message_tokens
+
+
+@dataclass
+class TurnContext:
+    """The parts of one turn's prompt that do not depend on history (see ContextBuilder.prepare)."""
+
+    system_parts: list[list[tuple[str, str]]]
+    system_prompt: str
+    skill_parts: list[tuple[str, str]]  # (name, text) sent with the current message
+    relevant_memory: str
 
 
 class ContextBuilder:
@@ -16,9 +29,18 @@ class ContextBuilder:
     """
     
     BOOTSTRAP_FILES = ["AGENTS.md", "SOUL.md", "USER.md", "TOOLS.md", "IDENTITY.md"]
+    # Share of the context window kept free to absorb tokenizer differences between models
+    HEADROOM = 0.05
+    # Per-turn skill selection: bodies of the best matches are inlined, and
+    # with more than SUMMARY_ALL_MAX skills the summary lists only matches
+    INLINE_SKILLS = 2
+    SKILL_MIN_SCORE = 0.5
+    SUMMARY_ALL_MAX = 12
+    SUMMARY_MAX = 8
     
-    def __init__(self, workspace: Path):
+    def __init__(self, workspace: Path, memory_budget: int = 0):
         self.workspace = workspace
+        self.memory_budget = memory_budget  # tokens of MEMORY.md above which entries are retrieved; 0 = all
         self.memory = MemoryStore(workspace)
         self.skills = SkillsLoader(workspace)
     
@@ -26,26 +48,53 @@ class ContextBuilder:
         """
         Build the system prompt from bootstrap files, memory, and skills.
         
+        Parts are ordered from least to most volatile so that providers can
+        cache the prompt prefix: identity, bootstrap files and skills rarely
+        change, memory changes on consolidation. Nothing that changes per
+        turn is part of the system prompt: the current time, retrieved
+        memory and the skills selected for the turn are sent with the
+        current message (see build_messages).
+        
         Args:
-            skill_names: Optional list of skills to include.
+            skill_names: Skills relevant to this turn (see select_skills).
+                Only whether it is given matters here: with per-turn
+                selection, a long skill list is left out of the system
+                prompt and the matching skills are listed with the message.
         
         Returns:
             Complete system prompt.
         """
-        parts = []
+        return self._join_parts(self._system_parts(skill_names))
+    
+    @staticmethod
+    def _join_parts(parts: list[list[tuple[str, str]]]) -> str:
+        return "\n\n---\n\n".join("\n\n".join(text for _, text in part) for part in parts)
+    
+    def select_skills(self, message: str) -> list[str]:
+        """Skills lexically relevant to a user message, best first."""
+        ranked = self.skills.rank_skills(message, min_score=self.SKILL_MIN_SCORE)
+        return [name for name, _ in ranked[:self.SUMMARY_MAX]]
+    
+    def _trim_summary(self, skill_names: list[str] | None) -> bool:
+        """Whether the skills summary lists only the skills selected per turn."""
+        if skill_names is None:
+            return False
+        return len(self.skills.list_skills(filter_unavailable=False)) > self.SUMMARY_ALL_MAX
+    
+    def _system_parts(self, skill_names: list[str] | None = None) -> list[list[tuple[str, str]]]:
+        """
+        Named pieces of the system prompt, grouped into the parts that are
+        separated by horizontal rules. Names are used for size accounting.
+        """
+        parts: list[list[tuple[str, str]]] = []
         
         # Core identity
-        parts.append(self._get_identity())
+        parts.append([("identity", self._get_identity())])
         
         # Bootstrap files
-        bootstrap = self._load_bootstrap_files()
+        bootstrap = self._load_bootstrap_parts()
         if bootstrap:
-            parts.append(bootstrap)
-        
-        # Memory context
-        memory = self.memory.get_memory_context()
-        if memory:
-            parts.append(f"# Memory\n\n{memory}")
+            parts.append([(f"bootstrap:{filename}", text) for filename, text in bootstrap])
         
         # Skills - progressive loading
         # 1. Always-loaded skills: include full content
@@ -53,26 +102,54 @@ class ContextBuilder:
         if always_skills:
             always_content = self.skills.load_skills_for_context(always_skills)
             if always_content:
-                parts.append(f"# Active Skills\n\n{always_content}")
+                parts.append([("always_skills", f"# Active Skills\n\n{always_content}")])
         
         # 2. Available skills: only show summary (agent uses read_file to load)
-        skills_summary = self.skills.build_skills_summary()
-        if skills_summary:
-            parts.append(f"""# Skills
+        if self._trim_summary(skill_names):
+            note = ("The skills that match the current message are listed with it. "
+                    f"Others are in {self.workspace}/skills and the builtin skills directory.")
+            parts.append([("skills_summary", self._skills_summary_section("", note))])
+        else:
+            skills_summary = self.skills.build_skills_summary()
+            if skills_summary:
+                parts.append([("skills_summary", self._skills_summary_section(skills_summary))])
+        
+        # Memory context: it changes more often than anything above
+        memory = self.memory.get_memory_context(self.memory_budget)
+        if memory:
+            parts.append([("memory", f"# Memory\n\n{memory}")])
+        
+        return parts
+    
+    def _turn_skill_parts(self, skill_names: list[str] | None) -> list[tuple[str, str]]:
+        """Named pieces sent with the current message for the skills selected this turn."""
+        if not skill_names:
+            return []
+        parts = []
+        always = set(self.skills.get_always_skills())
+        available = {s["name"] for s in self.skills.list_skills(filter_unavailable=True)}
+        inline = [n for n in skill_names if n in available and n not in always][:self.INLINE_SKILLS]
+        inline_content = self.skills.load_skills_for_context(inline)
+        if inline_content:
+            parts.append(("selected_skills", "[Skills for this request, already loaded; "
+                          f"no need to read their SKILL.md]\n{inline_content}"))
+        if self._trim_summary(skill_names):
+            summary = self.skills.build_skills_summary(skill_names)
+            parts.append(("skills_summary", f"[Skills matching this message]\n{summary}"))
+        return parts
+    
+    @staticmethod
+    def _skills_summary_section(summary: str, note: str | None = None) -> str:
+        header = """# Skills
 
 The following skills extend your capabilities. To use a skill, read its SKILL.md file using the read_file tool.
-Skills with available="false" need dependencies installed first - you can try installing them with apt/brew.
-
-{skills_summary}""")
-        
-        return "\n\n---\n\n".join(parts)
+Skills with available="false" need dependencies installed first - you can try installing them with apt/brew."""
+        if note:
+            header += f"\n{note}"
+        return f"{header}\n\n{summary}" if summary else header
     
     def _get_identity(self) -> str:
         """Get the core identity section."""
-        from datetime import datetime
-        import time as _time
-        now = datetime.now().strftime("%Y-%m-%d %H:%M (%A)")
-        tz = _time.strftime("%Z") or "UTC"
         workspace_path = str(self.workspace.expanduser().resolve())
 
         return f"""# nanobot 🐈
@@ -82,47 +159,137 @@ You are nanobot, a helpful AI assistant. You have access to tools that allow you
 - Execute shell commands
 - Search the web and fetch web pages
 
-## Current Time
-{now} ({tz})
-
 ## Workspace
 Your workspace is at: {workspace_path}
 - Long-term memory: {workspace_path}/memory/MEMORY.md
-- History log: {workspace_path}/memory/HISTORY.md (grep-searchable)
+- History log: {workspace_path}/memory/HISTORY.md (search it with search_history)
 - Custom skills: {workspace_path}/skills/{{skill-name}}/SKILL.md
 
 Always be helpful, accurate, and concise."""
     
-    def _load_bootstrap_files(self) -> str:
-        """Load all bootstrap files from workspace."""
+    @staticmethod
+    def _get_runtime_context() -> str:
+        """Per-turn facts (current time) that would break prompt caching in the system prompt."""
+        from datetime import datetime
+        import time as _time
+        now = datetime.now().strftime("%Y-%m-%d %H:%M (%A)")
+        tz = _time.strftime("%Z") or "UTC"
+        return f"[Current time: {now} ({tz})]"
+    
+    def _relevant_memory(self, memory_query: str | None) -> str:
+        """Memory entries retrieved for this turn, sent with the current message."""
+        relevant = self.memory.get_relevant_memory(memory_query or "", self.memory_budget)
+        return f"[Memory relevant to this conversation]\n{relevant}" if relevant else ""
+    
+    def _load_bootstrap_parts(self) -> list[tuple[str, str]]:
+        """Load bootstrap files from workspace as (filename, section text) pairs."""
         parts = []
         
         for filename in self.BOOTSTRAP_FILES:
             file_path = self.workspace / filename
             if file_path.exists():
                 content = file_path.read_text(encoding="utf-8")
-                parts.append(f"## {filename}\n\n{content}")
+                parts.append((filename, f"## {filename}\n\n{content}"))
         
-        return "\n\n".join(parts) if parts else ""
+        return parts
+    
+    def _load_bootstrap_files(self) -> str:
+        """Load all bootstrap files from workspace."""
+        return "\n\n".join(text for _, text in self._load_bootstrap_parts())
+    
+    def prepare(self, skill_names: list[str] | None = None, memory_query: str | None = None) -> TurnContext:
+        """
+        Build the history-independent parts of a turn's prompt once, for
+        both history_budget and build_messages.
+        
+        Args:
+            skill_names: Skills relevant to this turn (see select_skills).
+            memory_query: Text memory retrieval is ranked against.
+        """
+        parts = self._system_parts(skill_names)
+        return TurnContext(
+            system_parts=parts,
+            system_prompt=self._join_parts(parts),
+            skill_parts=self._turn_skill_parts(skill_names),
+            relevant_memory=self._relevant_memory(memory_query),
+        )
+    
+    def history_budget(
+        self,
+        context_window: int,
+        reserved_tokens: int,
+        current_message: str,
+        skill_names: list[str] | None = None,
+        memory_query: str | None = None,
+        turn: TurnContext | None = None,
+    ) -> int:
+        """
+        Tokens available for conversation history.
+        
+        Args:
+            context_window: Model input context size in tokens.
+            reserved_tokens: Tokens needed elsewhere (completion, tool definitions).
+            current_message: The incoming user message.
+            skill_names: Optional list of skills to include.
+            memory_query: Text memory retrieval is ranked against.
+            turn: Parts from ``prepare``; replaces skill_names and memory_query.
+        
+        Returns:
+            What is left after the system prompt, current message and reservation.
+        """
+        turn = turn or self.prepare(skill_names, memory_query)
+        fixed = estimate_tokens(turn.system_prompt)
+        fixed += sum(estimate_tokens(text) for _, text in turn.skill_parts)
+        fixed += estimate_tokens(turn.relevant_memory)
+        fixed += message_tokens({"role": "user", "content": current_message})
+        usable = int(context_window * (1 - self.HEADROOM))
+        return max(usable - reserved_tokens - fixed, 0)
     
     def build_messages(
         self,
         history: list[dict[str, Any]],
         current_message: str,
         skill_names: list[str] | None = None,
+        stats: PromptStats | None = None,
+        memory_query: str | None = None,
+        turn: TurnContext | None = None,
     ) -> list[dict[str, Any]]:
-        """Build the complete message list for an LLM call."""
+        """
+        Build the complete message list for an LLM call.
+        
+        If ``stats`` is given, the size of each system prompt section, the
+        history and the current message is recorded in it. ``turn`` (from
+        ``prepare``) replaces skill_names and memory_query.
+        """
         messages = []
+        turn = turn or self.prepare(skill_names, memory_query)
 
         # System prompt
-        system_prompt = self.build_system_prompt(skill_names)
-        messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "system", "content": turn.system_prompt})
 
         # History
         messages.extend(history)
 
-        # Current message
-        messages.append({"role": "user", "content": current_message})
+        # Current message, with the runtime context, the skills selected for
+        # this turn and retrieved memory in front of it. Only the raw message
+        # is saved to the session, so history stays byte-stable.
+        runtime = self._get_runtime_context()
+        relevant_memory = turn.relevant_memory
+        current = "\n\n".join(
+            p for p in (runtime, *(text for _, text in turn.skill_parts), relevant_memory, current_message) if p
+        )
+        messages.append({"role": "user", "content": current})
+
+        if stats is not None:
+            for part in turn.system_parts:
+                for name, text in part:
+                    stats.add(name, text)
+            stats.add_messages("history", history)
+            for name, text in turn.skill_parts:
+                stats.add(name, text)
+            if relevant_memory:
+                stats.add("relevant_memory", relevant_memory)
+            stats.add("current_message", f"{runtime}\n\n{current_message}")
 
         return messages
     
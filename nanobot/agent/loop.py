@@ -2,7 +2,6 @@
 
 import asyncio
 import json
-import json_repair
 from pathlib import Path
 import re
 from typing import Any, Awaitable, Callable
@@ -12,13 +11,25 @@ from loguru import logger
 from nanobot.bus.events import UserMessage, AssistantMessage
 from nanobot.bus.queue import MessageBus
 from nanobot.providers.base import LLMProvider
-from nanobot.agent.context import ContextBuilder
+from nanobot.agent.context import ContextBuilder, TurnContext
+from nanobot.agent.tools.base import compact_json
 from nanobot.agent.tools.registry import ToolRegistry
 from nanobot.agent.tools.filesystem import ReadFileTool, WriteFileTool, EditFileTool, ListDirTool
+from nanobot.agent.tools.search import GlobTool
+from nanobot.agent.tools.data import QueryDataTool
+from nanobot.agent.tools.history import SearchHistoryTool
+from nanobot.agent.tools.spill import SpillStore, ReadOutputTool
+from nanobot.agent.tools.plugin import PluginWorker, load_plugin_tools
+from nanobot.agent.tools.tmux import TmuxTool
 from nanobot.agent.tools.shell import ExecTool
 from nanobot.agent.tools.web import WebSearchTool, WebFetchTool
 from nanobot.agent.memory import MemoryStore
+from nanobot.agent.compaction import TurnCompactor
+from nanobot.agent.consolidation import ConsolidationSupervisor, MemoryConsolidator
+from nanobot.agent.rollup import HistoryRollup
+from nanobot.agent.stats import PromptStats, PromptStatsLog
 from nanobot.session.manager import SessionManager
+from nanobot.utils.tokens import context_window as get_context_window, estimate_tokens
 
 
 class AgentLoop:
@@ -43,12 +54,23 @@ class AgentLoop:
         temperature: float = 0.7,
         max_tokens: int = 4096,
         memory_window: int = 50,
+        context_window: int = 0,
+        turn_budget: int = 0,
+        full_turns: int = 4,
+        consolidation_concurrency: int = 1,
+        memory_max_chars: int = 32000,
+        memory_budget: int = 0,
+        history_recent_days: int = 7,
         brave_api_key: str | None = None,
         exec_config: "ExecToolConfig | None" = None,
         restrict_to_workspace: bool = False,
         session_manager: SessionManager | None = None,
+        spill_config: "SpillConfig | None" = None,
+        process_pool_config: "ProcessPoolConfig | None" = None,
+        plugin_configs: "list[PluginConfig] | None" = None,
+        tool_policy: "ToolPolicyConfig | None" = None,
     ):
-        from nanobot.config.schema import ExecToolConfig
+        from nanobot.config.schema import ExecToolConfig, ProcessPoolConfig, SpillConfig, ToolPolicyConfig
         self.bus = bus
         self.provider = provider
         self.workspace = workspace
@@ -57,15 +79,53 @@ class AgentLoop:
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.memory_window = memory_window
+        self.memory_max_chars = memory_max_chars
+        if memory_budget and memory_max_chars and memory_max_chars // 4 <= memory_budget:
+            # MEMORY.md (~4 chars per token) never outgrows the budget, so retrieval never runs
+            logger.warning(f"memory_budget ({memory_budget} tokens) is not below memory_max_chars "
+                           f"({memory_max_chars} chars, ~{memory_max_chars // 4} tokens); memory is always sent whole")
+        self.context_window = context_window or get_context_window(self.model)
+        # Prompt size within a turn above which consumed tool results are compacted
+        self.turn_budget = min(
+            turn_budget or self.context_window // 2,
+            max(self.context_window - self.max_tokens, 0),
+        )
+        self.full_turns = full_turns
         self.brave_api_key = brave_api_key
         self.exec_config = exec_config or ExecToolConfig()
         self.restrict_to_workspace = restrict_to_workspace
-
-        self.context = ContextBuilder(workspace)
-        self.sessions = session_manager or SessionManager(workspace)
-        self.tools = ToolRegistry()
+        self.spill_config = spill_config or SpillConfig()
+        self.process_pool_config = process_pool_config or ProcessPoolConfig()
+        self.plugin_configs = plugin_configs or []
+        self.tool_policy = tool_policy or ToolPolicyConfig()
+
+        self.context = ContextBuilder(workspace, memory_budget=memory_budget)
+        self.sessions = session_manager or SessionManager(workspace, tail_messages=memory_window)
+        self.tools = ToolRegistry(
+            max_workers=self.process_pool_config.max_workers or None,
+            process_timeout=self.process_pool_config.timeout,
+            max_process_arg_bytes=self.process_pool_config.max_arg_mb * 1024 * 1024,
+            disabled=self.tool_policy.disabled,
+        )
+        self.spill = SpillStore(
+            workspace / "outputs",
+            threshold=self.spill_config.threshold,
+            max_bytes=self.spill_config.max_store_mb * 1024 * 1024,
+        )
         self._running = False
+        self._plugin_workers: list[PluginWorker] = []
+        self._tool_defs_size: tuple[int, int, int] = (0, 0, 0)  # (id of definitions list, tokens, chars)
+        self.prompt_stats_log = PromptStatsLog(workspace)
+        self.consolidation = ConsolidationSupervisor(
+            self._consolidate_session,
+            workspace / "sessions" / "consolidation_jobs.json",
+            max_concurrent=consolidation_concurrency,
+        )
+        self.history_rollup = HistoryRollup(
+            provider, self.model, MemoryStore(workspace), recent_days=history_recent_days,
+        )
         self._register_default_tools()
+        self._register_plugin_tools()
 
     def _register_default_tools(self) -> None:
         """Register the default set of tools."""
@@ -74,15 +134,77 @@ class AgentLoop:
         self.tools.register(WriteFileTool(allowed_dir=allowed_dir))
         self.tools.register(EditFileTool(allowed_dir=allowed_dir))
         self.tools.register(ListDirTool(allowed_dir=allowed_dir))
+        self.tools.register(GlobTool(workspace=self.workspace, allowed_dir=allowed_dir))
+        self.tools.register(QueryDataTool(allowed_dir=allowed_dir))
+        self.tools.register(SearchHistoryTool(workspace=self.workspace))
 
-        self.tools.register(ExecTool(
+        exec_tool = ExecTool(
             working_dir=str(self.workspace),
             timeout=self.exec_config.timeout,
             restrict_to_workspace=self.restrict_to_workspace,
-        ))
+            spill=self.spill,
+        )
+        self.tools.register(exec_tool)
 
         self.tools.register(WebSearchTool(api_key=self.brave_api_key))
-        self.tools.register(WebFetchTool())
+        self.tools.register(WebFetchTool(spill=self.spill))
+        self.tools.register(ReadOutputTool(self.spill))
+        self.tools.register(TmuxTool(guard=exec_tool.check_command))
+
+    def _register_plugin_tools(self) -> None:
+        """Register tools served by plugin workers from config and skill metadata."""
+        # Config plugins run from the workspace unless they set a cwd (relative to it)
+        specs = [(p.model_dump(), self.workspace) for p in self.plugin_configs]
+        specs += self.context.skills.get_plugins()
+        for spec, base_dir in specs:
+            try:
+                tools = load_plugin_tools(spec, base_dir)
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Skipping plugin {spec.get('name')!r}: {e}")
+                continue
+            self._plugin_workers.append(tools[0].worker)
+            for tool in tools:
+                if self.tools.has(tool.name):
+                    logger.warning(f"Plugin tool {tool.name} conflicts with an existing tool; skipped")
+                    continue
+                self.tools.register(tool)
+
+    def _tool_definitions_size(self, tool_names: list[str] | None = None) -> tuple[int, int]:
+        """(tokens, chars) of the serialized tool definitions, recomputed only when they change."""
+        definitions = self.tools.get_definitions(tool_names)
+        if self._tool_defs_size[0] != id(definitions):
+            text = json.dumps(definitions)
+            self._tool_defs_size = (id(definitions), estimate_tokens(text), len(text))
+        return self._tool_defs_size[1], self._tool_defs_size[2]
+
+    def _history_budget(self, content: str, turn: TurnContext, tool_names: list[str] | None = None) -> int:
+        """Token budget for session history in the next prompt."""
+        reserved = self.max_tokens + self._tool_definitions_size(tool_names)[0]
+        return self.context.history_budget(self.context_window, reserved, content, turn=turn)
+
+    @staticmethod
+    def _memory_query(session, content: str, recent_turns: int = 2) -> str:
+        """Text that memory retrieval is ranked against: the new message and the last few user messages."""
+        recent = [m["content"] for m in session.messages[-2 * recent_turns:]
+                  if m["role"] == "user" and isinstance(m.get("content"), str)]
+        return "\n".join([*recent, content])
+
+    async def close(self) -> None:
+        """Finish background consolidation, then release tool resources (process pool, plugin workers)."""
+        await self.consolidation.drain()
+        self.tools.close()
+        await asyncio.gather(*(worker.close() for worker in self._plugin_workers))
+
+    def close_now(self) -> None:
+        """
+        Release tool resources without awaiting, e.g. from a signal handler.
+
+        Background consolidation is not waited for; interrupted jobs resume
+        on the next start.
+        """
+        self.tools.close()
+        for worker in self._plugin_workers:
+            worker.kill()
 
     @staticmethod
     def _strip_think(text: str | None) -> str | None:
@@ -105,23 +227,44 @@ class AgentLoop:
         self,
         initial_messages: list[dict],
         on_progress: Callable[[str], Awaitable[None]] | None = None,
+        stats: PromptStats | None = None,
+        tool_names: list[str] | None = None,
     ) -> tuple[str | None, list[str]]:
-        """Run the agent iteration loop."""
+        """
+        Run the agent iteration loop, logging prompt section sizes per call if
+        ``stats`` is given. ``tool_names`` limits the tools offered (None = all).
+        """
         messages = initial_messages
         iteration = 0
         final_content = None
         tools_used: list[str] = []
+        compactor = TurnCompactor(
+            self.turn_budget, fixed_tokens=self._tool_definitions_size(tool_names)[0], spill=self.spill,
+        )
+        turn_start = len(initial_messages)
 
         while iteration < self.max_iterations:
             iteration += 1
 
+            if iteration > 1:
+                saved = compactor.compact(messages, start=turn_start)
+                if saved:
+                    logger.debug(f"Compacted {len(saved)} messages, saving {sum(t for _, t, _ in saved)} tokens")
+                    # Same-turn repeats must not refer back to a result that is now a stub
+                    self.tools.begin_turn()
+                    if stats is not None:
+                        for section, tokens, chars in saved:
+                            stats.add(section, tokens=-tokens, chars=-chars)
+
             response = await self.provider.chat(
                 messages=messages,
-                tools=self.tools.get_definitions(),
+                tools=self.tools.get_definitions(tool_names),
                 model=self.model,
                 temperature=self.temperature,
                 max_tokens=self.max_tokens,
             )
+            if stats is not None:
+                self.prompt_stats_log.append(stats.snapshot(iteration, response.usage))
 
             if response.has_tool_calls:
                 if on_progress:
@@ -134,7 +277,7 @@ class AgentLoop:
                         "type": "function",
                         "function": {
                             "name": tc.name,
-                            "arguments": json.dumps(tc.arguments)
+                            "arguments": compact_json(tc.arguments)
                         }
                     }
                     for tc in response.tool_calls
@@ -143,6 +286,8 @@ class AgentLoop:
                     messages, response.content, tool_call_dicts,
                     reasoning_content=response.reasoning_content,
                 )
+                if stats is not None:
+                    stats.add_messages("assistant", messages[-1:])
 
                 for tool_call in response.tool_calls:
                     tools_used.append(tool_call.name)
@@ -152,6 +297,8 @@ class AgentLoop:
                     messages = self.context.add_tool_result(
                         messages, tool_call.id, tool_call.name, result
                     )
+                    if stats is not None:
+                        stats.add(f"tool:{tool_call.name}", result)
             else:
                 final_content = self._strip_think(response.content)
                 break
@@ -166,16 +313,33 @@ class AgentLoop:
     ) -> str:
         """Process a message directly (for CLI usage)."""
         session = self.sessions.get_or_create(session_key)
+        self.tools.begin_turn()
+        self.tools.refresh_availability()
 
-        if len(session.messages) > self.memory_window:
-            asyncio.create_task(self._consolidate_memory(session))
+        self.consolidation.resume()
+        if len(session.messages) - session.last_consolidated > self.memory_window:
+            self.consolidation.trigger(session.key)
 
+        stats = PromptStats(session_key, self.model)
+        skill_names = self.context.select_skills(content)
+        tool_names = self.tools.select(content, self.tool_policy.max_tools, self.tool_policy.core)
+        turn = self.context.prepare(skill_names, self._memory_query(session, content))
         initial_messages = self.context.build_messages(
-            history=session.get_history(max_messages=self.memory_window),
+            history=session.get_history(
+                max_messages=self.memory_window,
+                max_tokens=self._history_budget(content, turn, tool_names),
+                keep_turns=self.full_turns,
+            ),
             current_message=content,
+            stats=stats,
+            turn=turn,
         )
+        tokens, chars = self._tool_definitions_size(tool_names)
+        stats.add("tool_definitions", tokens=tokens, chars=chars)
 
-        final_content, tools_used = await self._run_agent_loop(initial_messages, on_progress=on_progress)
+        final_content, tools_used = await self._run_agent_loop(
+            initial_messages, on_progress=on_progress, stats=stats, tool_names=tool_names,
+        )
 
         if final_content is None:
             final_content = "I've completed processing but have no response to give."
@@ -186,13 +350,20 @@ class AgentLoop:
 
         return final_content
 
+    async def _consolidate_session(self, key: str) -> None:
+        """Consolidation job run by the supervisor: consolidate, persist the new offset, roll up HISTORY.md."""
+        session = self.sessions.get_or_create(key)
+        if len(session.messages) - session.last_consolidated <= self.memory_window:
+            return
+        await self._consolidate_memory(session)
+        self.sessions.save(session)
+        if self.history_rollup.due():
+            await self.history_rollup.run()
+
     async def _consolidate_memory(self, session, archive_all: bool = False) -> None:
         """Consolidate old messages into MEMORY.md + HISTORY.md."""
-        memory = MemoryStore(self.workspace)
-
         if archive_all:
-            old_messages = session.messages
-            keep_count = 0
+            start, end = 0, len(session.messages)
             logger.info(f"Memory consolidation (archive_all): {len(session.messages)} total messages archived")
         else:
             keep_count = self.memory_window // 2
@@ -203,63 +374,20 @@ class AgentLoop:
             if messages_to_process <= 0:
                 return
 
-            old_messages = session.messages[session.last_consolidated:-keep_count]
-            if not old_messages:
+            # Messages added while the LLM calls run are not part of this batch
+            start, end = session.last_consolidated, len(session.messages) - keep_count
+            if start >= end:
                 return
-            logger.info(f"Memory consolidation: {len(old_messages)} new messages to consolidate")
-
-        lines = []
-        for m in old_messages:
-            if not m.get("content"):
-                continue
-            tools = f" [tools: {', '.join(m['tools_used'])}]" if m.get("tools_used") else ""
-            lines.append(f"[{m.get('timestamp', '?')[:16]}] {m['role'].upper()}{tools}: {m['content']}")
-        conversation = "\n".join(lines)
-        current_memory = memory.read_long_term()
-
-        prompt = f"""You are a memory consolidation agent. Process this conversation and return a JSON object with exactly two keys:
-
-1. "history_entry": A paragraph (2-5 sentences) summarizing the key events. Start with a timestamp like [YYYY-MM-DD HH:MM].
-
-2. "memory_update": The updated long-term memory content. Add any new facts: user location, preferences, personal info, project context, technical decisions.
-
-## Current Long-term Memory
-{current_memory or "(empty)"}
-
-## Conversation to Process
-{conversation}
-
-Respond with ONLY valid JSON, no markdown fences."""
+            logger.info(f"Memory consolidation: {end - start} new messages to consolidate")
 
+        consolidator = MemoryConsolidator(
+            self.provider, self.model, MemoryStore(self.workspace, max_chars=self.memory_max_chars),
+            chunk_tokens=self.context_window // 4,
+        )
         try:
-            response = await self.provider.chat(
-                messages=[
-                    {"role": "system", "content": "You are a memory consolidation agent. Respond only with valid JSON."},
-                    {"role": "user", "content": prompt},
-                ],
-                model=self.model,
-            )
-            text = (response.content or "").strip()
-            if not text:
-                logger.warning("Memory consolidation: LLM returned empty response")
-                return
-            if text.startswith("```"):
-                text = text.split("\n", 1)[-1].rsplit("```", 1)[0].strip()
-            result = json_repair.loads(text)
-            if not isinstance(result, dict):
-                logger.warning(f"Memory consolidation: unexpected response type")
-                return
-
-            if entry := result.get("history_entry"):
-                memory.append_history(entry)
-            if update := result.get("memory_update"):
-                if update != current_memory:
-                    memory.write_long_term(update)
-
-            if archive_all:
-                session.last_consolidated = 0
-            else:
-                session.last_consolidated = len(session.messages) - keep_count
-            logger.info(f"Memory consolidation done")
+            if await consolidator.consolidate(session, start, end, save=self.sessions.save):
+                if archive_all:
+                    session.last_consolidated = 0
+                logger.info(f"Memory consolidation done")
         except Exception as e:
             logger.error(f"Memory consolidation failed: {e}")
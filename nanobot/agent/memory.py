@@ -1,17 +1,60 @@
 """Memory system for persistent agent memory."""
 
+import json
+import re
+import threading
+import time
+from datetime import datetime
 from pathlib import Path
+from typing import Any
 
+from loguru import logger
+
+from nanobot.utils.bm25 import BM25, tokenize
 from nanobot.utils.helpers import ensure_dir
+from nanobot.utils.tokens import estimate_tokens
+
+_FACT_RE = re.compile(r"^[-*] (.+)$")
+_SECTION_RE = re.compile(r"^##+ (.+)$")
+
+
+def _norm(text: str) -> str:
+    return " ".join(text.lower().split())
 
 
 class MemoryStore:
-    """Two-layer memory: MEMORY.md (long-term facts) + HISTORY.md (grep-searchable log)."""
+    """
+    Two-layer memory: MEMORY.md (long-term facts) + HISTORY.md (searchable event log).
+
+    MEMORY.md is read as ``## Section`` headings with one fact per top-level
+    bullet; other lines are kept as they are. Consolidation changes it with
+    small add/update/delete/reinforce operations (``apply_ops``) instead of
+    rewriting it. When it grows past ``max_chars``, the facts reinforced
+    longest ago are moved to HISTORY.md. Reinforcement times are kept next to
+    it in ``.reinforced.json``, keyed by fact text, so hand edits stay possible.
 
-    def __init__(self, workspace: Path):
+    For the prompt, a MEMORY.md larger than the token budget is not injected
+    whole. The system prompt gets only the pinned core (text before the first
+    section and sections in PINNED_SECTIONS), which keeps it cacheable; the
+    other facts and paragraphs are ranked against the conversation (BM25)
+    and the best ones are attached to the current message.
+    """
+
+    MAX_CHARS = 32000
+    DEFAULT_SECTION = "Notes"
+    PINNED_SECTIONS = ("core", "pinned")
+
+    # apply_ops is a read-modify-write of MEMORY.md; one lock per file across instances
+    _apply_locks: dict[Path, threading.Lock] = {}
+    _apply_locks_guard = threading.Lock()
+
+    def __init__(self, workspace: Path, max_chars: int | None = None):
+        self.max_chars = self.MAX_CHARS if max_chars is None else max_chars  # 0 = no limit
         self.memory_dir = ensure_dir(workspace / "memory")
         self.memory_file = self.memory_dir / "MEMORY.md"
         self.history_file = self.memory_dir / "HISTORY.md"
+        self.reinforced_file = self.memory_dir / ".reinforced.json"
+        self._index: tuple[tuple, list[dict[str, Any]], BM25, int] | None = None
 
     def read_long_term(self) -> str:
         if self.memory_file.exists():
@@ -25,6 +68,336 @@ class MemoryStore:
         with open(self.history_file, "a", encoding="utf-8") as f:
             f.write(entry.rstrip() + "\n\n")
 
-    def get_memory_context(self) -> str:
-        long_term = self.read_long_term()
-        return f"## Long-term Memory\n{long_term}" if long_term else ""
+    def get_memory_context(self, budget_tokens: int = 0) -> str:
+        """
+        Memory for the system prompt.
+
+        Args:
+            budget_tokens: If MEMORY.md is larger than this, only its pinned
+                core is included here; the entries relevant to a message come
+                from ``get_relevant_memory``. 0 always includes the whole file.
+        """
+        if budget_tokens <= 0:
+            long_term = self.read_long_term()
+            return f"## Long-term Memory\n{long_term}" if long_term else ""
+        units, _, total_tokens = self._get_index()
+        if not units:
+            return ""
+        if total_tokens <= budget_tokens:
+            return f"## Long-term Memory\n{self.read_long_term()}"
+        core = self._render_units(units, {i for i, u in enumerate(units) if u["pinned"]})
+        note = ("(Only the pinned part of memory/MEMORY.md is shown here. Entries relevant to the "
+                "conversation are attached to the current message; the rest are in the file.)")
+        return f"## Long-term Memory\n{core}\n\n{note}" if core else f"## Long-term Memory\n{note}"
+
+    def get_relevant_memory(self, query: str, budget_tokens: int) -> str:
+        """
+        Entries of MEMORY.md relevant to ``query``, for the current message.
+
+        Empty unless MEMORY.md is larger than ``budget_tokens``; the entries
+        then fill what the pinned core leaves of the budget.
+        """
+        if budget_tokens <= 0 or not query:
+            return ""
+        units, index, total_tokens = self._get_index()
+        if total_tokens <= budget_tokens:
+            return ""
+        chosen = self._retrieve(units, index, query, budget_tokens)
+        if not chosen:
+            return ""
+        return (f"{self._render_units(units, chosen)}\n\n(Showing {len(chosen)} of {len(units)} memory entries, "
+                f"picked for relevance to this conversation. The rest are in memory/MEMORY.md.)")
+
+    def _get_index(self) -> tuple[list[dict[str, Any]], BM25, int]:
+        """Retrieval units of MEMORY.md (facts and paragraphs), rebuilt only when the file changes."""
+        try:
+            st = self.memory_file.stat()
+            signature: tuple = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            signature = ()
+        if self._index is None or self._index[0] != signature:
+            text = self.read_long_term() if signature else ""
+            units: list[dict[str, Any]] = []
+            for section in self._parse(text):
+                pinned = not section["title"] or section["title"].lower() in self.PINNED_SECTIONS
+                paragraph: list[str] = []
+
+                def flush() -> None:
+                    if paragraph:
+                        units.append({"section": section, "text": "\n".join(paragraph), "pinned": pinned})
+                        paragraph.clear()
+
+                for kind, value in section["entries"]:
+                    if kind == "fact":
+                        flush()
+                        units.append({"section": section, "text": f"- {value}", "pinned": pinned})
+                    elif value.strip():
+                        paragraph.append(value)
+                    else:
+                        flush()
+                flush()
+            for unit in units:
+                unit["tokens"] = estimate_tokens(unit["text"]) + 1
+            index = BM25([tokenize(f"{u['section']['title']} {u['text']}") for u in units])
+            self._index = (signature, units, index, estimate_tokens(text))
+        return self._index[1], self._index[2], self._index[3]
+
+    @staticmethod
+    def _retrieve(units: list[dict[str, Any]], index: BM25, query: str, budget_tokens: int) -> set[int]:
+        """Indexes of the unpinned units most relevant to ``query`` that fit next to the pinned ones."""
+        used = sum(u["tokens"] for u in units if u["pinned"])
+        chosen: set[int] = set()
+        scores = index.scores(tokenize(query))
+        for i in sorted(range(len(units)), key=lambda i: -scores[i]):
+            if scores[i] <= 0:
+                break
+            if not units[i]["pinned"] and used + units[i]["tokens"] <= budget_tokens:
+                chosen.add(i)
+                used += units[i]["tokens"]
+        return chosen
+
+    @staticmethod
+    def _render_units(units: list[dict[str, Any]], chosen: set[int]) -> str:
+        lines: list[str] = []
+        section = None
+        for i in sorted(chosen):
+            unit = units[i]
+            if unit["section"] is not section:
+                section = unit["section"]
+                if section["title"]:
+                    if lines:
+                        lines.append("")
+                    lines.append(section.get("heading") or f"## {section['title']}")
+            lines.append(unit["text"])
+        return "\n".join(lines).strip()
+
+    # -- Keyed facts ---------------------------------------------------------
+
+    @staticmethod
+    def _parse(text: str) -> list[dict[str, Any]]:
+        """Split MEMORY.md into sections of entries: ``["fact", text]`` or ``["text", line]``."""
+        sections: list[dict[str, Any]] = [{"title": "", "entries": []}]
+        for line in text.splitlines():
+            if m := _SECTION_RE.match(line):
+                sections.append({"title": m.group(1).strip(), "heading": line, "entries": []})
+            elif m := _FACT_RE.match(line):
+                sections[-1]["entries"].append(["fact", m.group(1).strip()])
+            else:
+                sections[-1]["entries"].append(["text", line])
+        return sections
+
+    @staticmethod
+    def _render(sections: list[dict[str, Any]]) -> str:
+        lines: list[str] = []
+        for section in sections:
+            if section["title"]:
+                if not any(kind == "fact" or value.strip() for kind, value in section["entries"]):
+                    continue  # emptied by deletes or eviction
+                if lines and lines[-1].strip():
+                    lines.append("")
+                lines.append(section.get("heading") or f"## {section['title']}")
+            for kind, value in section["entries"]:
+                lines.append(f"- {value}" if kind == "fact" else value)
+        return "\n".join(lines).strip() + "\n" if any(line.strip() for line in lines) else ""
+
+    @staticmethod
+    def _facts(sections: list[dict[str, Any]]) -> list[tuple[dict[str, Any], list]]:
+        """(section, entry) for every fact, in document order; fact ids are 1-based indexes."""
+        return [(s, e) for s in sections for e in s["entries"] if e[0] == "fact"]
+
+    @staticmethod
+    def _remove(section: dict[str, Any], entry: list) -> None:
+        section["entries"] = [e for e in section["entries"] if e is not entry]
+
+    def facts(self) -> list[tuple[int, str, str]]:
+        """(id, section, text) of every fact in MEMORY.md."""
+        facts = self._facts(self._parse(self.read_long_term()))
+        return [(i, section["title"], entry[1]) for i, (section, entry) in enumerate(facts, 1)]
+
+    def format_facts(
+        self, query: str = "", limit: int | None = None, facts: list[tuple[int, str, str]] | None = None,
+    ) -> str:
+        """
+        Facts with their ids, grouped by section, for a consolidation prompt.
+
+        With ``limit``, only the facts most relevant to ``query`` are listed
+        (facts not listed cannot be changed but are kept). Pass ``facts``
+        (from ``facts()``) to format a snapshot that is also handed to
+        ``apply_ops`` as its ``ids``.
+        """
+        facts = self.facts() if facts is None else facts
+        if limit is not None and len(facts) > limit:
+            scores = BM25([tokenize(text) for _, _, text in facts]).scores(tokenize(query))
+            keep = sorted(range(len(facts)), key=lambda i: -scores[i])[:limit]
+            facts = [facts[i] for i in sorted(keep)]
+        lines: list[str] = []
+        section = None
+        for fact_id, title, text in facts:
+            if title != section:
+                section = title
+                lines.append(f"### {title or self.DEFAULT_SECTION}")
+            lines.append(f"[{fact_id}] {text}")
+        return "\n".join(lines)
+
+    def _load_reinforced(self) -> dict[str, float]:
+        try:
+            data = json.loads(self.reinforced_file.read_text(encoding="utf-8"))
+            return data if isinstance(data, dict) else {}
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def apply_ops(
+        self, ops: list[dict[str, Any]], now: float | None = None, ids: dict[int, str] | None = None,
+    ) -> dict[str, int]:
+        """
+        Apply fact operations to MEMORY.md and enforce the size budget.
+
+        Operations (ids as listed by ``format_facts``):
+            {"op": "add", "section": "...", "fact": "..."}
+            {"op": "update", "id": 3, "fact": "..."}
+            {"op": "delete", "id": 5}
+            {"op": "reinforce", "id": 2}
+
+        Invalid operations are skipped. Adding a fact that already exists
+        reinforces it instead.
+
+        ``ids`` maps the ids shown in the prompt to the fact texts they stood
+        for. MEMORY.md may change while the model works (edits by the agent,
+        other consolidations), so with ``ids`` an op targets the fact with
+        that text wherever it now is, and is skipped if the fact is gone or
+        was changed. Without ``ids``, ids are positions in the current file.
+
+        Eviction never touches the facts changed by this call or the pinned
+        sections. A MEMORY.md that is already over the limit (e.g. written
+        before the limit existed) is not cut down: eviction only makes room
+        for what this call added. The first call on a file without
+        ``.reinforced.json`` evicts nothing and dates its facts in document
+        order, the earliest oldest.
+
+        Returns:
+            Count of applied operations per kind, plus ``evicted``.
+        """
+        with self._apply_lock():
+            return self._apply_ops(ops, now, ids)
+
+    def _apply_lock(self) -> threading.Lock:
+        key = self.memory_file.resolve()
+        with self._apply_locks_guard:
+            return self._apply_locks.setdefault(key, threading.Lock())
+
+    def _apply_ops(self, ops: list[dict[str, Any]], now: float | None, ids: dict[int, str] | None) -> dict[str, int]:
+        now = time.time() if now is None else now
+        current = self.read_long_term()
+        sections = self._parse(current)
+        facts = self._facts(sections)
+        migrating = bool(facts) and not self.reinforced_file.exists()
+        reinforced = self._load_reinforced()
+        for i, (_, entry) in enumerate(facts):
+            # Facts added by hand start now; on migration, earlier facts count as older
+            reinforced.setdefault(_norm(entry[1]), now - (len(facts) - i) if migrating else now)
+        changed: set[str] = set()
+        existing = {_norm(entry[1]): entry for _, entry in facts}
+        section_of = {id(entry): section for section, entry in facts}
+        counts = {"add": 0, "update": 0, "delete": 0, "reinforce": 0, "evicted": 0}
+
+        for op in ops:
+            if not isinstance(op, dict):
+                continue
+            kind = op.get("op")
+            text = " ".join(str(op.get("fact") or "").split())
+            target = None
+            if kind in ("update", "delete", "reinforce"):
+                try:
+                    index = int(op.get("id")) - 1
+                    if index < 0:
+                        raise IndexError(index)
+                    if ids is None:
+                        target = facts[index]
+                    else:
+                        entry = existing.get(_norm(ids[index + 1]))
+                        if entry is None:
+                            logger.debug(f"Skipping memory op on a fact changed since the prompt: {op}")
+                            continue
+                        target = (section_of[id(entry)], entry)
+                except (TypeError, ValueError, IndexError, KeyError):
+                    logger.debug(f"Skipping memory op with unknown id: {op}")
+                    continue
+                if target[1][0] != "fact":
+                    continue  # already deleted
+            if kind == "add" and text:
+                if _norm(text) in existing:
+                    kind, entry = "reinforce", existing[_norm(text)]
+                else:
+                    title = str(op.get("section") or self.DEFAULT_SECTION).strip()
+                    section = next((s for s in sections if s["title"].lower() == title.lower()), None)
+                    if section is None:
+                        section = {"title": title, "entries": []}
+                        sections.append(section)
+                    entry = ["fact", text]
+                    entries = section["entries"]
+                    at = len(entries)
+                    while at and entries[at - 1][0] == "text" and not entries[at - 1][1].strip():
+                        at -= 1  # before trailing blank lines
+                    entries.insert(at, entry)
+                    existing[_norm(text)] = entry
+                    section_of[id(entry)] = section
+                reinforced[_norm(text)] = now
+                changed.add(_norm(text))
+            elif kind == "update" and text:
+                entry = target[1]
+                reinforced.pop(_norm(entry[1]), None)
+                existing.pop(_norm(entry[1]), None)
+                entry[1] = text
+                existing[_norm(text)] = entry
+                reinforced[_norm(text)] = now
+                changed.add(_norm(text))
+            elif kind == "delete":
+                entry = target[1]
+                reinforced.pop(_norm(entry[1]), None)
+                existing.pop(_norm(entry[1]), None)
+                self._remove(target[0], entry)
+                entry[0] = "deleted"
+            elif kind == "reinforce":
+                reinforced[_norm(target[1][1])] = now
+                changed.add(_norm(target[1][1]))
+            else:
+                continue
+            counts[kind] += 1
+
+        evicted = [] if migrating else self._evict(
+            sections, reinforced, changed, max(self.max_chars, len(current)),
+        )
+        counts["evicted"] = len(evicted)
+        if evicted:
+            stamp = datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M")
+            self.append_history(f"[{stamp}] Moved out of long-term memory (size limit): " + "; ".join(evicted))
+
+        live = {_norm(e[1]) for _, e in self._facts(sections)}
+        self.write_long_term(self._render(sections))
+        self.reinforced_file.write_text(
+            json.dumps({k: v for k, v in reinforced.items() if k in live}, ensure_ascii=False), encoding="utf-8",
+        )
+        return counts
+
+    def _evict(
+        self, sections: list[dict[str, Any]], reinforced: dict[str, float], keep: set[str], limit: int,
+    ) -> list[str]:
+        """Remove the least recently reinforced facts, except ``keep`` and pinned ones, until MEMORY.md fits."""
+        if self.max_chars <= 0:
+            return []
+        size = len(self._render(sections))
+        if size <= limit:
+            return []
+        candidates = [
+            (section, entry) for section, entry in self._facts(sections)
+            if section["title"] and section["title"].lower() not in self.PINNED_SECTIONS
+            and _norm(entry[1]) not in keep
+        ]
+        evicted = []
+        for section, entry in sorted(candidates, key=lambda f: reinforced.get(_norm(f[1][1]), 0.0)):
+            if size <= limit:
+                break
+            self._remove(section, entry)
+            size -= len(entry[1]) + 3  # "- " and newline
+            evicted.append(entry[1])
+        return evicted
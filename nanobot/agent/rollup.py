@@ -0,0 +1,246 @@
+"""History roll-up: folding old HISTORY.md entries into daily, weekly and monthly summaries."""
+
+import asyncio
+import json
+import re
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable
+
+from loguru import logger
+
+from nanobot.agent.memory import MemoryStore
+from nanobot.agent.tools.history import ENTRY_DATE_RE, HistoryArchive
+from nanobot.providers.base import LLMProvider
+from nanobot.utils.helpers import ensure_dir
+
+SYSTEM_PROMPT = "You summarize event logs. Respond with the summary only."
+
+_BLOCK_SEP_RE = re.compile(r"\n[ \t\r]*\n")
+
+
+def parse_entries(text: str) -> list[tuple[str, str, str]]:
+    """
+    Split history text into ``(first day, last day, entry)`` tuples.
+
+    Blocks without a leading date continue the entry before them; an undated
+    block at the very start gets empty days.
+    """
+    entries: list[list[str]] = []
+    for block in _BLOCK_SEP_RE.split(text):
+        block = block.strip()
+        if not block:
+            continue
+        m = ENTRY_DATE_RE.match(block)
+        if m:
+            entries.append([m.group(1), m.group(2) or m.group(1), block])
+        elif entries:
+            entries[-1][2] += "\n\n" + block
+        else:
+            entries.append(["", "", block])
+    return [(first, last, entry) for first, last, entry in entries]
+
+
+def _render(entries: list[tuple[str, str, str]]) -> str:
+    return "".join(entry + "\n\n" for _, _, entry in entries)
+
+
+class HistoryRollup:
+    """
+    Keeps HISTORY.md short by rolling old entries up into summary layers.
+
+    Raw entries older than ``recent_days`` are summarized per day into
+    ``memory/history/daily.md`` and moved, compressed, to the archive
+    (see HistoryArchive). Daily summaries older than DAILY_DAYS are merged
+    per ISO week into ``weekly.md``, and weekly summaries older than
+    WEEKLY_DAYS per month into ``monthly.md``. Recent detail stays in small
+    files, and older time is covered by ever fewer entries.
+
+    A period whose summary fails stays where it is and is retried on the
+    next run. Runs that summarize everything happen at most once per day
+    (see ``due``); a run with failures is retried when next due.
+    """
+
+    DAILY_DAYS = 35  # daily summaries kept before they are merged into weeks
+    WEEKLY_DAYS = 180  # weekly summaries kept before they are merged into months
+    CONCURRENCY = 4
+    MAX_INPUT_CHARS = 30000  # text of one period sent to the model
+
+    def __init__(self, provider: LLMProvider, model: str, memory: MemoryStore, recent_days: int = 7):
+        self.provider = provider
+        self.model = model
+        self.memory = memory
+        self.recent_days = recent_days
+        self.history_dir = ensure_dir(memory.memory_dir / "history")
+        self.archive = HistoryArchive(self.history_dir / "archive")
+        self.state_file = self.history_dir / "rollup.json"
+        self._lock = asyncio.Lock()
+        self._failed = 0  # periods whose summary failed in the current run
+
+    def layer_file(self, layer: str) -> Path:
+        return self.history_dir / f"{layer}.md"
+
+    def due(self, today: date | None = None) -> bool:
+        """True if roll-up is enabled and has not run today."""
+        if self.recent_days <= 0:
+            return False
+        today = today or date.today()
+        try:
+            last_run = json.loads(self.state_file.read_text(encoding="utf-8")).get("last_run")
+        except (OSError, ValueError):
+            last_run = None
+        return last_run != today.isoformat()
+
+    async def run(self, today: date | None = None) -> bool:
+        """
+        Roll up everything that has aged out of its layer.
+
+        Returns:
+            True if any file changed.
+        """
+        today = today or date.today()
+        async with self._lock:
+            self._failed = 0
+            changed = await self._roll_raw(today)
+            for source, target, keep_days, period in (
+                ("daily", "weekly", self.DAILY_DAYS, self._week),
+                ("weekly", "monthly", self.WEEKLY_DAYS, self._month),
+            ):
+                cutoff = period(today - timedelta(days=keep_days))[0]
+                changed |= await self._roll_layer(source, target, cutoff, period)
+            if self._failed:
+                logger.warning(f"History roll-up: {self._failed} period(s) failed, retrying on the next run")
+                return changed
+            self.state_file.write_text(json.dumps({"last_run": today.isoformat()}), encoding="utf-8")
+        return changed
+
+    @staticmethod
+    def _week(day: date) -> tuple[date, date]:
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+
+    @staticmethod
+    def _month(day: date) -> tuple[date, date]:
+        start = day.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        return start, end
+
+    async def _roll_raw(self, today: date) -> bool:
+        history_file = self.memory.history_file
+        if not history_file.exists():
+            return False
+        snapshot = history_file.read_bytes()
+        cutoff = (today - timedelta(days=self.recent_days)).isoformat()
+        entries = parse_entries(snapshot.decode("utf-8", errors="replace"))
+        days: dict[str, list[str]] = {}
+        for first, _, entry in entries:
+            if first and first < cutoff:
+                days.setdefault(first, []).append(entry)
+        if not days:
+            return False
+
+        logger.info(f"History roll-up: summarizing {len(days)} day(s) of HISTORY.md")
+        summaries = await self._summarize_all(
+            {day: (date.fromisoformat(day),) * 2 for day in days},
+            {day: "\n\n".join(texts) for day, texts in days.items()},
+        )
+        if not summaries:
+            return False
+        for day in sorted(summaries):
+            self.archive.append(day, "\n\n".join(days[day]))
+        self._append(self.layer_file("daily"), [summaries[day] for day in sorted(summaries)])
+
+        # Entries may have been appended while the summaries ran; keep them
+        current = history_file.read_bytes()
+        tail = current[len(snapshot):] if current.startswith(snapshot) else b""
+        kept = _render([e for e in entries if e[0] not in summaries]).encode("utf-8")
+        self._replace(history_file, kept + tail)
+        return True
+
+    async def _roll_layer(
+        self, source: str, target: str, cutoff: date,
+        period: Callable[[date], tuple[date, date]],
+    ) -> bool:
+        source_file = self.layer_file(source)
+        if not source_file.exists():
+            return False
+        entries = parse_entries(source_file.read_text(encoding="utf-8"))
+        keys: list[str | None] = []  # period of each entry, None if it stays
+        groups: dict[str, list[str]] = {}
+        spans: dict[str, tuple[date, date]] = {}
+        for first, _, entry in entries:
+            key = None
+            if first and first < cutoff.isoformat():
+                span = period(date.fromisoformat(first))
+                key = span[0].isoformat()
+                spans[key] = span
+                groups.setdefault(key, []).append(entry)
+            keys.append(key)
+        if not groups:
+            return False
+
+        logger.info(f"History roll-up: merging {sum(map(len, groups.values()))} {source} summaries into {target}")
+        summaries = await self._summarize_all(spans, {key: "\n\n".join(texts) for key, texts in groups.items()})
+        if not summaries:
+            return False
+        self._append(self.layer_file(target), [summaries[key] for key in sorted(summaries)])
+        kept = [e for e, key in zip(entries, keys) if key not in summaries]
+        self._replace(source_file, _render(kept).encode("utf-8"))
+        return True
+
+    async def _summarize_all(
+        self, spans: dict[str, tuple[date, date]], texts: dict[str, str],
+    ) -> dict[str, str]:
+        """Summarize each period concurrently; returns the dated entries that succeeded, by key."""
+        semaphore = asyncio.Semaphore(self.CONCURRENCY)
+
+        async def one(key: str) -> tuple[str, str | None]:
+            async with semaphore:
+                return key, await self._summarize(*spans[key], texts[key])
+
+        results = await asyncio.gather(*(one(key) for key in texts))
+        self._failed += sum(1 for _, summary in results if not summary)
+        return {key: summary for key, summary in results if summary}
+
+    async def _summarize(self, start: date, end: date, text: str) -> str | None:
+        if start == end:
+            stamp, period = start.isoformat(), f"the day {start.isoformat()}"
+        else:
+            stamp, period = f"{start.isoformat()}..{end.isoformat()}", f"{start.isoformat()} to {end.isoformat()}"
+        if len(text) > self.MAX_INPUT_CHARS:
+            text = text[:self.MAX_INPUT_CHARS] + "\n... (truncated)"
+        prompt = f"""Summarize these log entries covering {period} in 2-5 sentences.
+Keep names, decisions, dates, numbers and anything the user may ask about later; drop routine detail.
+
+## Entries
+{text}"""
+        try:
+            response = await self.provider.chat(
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                model=self.model,
+            )
+        except Exception as e:
+            logger.error(f"History roll-up for {period} failed: {e}")
+            return None
+        if response.finish_reason == "error":
+            logger.error(f"History roll-up for {period} failed: {response.content}")
+            return None
+        summary = " ".join((response.content or "").split())
+        if not summary:
+            logger.warning(f"History roll-up for {period}: LLM returned empty response")
+            return None
+        return f"[{stamp}] {summary}"
+
+    @staticmethod
+    def _append(path: Path, entries: list[str]) -> None:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("".join(entry + "\n\n" for entry in entries))
+
+    @staticmethod
+    def _replace(path: Path, data: bytes) -> None:
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
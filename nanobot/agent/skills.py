@@ -6,6 +6,8 @@ import re
 import shutil
 from pathlib import Path
 
+from nanobot.utils.bm25 import BM25, tokenize
+
 # Default builtin skills directory (relative to this file)
 BUILTIN_SKILLS_DIR = Path(__file__).parent.parent / "skills"
 
@@ -22,6 +24,7 @@ class SkillsLoader:
         self.workspace = workspace
         self.workspace_skills = workspace / "skills"
         self.builtin_skills = builtin_skills_dir or BUILTIN_SKILLS_DIR
+        self._index: tuple[tuple, list[str], BM25] | None = None  # (signature, names, index)
     
     def list_skills(self, filter_unavailable: bool = True) -> list[dict[str, str]]:
         """
@@ -37,7 +40,7 @@ class SkillsLoader:
         
         # Workspace skills (highest priority)
         if self.workspace_skills.exists():
-            for skill_dir in self.workspace_skills.iterdir():
+            for skill_dir in sorted(self.workspace_skills.iterdir()):
                 if skill_dir.is_dir():
                     skill_file = skill_dir / "SKILL.md"
                     if skill_file.exists():
@@ -45,7 +48,7 @@ class SkillsLoader:
         
         # Built-in skills
         if self.builtin_skills and self.builtin_skills.exists():
-            for skill_dir in self.builtin_skills.iterdir():
+            for skill_dir in sorted(self.builtin_skills.iterdir()):
                 if skill_dir.is_dir():
                     skill_file = skill_dir / "SKILL.md"
                     if skill_file.exists() and not any(s["name"] == skill_dir.name for s in skills):
@@ -98,17 +101,66 @@ class SkillsLoader:
         
         return "\n\n---\n\n".join(parts) if parts else ""
     
-    def build_skills_summary(self) -> str:
+    def rank_skills(self, query: str, min_score: float = 0.0) -> list[tuple[str, float]]:
+        """
+        Rank skills by lexical relevance (BM25) to a query.
+        
+        Each skill is indexed by its name, description and trigger phrases.
+        The index is rebuilt only when a SKILL.md is added, removed or edited.
+        
+        Args:
+            query: Text to match, typically the incoming user message.
+            min_score: Drop skills scoring at or below this.
+        
+        Returns:
+            (skill name, score) pairs, best first.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        names, index = self._get_index()
+        ranked = [(name, score) for name, score in zip(names, index.scores(terms)) if score > min_score]
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked
+    
+    def _get_index(self) -> tuple[list[str], BM25]:
+        skills = self.list_skills(filter_unavailable=False)
+        signature = tuple((s["path"], os.path.getmtime(s["path"])) for s in skills)
+        if self._index is None or self._index[0] != signature:
+            names = [s["name"] for s in skills]
+            documents = [
+                tokenize(" ".join([name.replace("-", " "), self._get_skill_description(name),
+                                   *self._get_skill_triggers(name)]))
+                for name in names
+            ]
+            self._index = (signature, names, BM25(documents))
+        return self._index[1], self._index[2]
+    
+    def _get_skill_triggers(self, name: str) -> list[str]:
+        """Trigger phrases from nanobot metadata ("triggers" list) or a frontmatter "triggers" line."""
+        triggers = self._get_skill_meta(name).get("triggers")
+        if isinstance(triggers, list):
+            return [str(t) for t in triggers]
+        meta = self.get_skill_metadata(name) or {}
+        return [t.strip() for t in meta.get("triggers", "").split(",") if t.strip()]
+    
+    def build_skills_summary(self, skill_names: list[str] | None = None) -> str:
         """
         Build a summary of all skills (name, description, path, availability).
         
         This is used for progressive loading - the agent can read the full
         skill content using read_file when needed.
         
+        Args:
+            skill_names: If given, only summarize these skills, in this order.
+        
         Returns:
             XML-formatted skills summary.
         """
         all_skills = self.list_skills(filter_unavailable=False)
+        if skill_names is not None:
+            by_name = {s["name"]: s for s in all_skills}
+            all_skills = [by_name[n] for n in skill_names if n in by_name]
         if not all_skills:
             return ""
         
@@ -200,6 +252,22 @@ class SkillsLoader:
                 result.append(s["name"])
         return result
     
+    def get_plugins(self) -> list[tuple[dict, Path]]:
+        """
+        Get plugin workers declared by available skills.
+        
+        Returns:
+            List of (plugin spec, skill directory) pairs, from the "plugins"
+            list in each skill's nanobot metadata.
+        """
+        result = []
+        for s in self.list_skills(filter_unavailable=True):
+            plugins = self._get_skill_meta(s["name"]).get("plugins") or []
+            for spec in plugins:
+                if isinstance(spec, dict):
+                    result.append((spec, Path(s["path"]).parent))
+        return result
+    
     def get_skill_metadata(self, name: str) -> dict | None:
         """
         Get metadata from a skill's frontmatter.
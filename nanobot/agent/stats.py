@@ -0,0 +1,146 @@
+"""Prompt size instrumentation: what each part of the context costs per LLM call."""
+
+import json
+import time
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from nanobot.utils.helpers import ensure_dir
+from nanobot.utils.tokens import estimate_tokens, message_tokens
+
+
+class PromptStats:
+    """
+    Token and character counts per prompt section for one agent turn.
+
+    Sections are named ``identity``, ``bootstrap:<file>``, ``always_skills``,
+    ``skills_summary``, ``memory``, ``selected_skills``, ``history``,
+    ``current_message``, ``tool_definitions``, ``assistant`` (tool-call
+    messages within the turn) and ``tool:<name>`` (accumulated results of
+    each tool). Counts grow as the turn proceeds; ``snapshot`` captures them
+    at each LLM call.
+    """
+
+    def __init__(self, session_key: str = "", model: str = ""):
+        self.session_key = session_key
+        self.model = model
+        self.sections: dict[str, list[int]] = {}  # name -> [tokens, chars]
+
+    def add(self, name: str, text: str | None = None, tokens: int | None = None, chars: int | None = None) -> None:
+        """Add text (or precomputed counts) to a section."""
+        if tokens is None:
+            tokens = estimate_tokens(text or "")
+        if chars is None:
+            chars = len(text or "")
+        entry = self.sections.setdefault(name, [0, 0])
+        entry[0] += tokens
+        entry[1] += chars
+
+    def add_messages(self, name: str, messages: list[dict[str, Any]]) -> None:
+        """Add chat messages to a section, counting content and tool calls."""
+        for m in messages:
+            chars = len(m.get("content") or "") if isinstance(m.get("content"), str) else 0
+            if m.get("tool_calls"):
+                chars += len(json.dumps(m["tool_calls"], ensure_ascii=False))
+            self.add(name, tokens=m.get("tokens") or message_tokens(m), chars=chars)
+
+    def snapshot(self, iteration: int, usage: dict[str, int] | None = None) -> dict[str, Any]:
+        """Record for one LLM call: current section sizes plus the provider's usage."""
+        return {
+            "ts": time.time(),
+            "session": self.session_key,
+            "model": self.model,
+            "iteration": iteration,
+            "sections": {name: list(v) for name, v in self.sections.items()},
+            "estimated_tokens": sum(v[0] for v in self.sections.values()),
+            "usage": dict(usage or {}),
+        }
+
+
+class PromptStatsLog:
+    """Append-only JSONL log of PromptStats snapshots, rotated at a fixed size."""
+
+    MAX_BYTES = 5 * 1024 * 1024
+
+    def __init__(self, workspace: Path):
+        self.path = workspace / "logs" / "prompt_stats.jsonl"
+
+    def append(self, record: dict[str, Any]) -> None:
+        try:
+            ensure_dir(self.path.parent)
+            if self.path.exists() and self.path.stat().st_size > self.MAX_BYTES:
+                self.path.replace(self.path.with_suffix(".jsonl.1"))
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.debug(f"Could not write prompt stats: {e}")
+
+    def read(self, limit: int = 200) -> list[dict[str, Any]]:
+        """Most recent records, oldest first (includes the rotated file if needed)."""
+        records: list[dict[str, Any]] = []
+        for path in (self.path, self.path.with_suffix(".jsonl.1")):
+            if len(records) >= limit or not path.exists():
+                continue
+            lines = path.read_text(encoding="utf-8").splitlines()
+            older = []
+            for line in lines[-(limit - len(records)):]:
+                try:
+                    older.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+            records = older + records
+        return records[-limit:]
+
+
+def _percentile(values: list[int], q: float) -> int:
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(int(round(q * (len(values) - 1))), len(values) - 1)]
+
+
+def summarize(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Per-section token percentiles over LLM calls, largest first.
+
+    Returns rows with ``section``, ``p50``, ``p90``, ``max``, ``share`` (of all
+    estimated tokens) and ``calls`` (how many calls included the section).
+    Provider-reported usage appears as ``usage:<field>`` rows at the end.
+    """
+    by_section: dict[str, list[int]] = {}
+    total = 0
+    for r in records:
+        for name, (tokens, _chars) in r.get("sections", {}).items():
+            by_section.setdefault(name, []).append(tokens)
+            total += tokens
+
+    rows = [
+        {
+            "section": name,
+            "p50": _percentile(values, 0.5),
+            "p90": _percentile(values, 0.9),
+            "max": max(values),
+            "share": sum(values) / total if total else 0.0,
+            "calls": len(values),
+        }
+        for name, values in by_section.items()
+    ]
+    rows.sort(key=lambda row: row["share"], reverse=True)
+
+    usage: dict[str, list[int]] = {}
+    for r in records:
+        for key, value in (r.get("usage") or {}).items():
+            if isinstance(value, int):
+                usage.setdefault(key, []).append(value)
+    for key, values in usage.items():
+        rows.append({
+            "section": f"usage:{key}",
+            "p50": _percentile(values, 0.5),
+            "p90": _percentile(values, 0.9),
+            "max": max(values),
+            "share": None,
+            "calls": len(values),
+        })
+    return rows
@@ -1,7 +1,152 @@
 """Base class for agent tools."""
 
+import json
+import shutil
 from abc import ABC, abstractmethod
-from typing import Any
+from pathlib import Path
+from typing import Any, Callable, Sequence
+
+# A compiled validator returns (relative path, message) pairs; a None message
+# means the key at that path is missing.
+Validator = Callable[[Any], Sequence[tuple[str, str | None]]]
+
+_TYPE_MAP = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+}
+
+_OK: tuple = ()  # shared "no errors" result, avoids allocating on the hot path
+
+
+def _join(head: str, sub: str) -> str:
+    """Prefix a relative error path with a key or index segment."""
+    if not sub:
+        return head
+    return head + sub if sub.startswith("[") else f"{head}.{sub}"
+
+
+def _compile(schema: dict[str, Any]) -> Validator:
+    """Compile a JSON schema fragment into a closure that validates values."""
+    t = schema.get("type")
+    expected = _TYPE_MAP.get(t)
+    type_error = (("", f"should be {t}"),)
+    checks: list[Validator] = []
+
+    if "enum" in schema:
+        enum = schema["enum"]
+        enum_error = (("", f"must be one of {enum}"),)
+        checks.append(lambda v: _OK if v in enum else enum_error)
+    if t in ("integer", "number"):
+        if "minimum" in schema:
+            lo, lo_error = schema["minimum"], (("", f"must be >= {schema['minimum']}"),)
+            checks.append(lambda v: lo_error if v < lo else _OK)
+        if "maximum" in schema:
+            hi, hi_error = schema["maximum"], (("", f"must be <= {schema['maximum']}"),)
+            checks.append(lambda v: hi_error if v > hi else _OK)
+    if t == "string":
+        if "minLength" in schema:
+            min_len = schema["minLength"]
+            min_error = (("", f"must be at least {min_len} chars"),)
+            checks.append(lambda v: min_error if len(v) < min_len else _OK)
+        if "maxLength" in schema:
+            max_len = schema["maxLength"]
+            max_error = (("", f"must be at most {max_len} chars"),)
+            checks.append(lambda v: max_error if len(v) > max_len else _OK)
+    if t == "object" and (schema.get("required") or schema.get("properties")):
+        required = tuple(schema.get("required", ()))
+        # Only constrained properties need visiting; iterate the schema rather
+        # than the value so wide objects cost nothing extra.
+        props = tuple(
+            (k, sub) for k, sub in ((k, _compile(v)) for k, v in schema.get("properties", {}).items())
+            if sub is not _accept
+        )
+
+        def check_object(v: dict[str, Any]) -> Sequence[tuple[str, str | None]]:
+            errors = None
+            for k in required:
+                if k not in v:
+                    errors = errors or []
+                    errors.append((k, None))
+            for k, sub in props:
+                if k in v:
+                    sub_errors = sub(v[k])
+                    if sub_errors:
+                        errors = errors or []
+                        errors.extend((_join(k, p), msg) for p, msg in sub_errors)
+            return errors or _OK
+        checks.append(check_object)
+    if t == "array" and "items" in schema:
+        item_schema = schema["items"]
+        item_check = _compile(item_schema)
+        item_type = _TYPE_MAP.get(item_schema.get("type"))
+        # Bare "items": {"type": ...} schemas only need an isinstance sweep
+        simple = item_type is not None and set(item_schema) <= {"type", "description"}
+
+        def check_array(v: list[Any]) -> Sequence[tuple[str, str | None]]:
+            if simple and all(isinstance(x, item_type) for x in v):
+                return _OK
+            errors = []
+            for i, item in enumerate(v):
+                sub_errors = item_check(item)
+                if sub_errors:
+                    errors.extend((_join(f"[{i}]", p), msg) for p, msg in sub_errors)
+            return errors or _OK
+        if item_check is not _accept:
+            checks.append(check_array)
+
+    if expected is None and not checks:
+        return _accept
+    if not checks:
+        return lambda v: _OK if isinstance(v, expected) else type_error
+    if len(checks) == 1:
+        only = checks[0]
+        if expected is None:
+            return only
+        return lambda v: only(v) if isinstance(v, expected) else type_error
+
+    def check(v: Any) -> Sequence[tuple[str, str | None]]:
+        if expected is not None and not isinstance(v, expected):
+            return type_error
+        errors = []
+        for c in checks:
+            errors.extend(c(v))
+        return errors or _OK
+    return check
+
+
+def _accept(v: Any) -> Sequence[tuple[str, str | None]]:
+    """Validator for unconstrained values."""
+    return _OK
+
+
+def compact_json(value: Any) -> str:
+    """
+    JSON for the model: no whitespace and no ASCII escaping. A ``\\uXXXX``
+    escape costs several tokens where the raw UTF-8 character costs one.
+    """
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def tool_result(text: str, **meta: Any) -> str:
+    """
+    Format a tool result as a one-line ``[key=value ...]`` header followed by
+    the raw text. None values are left out; values that contain spaces or
+    brackets are JSON-quoted.
+    """
+    fields = []
+    for key, value in meta.items():
+        if value is None:
+            continue
+        if isinstance(value, str) and value and not any(c.isspace() or c in '[]"' for c in value):
+            fields.append(f"{key}={value}")
+        else:
+            fields.append(f"{key}={compact_json(value)}")
+    header = f"[{' '.join(fields)}]"
+    return f"{header}\n{text}" if text else header
 
 
 class Tool(ABC):
@@ -11,15 +156,21 @@ class Tool(ABC):
     Tools are capabilities that the agent can use to interact with
     the environment, such as reading files, executing commands, etc.
     """
-    
-    _TYPE_MAP = {
-        "string": str,
-        "integer": int,
-        "number": (int, float),
-        "boolean": bool,
-        "array": list,
-        "object": dict,
-    }
+
+    # Idempotent tools return the same result for the same arguments as long
+    # as the files from memo_paths() are unchanged (and memo_ttl, if set, has
+    # not expired), so ToolRegistry may reuse their results.
+    idempotent: bool = False
+    memo_ttl: float | None = None
+
+    # Where ToolRegistry runs execute(): "inline" on the event loop, "thread"
+    # in a worker thread, or "process" in the registry's process pool (the
+    # tool instance and its arguments must then be picklable).
+    execution_mode: str = "inline"
+
+    # Executables the tool needs on PATH; ToolRegistry hides the tool while
+    # one is missing (see unavailable_reason).
+    requires_bins: tuple[str, ...] = ()
     
     @property
     @abstractmethod
@@ -54,42 +205,51 @@ class Tool(ABC):
 
     def validate_params(self, params: dict[str, Any]) -> list[str]:
         """Validate tool parameters against JSON schema. Returns error list (empty if valid)."""
+        validator = getattr(self, "_validator", None) or self.compile_validator()
+        return [
+            f"missing required {path}" if msg is None else f"{path or 'parameter'} {msg}"
+            for path, msg in validator(params)
+        ]
+
+    def compile_validator(self) -> Validator:
+        """
+        Compile the parameter schema into a validator and cache it on the tool.
+
+        The schema is walked once here instead of on every call; at call time
+        the validator only does type checks, and error paths are built only
+        for values that actually fail.
+        """
         schema = self.parameters or {}
         if schema.get("type", "object") != "object":
-            raise ValueError(f"Schema must be object type, got {schema.get('type')!r}")
-        return self._validate(params, {**schema, "type": "object"}, "")
+            message = f"Schema must be object type, got {schema.get('type')!r}"
+
+            def invalid(val: Any) -> Sequence[tuple[str, str | None]]:
+                raise ValueError(message)
+            validator = invalid
+        else:
+            validator = _compile({**schema, "type": "object"})
+        self._validator = validator
+        return validator
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Compiled validators are closures; drop them so process-mode tools pickle
+        state = self.__dict__.copy()
+        state.pop("_validator", None)
+        return state
+
+    def unavailable_reason(self) -> str | None:
+        """Why the tool cannot work right now (missing binary, API key, ...), or None if it can."""
+        missing = [b for b in self.requires_bins if not shutil.which(b)]
+        return f"requires {', '.join(missing)} on PATH" if missing else None
+
+    def memo_paths(self, params: dict[str, Any]) -> list[Path] | None:
+        """Files/directories whose stats key a memoized result. None disables memoization for the call."""
+        return []
+
+    def written_paths(self, params: dict[str, Any]) -> list[Path] | None:
+        """Paths a call may modify. None means unknown (anything may have changed)."""
+        return []
 
-    def _validate(self, val: Any, schema: dict[str, Any], path: str) -> list[str]:
-        t, label = schema.get("type"), path or "parameter"
-        if t in self._TYPE_MAP and not isinstance(val, self._TYPE_MAP[t]):
-            return [f"{label} should be {t}"]
-        
-        errors = []
-        if "enum" in schema and val not in schema["enum"]:
-            errors.append(f"{label} must be one of {schema['enum']}")
-        if t in ("integer", "number"):
-            if "minimum" in schema and val < schema["minimum"]:
-                errors.append(f"{label} must be >= {schema['minimum']}")
-            if "maximum" in schema and val > schema["maximum"]:
-                errors.append(f"{label} must be <= {schema['maximum']}")
-        if t == "string":
-            if "minLength" in schema and len(val) < schema["minLength"]:
-                errors.append(f"{label} must be at least {schema['minLength']} chars")
-            if "maxLength" in schema and len(val) > schema["maxLength"]:
-                errors.append(f"{label} must be at most {schema['maxLength']} chars")
-        if t == "object":
-            props = schema.get("properties", {})
-            for k in schema.get("required", []):
-                if k not in val:
-                    errors.append(f"missing required {path + '.' + k if path else k}")
-            for k, v in val.items():
-                if k in props:
-                    errors.extend(self._validate(v, props[k], path + '.' + k if path else k))
-        if t == "array" and "items" in schema:
-            for i, item in enumerate(val):
-                errors.extend(self._validate(item, schema["items"], f"{path}[{i}]" if path else f"[{i}]"))
-        return errors
-    
     def to_schema(self) -> dict[str, Any]:
         """Convert tool to OpenAI function schema format."""
         return {
@@ -0,0 +1,665 @@
+"""Structured data tool: stream, summarize and query JSON, JSONL and CSV files."""
+
+import csv
+import json
+import random
+import re
+from pathlib import Path
+from typing import Any, Iterable, Iterator, TextIO
+
+from nanobot.agent.tools.base import Tool
+from nanobot.agent.tools.filesystem import _resolve_path
+
+_CHUNK = 1 << 16
+_WS = " \t\r\n"
+_NUMBER_CHARS = "0123456789.eE+-"
+_MISSING = object()
+
+
+class _JsonStream:
+    """
+    Incremental reader for a single JSON document.
+
+    Values are decoded one at a time with ``raw_decode`` over a sliding
+    buffer, so walking into a large array only ever holds one element
+    (plus one read chunk) in memory.
+    """
+
+    def __init__(self, f: TextIO):
+        self._f = f
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, size: int | None = None) -> bool:
+        if self._eof:
+            return False
+        data = self._f.read(size or _CHUNK)
+        if not data:
+            self._eof = True
+            return False
+        if self._pos:
+            self._buf, self._pos = self._buf[self._pos:], 0
+        self._buf += data
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it ('' at EOF)."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WS:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f"Malformed JSON: expected one of {chars!r}, got {c or 'EOF'!r}")
+        self._pos += 1
+        return c
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                val, end = self._decoder.raw_decode(self._buf, self._pos)
+                # A number cut off by the end of the buffer ("12" of "12.5e3")
+                # decodes fine, so refill and retry when one ends near the edge.
+                truncated = (
+                    isinstance(val, (int, float)) and not isinstance(val, bool)
+                    and len(self._buf) - end < 32
+                    and (end == len(self._buf) or self._buf[end] in _NUMBER_CHARS)
+                )
+                if not truncated or not self._fill(max(_CHUNK, len(self._buf))):
+                    self._pos = end
+                    return val
+            except json.JSONDecodeError:
+                if not self._fill(max(_CHUNK, len(self._buf))):
+                    raise
+
+    def elements(self) -> Iterator[int]:
+        """Step through the array at the current position; the caller consumes each element."""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        idx = 0
+        while True:
+            yield idx
+            idx += 1
+            if self.expect(",]") == "]":
+                return
+
+    def items(self) -> Iterator[Any]:
+        """Stream the decoded elements of the array at the current position."""
+        for _ in self.elements():
+            yield self.value()
+
+    def pairs(self) -> Iterator[str]:
+        """Stream the keys of the object at the current position; the caller consumes each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.expect(",}") == "}":
+                return
+
+
+def _parse_path(path: str | None) -> list[str | int]:
+    """Parse a JSONPath-style path ('$.a.b[0]', 'items[*].id', "a['x y']") into components."""
+    if not path:
+        return []
+    path = path.strip()
+    if path.startswith("$"):
+        path = path[1:]
+    comps: list[str | int] = []
+    for m in re.finditer(r"\.?([^.\[\]]+)|\[(\*|-?\d+|'[^']*'|\"[^\"]*\")\]", path):
+        name, bracket = m.group(1), m.group(2)
+        if name is not None:
+            comps.append("*" if name == "*" else name)
+        elif bracket == "*":
+            comps.append("*")
+        elif bracket[0] in "'\"":
+            comps.append(bracket[1:-1])
+        else:
+            comps.append(int(bracket))
+    return comps
+
+
+def _get(value: Any, comps: list[str | int]) -> list[Any]:
+    """Resolve path components against a value; wildcards fan out."""
+    values = [value]
+    for comp in comps:
+        nxt = []
+        for v in values:
+            if comp == "*":
+                if isinstance(v, list):
+                    nxt.extend(v)
+                elif isinstance(v, dict):
+                    nxt.extend(v.values())
+            elif isinstance(comp, int):
+                if isinstance(v, list) and -len(v) <= comp < len(v):
+                    nxt.append(v[comp])
+            elif isinstance(v, dict) and comp in v:
+                nxt.append(v[comp])
+        values = nxt
+    return values
+
+
+def _get_one(value: Any, comps: list[str | int]) -> Any:
+    vals = _get(value, comps)
+    if not vals:
+        return _MISSING
+    return vals if "*" in comps else vals[0]
+
+
+def _num(v: Any) -> float | None:
+    """Coerce numbers and numeric strings (CSV cells) to float."""
+    if isinstance(v, bool):
+        return None
+    if isinstance(v, (int, float)):
+        return v
+    if isinstance(v, str):
+        try:
+            return float(v)
+        except ValueError:
+            return None
+    return None
+
+
+_OPS = ("==", "!=", ">=", "<=", ">", "<", " contains ", " startswith ", " exists", " missing")
+
+
+def _parse_filter(expr: str) -> tuple[list[str | int], str, Any]:
+    """Parse 'path op value' into (components, op, value)."""
+    for op in _OPS:
+        idx = expr.find(op)
+        if idx > 0:
+            path, raw = expr[:idx].strip(), expr[idx + len(op):].strip()
+            if op.strip() in ("exists", "missing"):
+                return _parse_path(path), op.strip(), None
+            try:
+                value = json.loads(raw)
+            except ValueError:
+                value = raw.strip("'\"")
+            return _parse_path(path), op.strip(), value
+    raise ValueError(f"Cannot parse filter {expr!r}; use 'field op value' with op in == != > >= < <= contains startswith exists missing")
+
+
+def _match(record: Any, flt: tuple[list[str | int], str, Any]) -> bool:
+    comps, op, expected = flt
+    actual = _get_one(record, comps)
+    if op == "exists":
+        return actual is not _MISSING
+    if op == "missing":
+        return actual is _MISSING
+    if actual is _MISSING:
+        return False
+    if op == "contains":
+        if isinstance(actual, (list, str)):
+            return expected in actual if isinstance(actual, list) else str(expected) in actual
+        return False
+    if op == "startswith":
+        return isinstance(actual, str) and actual.startswith(str(expected))
+    if op in ("==", "!="):
+        a, e = _num(actual), _num(expected)
+        equal = (a == e) if a is not None and e is not None else actual == expected
+        return equal if op == "==" else not equal
+    a, e = _num(actual), _num(expected)
+    if a is None or e is None:
+        if not (isinstance(actual, str) and isinstance(expected, str)):
+            return False
+        a, e = actual, expected
+    return {">": a > e, ">=": a >= e, "<": a < e, "<=": a <= e}[op]
+
+
+def _type_name(v: Any) -> str:
+    if v is None:
+        return "null"
+    if isinstance(v, bool):
+        return "boolean"
+    if isinstance(v, int):
+        return "integer"
+    if isinstance(v, float):
+        return "number"
+    if isinstance(v, str):
+        return "string"
+    if isinstance(v, list):
+        return "array"
+    return "object"
+
+
+class _FieldStats:
+    """Running per-field statistics for the schema summary."""
+
+    __slots__ = ("types", "count", "minimum", "maximum", "example")
+
+    def __init__(self) -> None:
+        self.types: dict[str, int] = {}
+        self.count = 0
+        self.minimum: Any = None
+        self.maximum: Any = None
+        self.example: Any = _MISSING
+
+    def add(self, v: Any, numeric_strings: bool) -> None:
+        t = _type_name(v)
+        self.types[t] = self.types.get(t, 0) + 1
+        self.count += 1
+        n = _num(v) if numeric_strings or t in ("integer", "number") else None
+        if n is not None:
+            self.minimum = n if self.minimum is None else min(self.minimum, n)
+            self.maximum = n if self.maximum is None else max(self.maximum, n)
+        if self.example is _MISSING and t not in ("null", "array", "object"):
+            self.example = v if not isinstance(v, str) else v[:60]
+
+
+def _dumps(v: Any) -> str:
+    return json.dumps(v, ensure_ascii=False, default=str)
+
+
+class QueryDataTool(Tool):
+    """Tool to inspect large JSON / JSONL / CSV files without reading them whole."""
+
+    execution_mode = "process"
+    idempotent = True
+    MAX_FIELDS = 200
+    MAX_GROUPS = 1000
+    MAX_SCHEMA_DEPTH = 4
+
+    def __init__(self, allowed_dir: Path | None = None, max_chars: int = 8000):
+        self._allowed_dir = allowed_dir
+        self.max_chars = max_chars
+
+    @property
+    def name(self) -> str:
+        return "query_data"
+
+    @property
+    def description(self) -> str:
+        return (
+            "Inspect a JSON, JSONL or CSV file of any size by streaming it. "
+            "op=schema summarizes fields and types; head/sample return rows; "
+            "count and aggregate compute counts, sum/avg/min/max/distinct, optionally grouped. "
+            "Paths are JSONPath-style ('$.user.name', 'items[*].id'); "
+            "filters look like \"age > 30\" or \"status == 'open'\"."
+        )
+
+    @property
+    def parameters(self) -> dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "path": {"type": "string", "description": "File to query"},
+                "op": {
+                    "type": "string",
+                    "enum": ["schema", "head", "sample", "count", "aggregate"],
+                    "description": "Operation (default: schema)"
+                },
+                "format": {
+                    "type": "string",
+                    "enum": ["json", "jsonl", "csv"],
+                    "description": "File format (default: from extension)"
+                },
+                "root": {
+                    "type": "string",
+                    "description": "JSONPath to the record array inside a JSON document, e.g. '$.data.items'"
+                },
+                "select": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Field paths to return for each row"
+                },
+                "where": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Filters, all must match: 'field op value' (== != > >= < <= contains startswith exists missing)"
+                },
+                "group_by": {"type": "string", "description": "Field path to group aggregates by"},
+                "aggregates": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "For op=aggregate: 'count', 'sum:field', 'avg:field', 'min:field', 'max:field', 'distinct:field'"
+                },
+                "limit": {"type": "integer", "minimum": 1, "maximum": 1000, "description": "Rows to return (default 10)"},
+                "offset": {"type": "integer", "minimum": 0, "description": "Rows to skip for op=head"},
+                "max_chars": {"type": "integer", "minimum": 200, "description": "Output budget in characters"}
+            },
+            "required": ["path"]
+        }
+
+    @staticmethod
+    def _detect_format(path: Path) -> str:
+        suffix = path.suffix.lower()
+        if suffix in (".jsonl", ".ndjson"):
+            return "jsonl"
+        if suffix in (".csv", ".tsv"):
+            return "csv"
+        return "json"
+
+    def _records(self, f: TextIO, fmt: str, root: str | None, path: Path, stats: dict[str, int]) -> Iterator[Any]:
+        """Yield records from the file, one at a time."""
+        if fmt == "jsonl":
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    stats["bad_lines"] = stats.get("bad_lines", 0) + 1
+        elif fmt == "csv":
+            dialect = "excel-tab" if path.suffix.lower() == ".tsv" else "excel"
+            yield from csv.DictReader(f, dialect=dialect)
+        else:
+            yield from self._json_records(_JsonStream(f), _parse_path(root))
+
+    def _json_records(self, stream: _JsonStream, comps: list[str | int]) -> Iterator[Any]:
+        """Navigate to ``comps`` inside the document, streaming arrays along the way."""
+        if not comps:
+            if stream.peek() == "[":
+                yield from stream.items()
+            else:
+                yield stream.value()
+            return
+        head, rest = comps[0], comps[1:]
+        c = stream.peek()
+        if c == "{" and isinstance(head, str):
+            for key in stream.pairs():
+                if head == "*" or key == head:
+                    yield from self._json_records(stream, rest)
+                else:
+                    stream.value()
+        elif c == "[":
+            for idx in stream.elements():
+                if head == "*" or head == idx:
+                    yield from self._json_records(stream, rest)
+                else:
+                    stream.value()
+        else:
+            stream.value()
+
+    async def execute(
+        self,
+        path: str,
+        op: str = "schema",
+        format: str | None = None,
+        root: str | None = None,
+        select: list[str] | None = None,
+        where: list[str] | None = None,
+        group_by: str | None = None,
+        aggregates: list[str] | None = None,
+        limit: int = 10,
+        offset: int = 0,
+        max_chars: int | None = None,
+        **kwargs: Any,
+    ) -> str:
+        try:
+            file_path = _resolve_path(path, self._allowed_dir)
+            if not file_path.is_file():
+                return f"Error: File not found: {path}"
+            fmt = format or self._detect_format(file_path)
+            budget = max_chars or self.max_chars
+            filters = [_parse_filter(w) for w in where or []]
+            projection = [(s, _parse_path(s)) for s in select or []]
+            stats: dict[str, int] = {}
+
+            with open(file_path, encoding="utf-8", errors="replace", newline="" if fmt == "csv" else None) as f:
+                if op == "schema" and fmt == "json" and not root and not filters:
+                    stream = _JsonStream(f)
+                    if stream.peek() != "[":
+                        return self._schema((), fmt, budget, stream=stream)
+                    records = stream.items()
+                else:
+                    records = self._records(f, fmt, root, file_path, stats)
+                if filters:
+                    records = (r for r in records if all(_match(r, flt) for flt in filters))
+                if op == "schema":
+                    out = self._schema(records, fmt, budget)
+                elif op == "head":
+                    out = self._head(records, projection, limit, offset, budget)
+                elif op == "sample":
+                    out = self._sample(records, projection, limit, budget)
+                elif op == "count":
+                    out = f"count: {sum(1 for _ in records)}"
+                elif op == "aggregate":
+                    out = self._aggregate(records, group_by, aggregates or ["count"], fmt, budget)
+                else:
+                    return f"Error: Unknown op {op!r}"
+
+            if stats.get("bad_lines"):
+                out += f"\n(skipped {stats['bad_lines']} unparseable lines)"
+            return out
+        except PermissionError as e:
+            return f"Error: {e}"
+        except Exception as e:
+            return f"Error querying data: {str(e)}"
+
+    def memo_paths(self, params: dict[str, Any]) -> list[Path] | None:
+        try:
+            return [_resolve_path(params["path"], self._allowed_dir)]
+        except Exception:
+            return None
+
+    @staticmethod
+    def _project(record: Any, projection: list[tuple[str, list[str | int]]]) -> Any:
+        if not projection:
+            return record
+        if len(projection) == 1:
+            v = _get_one(record, projection[0][1])
+            return None if v is _MISSING else v
+        out = {}
+        for label, comps in projection:
+            v = _get_one(record, comps)
+            out[label.lstrip("$.")] = None if v is _MISSING else v
+        return out
+
+    @staticmethod
+    def _emit(lines: list[str], budget: int, footer: str = "") -> str:
+        """Join lines, stopping at the character budget."""
+        # Leave room for the footer and the "more rows" note
+        out, used = [], len(footer) + 64
+        for line in lines:
+            if used + len(line) + 1 > budget:
+                if not out:
+                    # Always show something, even if a single row is over budget
+                    out.append(line[:max(budget - used - 80, 40)] + "…")
+                if len(out) < len(lines):
+                    out.append(f"... {len(lines) - len(out)} more rows over the {budget}-char budget")
+                break
+            out.append(line)
+            used += len(line) + 1
+        if footer:
+            out.append(footer)
+        return "\n".join(out)
+
+    def _head(self, records: Iterator[Any], projection, limit: int, offset: int, budget: int) -> str:
+        rows, more = [], False
+        for i, r in enumerate(records):
+            if i < offset:
+                continue
+            if len(rows) >= limit:
+                more = True
+                break
+            rows.append(_dumps(self._project(r, projection)))
+        if not rows:
+            return "No matching rows" if not offset else f"No rows after offset {offset}"
+        footer = f"(rows {offset + 1}-{offset + len(rows)}; more available with offset={offset + len(rows)})" if more else ""
+        return self._emit(rows, budget, footer)
+
+    def _sample(self, records: Iterator[Any], projection, limit: int, budget: int) -> str:
+        rng = random.Random(0)
+        reservoir: list[tuple[int, Any]] = []
+        seen = 0
+        for r in records:
+            if len(reservoir) < limit:
+                reservoir.append((seen, r))
+            else:
+                j = rng.randint(0, seen)
+                if j < limit:
+                    reservoir[j] = (seen, r)
+            seen += 1
+        if not reservoir:
+            return "No matching rows"
+        reservoir.sort(key=lambda x: x[0])
+        rows = [f"#{i}: {_dumps(self._project(r, projection))}" for i, r in reservoir]
+        return self._emit(rows, budget, f"({len(rows)} sampled from {seen} rows)")
+
+    def _schema(self, records: Iterable[Any], fmt: str, budget: int,
+                stream: _JsonStream | None = None) -> str:
+        """
+        Summarize field paths, types and value ranges.
+
+        With ``stream`` the document itself is walked incrementally, so only
+        leaf values and single array elements are ever decoded.
+        """
+        fields: dict[str, _FieldStats] = {}
+        root_types: dict[str, int] = {}
+        rows = 0
+        dropped = False
+
+        def note(v: Any, prefix: str) -> None:
+            nonlocal dropped
+            if not prefix:
+                return
+            st = fields.get(prefix)
+            if st is None:
+                if len(fields) >= self.MAX_FIELDS:
+                    dropped = True
+                    return
+                st = fields[prefix] = _FieldStats()
+            st.add(v, fmt == "csv")
+
+        def visit(v: Any, prefix: str, depth: int) -> None:
+            note(v, prefix)
+            if depth >= self.MAX_SCHEMA_DEPTH:
+                return
+            if isinstance(v, dict):
+                for k, sub in v.items():
+                    visit(sub, f"{prefix}.{k}" if prefix else k, depth + 1)
+            elif isinstance(v, list):
+                for sub in v:
+                    visit(sub, f"{prefix}[*]", depth + 1)
+
+        def walk(prefix: str, depth: int) -> None:
+            c = stream.peek()
+            if c == "{" and depth < self.MAX_SCHEMA_DEPTH:
+                note({}, prefix)
+                for key in stream.pairs():
+                    walk(f"{prefix}.{key}" if prefix else key, depth + 1)
+            elif c == "[" and depth < self.MAX_SCHEMA_DEPTH:
+                note([], prefix)
+                for _ in stream.elements():
+                    walk(f"{prefix}[*]", depth + 1)
+            else:
+                visit(stream.value(), prefix, depth)
+
+        if stream is not None:
+            rows = 1
+            root_types[{"{": "object", "[": "array"}.get(stream.peek(), "value")] = 1
+            walk("", 0)
+        for r in records:
+            rows += 1
+            t = _type_name(r)
+            root_types[t] = root_types.get(t, 0) + 1
+            visit(r, "", 0)
+
+        lines = [f"format: {fmt}, records: {rows}, record types: "
+                 + ", ".join(f"{t}×{n}" for t, n in root_types.items())]
+        for name, st in fields.items():
+            types = "|".join(t if len(st.types) == 1 else f"{t}×{n}" for t, n in st.types.items())
+            parts = [f"{name}: {types}"]
+            if not name.endswith("[*]") and rows and st.count < rows:
+                parts.append(f"present in {st.count}/{rows}")
+            if st.minimum is not None:
+                parts.append(f"range {st.minimum:g}..{st.maximum:g}")
+            if st.example is not _MISSING:
+                parts.append(f"e.g. {_dumps(st.example)}")
+            lines.append("  " + ", ".join(parts))
+        footer = f"(only the first {self.MAX_FIELDS} fields are tracked)" if dropped else ""
+        return self._emit(lines, budget, footer)
+
+    def _aggregate(self, records: Iterator[Any], group_by: str | None, aggregates: list[str],
+                   fmt: str, budget: int) -> str:
+        specs = []
+        for a in aggregates:
+            fn, _, field = a.partition(":")
+            fn = fn.strip().lower()
+            if fn not in ("count", "sum", "avg", "min", "max", "distinct"):
+                raise ValueError(f"Unknown aggregate {a!r}")
+            if fn != "count" and not field:
+                raise ValueError(f"Aggregate {a!r} needs a field, e.g. '{fn}:price'")
+            specs.append((a, fn, _parse_path(field)))
+
+        group_comps = _parse_path(group_by) if group_by else None
+        groups: dict[str, list[Any]] = {}
+        overflow = 0
+
+        def fresh() -> list[Any]:
+            state: list[Any] = []
+            for _, fn, _ in specs:
+                state.append(set() if fn == "distinct" else [0, 0.0] if fn in ("sum", "avg") else None if fn in ("min", "max") else 0)
+            return state
+
+        for r in records:
+            key = "*"
+            if group_comps is not None:
+                g = _get_one(r, group_comps)
+                key = "(missing)" if g is _MISSING else g if isinstance(g, str) else _dumps(g)
+            state = groups.get(key)
+            if state is None:
+                if len(groups) >= self.MAX_GROUPS:
+                    overflow += 1
+                    continue
+                state = groups[key] = fresh()
+            for i, (_, fn, comps) in enumerate(specs):
+                if fn == "count":
+                    state[i] += 1
+                    continue
+                for v in _get(r, comps):
+                    if v is None:
+                        continue
+                    if fn == "distinct":
+                        if len(state[i]) < self.MAX_GROUPS:
+                            state[i].add(v if isinstance(v, (str, int, float, bool)) else _dumps(v))
+                        continue
+                    n = _num(v)
+                    if n is None:
+                        continue
+                    if fn in ("sum", "avg"):
+                        state[i][0] += 1
+                        state[i][1] += n
+                    else:
+                        cur = state[i]
+                        state[i] = n if cur is None else (min(cur, n) if fn == "min" else max(cur, n))
+
+        def render(state: list[Any]) -> dict[str, Any]:
+            out = {}
+            for (label, fn, _), s in zip(specs, state):
+                if fn in ("sum", "avg"):
+                    out[label] = s[1] if fn == "sum" else (s[1] / s[0] if s[0] else None)
+                elif fn == "distinct":
+                    out[label] = len(s)
+                    out[label + " values"] = sorted(s, key=str)[:20]
+                else:
+                    out[label] = s
+            return out
+
+        if not groups:
+            return "No matching rows"
+        if group_comps is None:
+            return self._emit([_dumps(render(groups["*"]))], budget)
+
+        first = specs[0][0]
+        rendered = sorted(((k, render(s)) for k, s in groups.items()),
+                          key=lambda kv: -(_num(kv[1].get(first)) or 0))
+        lines = [f"{_dumps(k)}: {_dumps(r)}" for k, r in rendered]
+        footer = f"({overflow} rows in groups beyond the first {self.MAX_GROUPS} were skipped)" if overflow else ""
+        return self._emit(lines, budget, footer)
@@ -1,10 +1,16 @@
-"""File system tools: read, write, edit."""
+"""File system tools: read, write, edit, list."""
 
+import os
+import time
 from pathlib import Path
 from typing import Any
 
 from nanobot.agent.tools.base import Tool
 
+# Directories that are never worth descending into
+DEFAULT_IGNORES = (".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv",
+                   ".mypy_cache", ".pytest_cache", ".ruff_cache", ".tox", ".nox")
+
 
 def _resolve_path(path: str, allowed_dir: Path | None = None) -> Path:
     """Resolve path and optionally enforce directory restriction."""
@@ -16,6 +22,8 @@ def _resolve_path(path: str, allowed_dir: Path | None = None) -> Path:
 
 class ReadFileTool(Tool):
     """Tool to read file contents."""
+
+    idempotent = True
     
     def __init__(self, allowed_dir: Path | None = None):
         self._allowed_dir = allowed_dir
@@ -56,6 +64,9 @@ class ReadFileTool(Tool):
         except Exception as e:
             return f"Error reading file: {str(e)}"
 
+    def memo_paths(self, params: dict[str, Any]) -> list[Path] | None:
+        return _param_paths(params, self._allowed_dir)
+
 
 class WriteFileTool(Tool):
     """Tool to write content to a file."""
@@ -99,6 +110,9 @@ class WriteFileTool(Tool):
         except Exception as e:
             return f"Error writing file: {str(e)}"
 
+    def written_paths(self, params: dict[str, Any]) -> list[Path] | None:
+        return _param_paths(params, self._allowed_dir)
+
 
 class EditFileTool(Tool):
     """Tool to edit a file by replacing text."""
@@ -160,21 +174,33 @@ class EditFileTool(Tool):
         except Exception as e:
             return f"Error editing file: {str(e)}"
 
+    def written_paths(self, params: dict[str, Any]) -> list[Path] | None:
+        return _param_paths(params, self._allowed_dir)
+
 
 class ListDirTool(Tool):
     """Tool to list directory contents."""
-    
+
+    execution_mode = "thread"
+    idempotent = True
+    DEFAULT_LIMIT = 200
+    MAX_LIMIT = 2000
+    MAX_DEPTH = 5
+
     def __init__(self, allowed_dir: Path | None = None):
         self._allowed_dir = allowed_dir
 
     @property
     def name(self) -> str:
         return "list_dir"
-    
+
     @property
     def description(self) -> str:
-        return "List the contents of a directory."
-    
+        return (
+            "List the contents of a directory, one entry per line (directories end with '/'). "
+            "Use depth to recurse and offset/limit to page through large directories."
+        )
+
     @property
     def parameters(self) -> dict[str, Any]:
         return {
@@ -183,29 +209,145 @@ class ListDirTool(Tool):
                 "path": {
                     "type": "string",
                     "description": "The directory path to list"
+                },
+                "depth": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "maximum": self.MAX_DEPTH,
+                    "description": "How many levels to descend (default 1)"
+                },
+                "offset": {
+                    "type": "integer",
+                    "minimum": 0,
+                    "description": "Number of entries to skip (default 0)"
+                },
+                "limit": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "maximum": self.MAX_LIMIT,
+                    "description": f"Maximum entries to return (default {self.DEFAULT_LIMIT})"
+                },
+                "show_size": {
+                    "type": "boolean",
+                    "description": "Include a file size column"
+                },
+                "show_mtime": {
+                    "type": "boolean",
+                    "description": "Include a modification time column"
                 }
             },
             "required": ["path"]
         }
-    
-    async def execute(self, path: str, **kwargs: Any) -> str:
+
+    @staticmethod
+    def _walk(path: str, prefix: str, level: int, depth: int) -> list[tuple[str, os.DirEntry]]:
+        """List one directory (and its descendants down to ``depth``)."""
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            return []
+        out: list[tuple[str, os.DirEntry]] = []
+        for entry in entries:
+            rel = f"{prefix}{entry.name}"
+            out.append((rel, entry))
+            if level < depth and entry.name not in DEFAULT_IGNORES and _is_dir(entry, follow_symlinks=False):
+                out.extend(ListDirTool._walk(entry.path, f"{rel}/", level + 1, depth))
+        return out
+
+    async def execute(
+        self,
+        path: str,
+        depth: int = 1,
+        offset: int = 0,
+        limit: int | None = None,
+        show_size: bool = False,
+        show_mtime: bool = False,
+        **kwargs: Any,
+    ) -> str:
         try:
             dir_path = _resolve_path(path, self._allowed_dir)
             if not dir_path.exists():
                 return f"Error: Directory not found: {path}"
             if not dir_path.is_dir():
                 return f"Error: Not a directory: {path}"
-            
-            items = []
-            for item in sorted(dir_path.iterdir()):
-                prefix = "📁 " if item.is_dir() else "📄 "
-                items.append(f"{prefix}{item.name}")
-            
-            if not items:
+
+            depth = min(max(depth, 1), self.MAX_DEPTH)
+            limit = min(max(limit or self.DEFAULT_LIMIT, 1), self.MAX_LIMIT)
+            offset = max(offset, 0)
+
+            entries = self._walk(str(dir_path), "", 1, depth)
+            if not entries:
                 return f"Directory {path} is empty"
-            
-            return "\n".join(items)
+
+            total = len(entries)
+            page = entries[offset:offset + limit]
+            if not page:
+                return f"Offset {offset} is past the end ({total} entries)"
+
+            lines = []
+            for rel, entry in page:
+                is_dir = _is_dir(entry)
+                cols = []
+                if show_size or show_mtime:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        st = None
+                    if show_size:
+                        size = "-" if is_dir or st is None else _format_size(st.st_size)
+                        cols.append(f"{size:>7}")
+                    if show_mtime:
+                        cols.append(time.strftime("%Y-%m-%d %H:%M", time.localtime(st.st_mtime))
+                                    if st else "-")
+                cols.append(f"{rel}/" if is_dir else rel)
+                lines.append("  ".join(cols))
+
+            if offset:
+                lines.insert(0, f"(entries {offset + 1}-{offset + len(page)} of {total})")
+            omitted = entries[offset + len(page):]
+            if omitted:
+                n_dirs = sum(1 for _, e in omitted if _is_dir(e))
+                lines.append(
+                    f"... {len(omitted)} more entries omitted ({n_dirs} dirs, {len(omitted) - n_dirs} files); "
+                    f"use offset={offset + len(page)} to continue"
+                )
+            return "\n".join(lines)
         except PermissionError as e:
             return f"Error: {e}"
         except Exception as e:
             return f"Error listing directory: {str(e)}"
+
+    def memo_paths(self, params: dict[str, Any]) -> list[Path] | None:
+        # A directory's mtime only covers its direct entries (and not their
+        # size/mtime columns), so only plain one-level listings are memoized.
+        if params.get("depth", 1) > 1 or params.get("show_size") or params.get("show_mtime"):
+            return None
+        return _param_paths(params, self._allowed_dir)
+
+
+def _param_paths(params: dict[str, Any], allowed_dir: Path | None) -> list[Path] | None:
+    """Resolve the ``path`` argument of a filesystem tool call, or None if it is unusable."""
+    try:
+        return [_resolve_path(params["path"], allowed_dir)]
+    except Exception:
+        return None
+
+
+def _is_dir(entry: os.DirEntry, follow_symlinks: bool = True) -> bool:
+    """Directory check that reuses the d_type cached by scandir."""
+    try:
+        return entry.is_dir(follow_symlinks=follow_symlinks)
+    except OSError:
+        return False
+
+
+def _format_size(size: float) -> str:
+    """Human-readable file size."""
+    if size < 1024:
+        return f"{int(size)}B"
+    for unit in ("K", "M", "G", "T"):
+        size /= 1024
+        if size < 1024 or unit == "T":
+            break
+    return f"{size:.1f}{unit}"
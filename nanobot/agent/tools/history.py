@@ -0,0 +1,351 @@
+"""History search tool: ranked search over the HISTORY.md event log and its roll-up layers."""
+
+import gzip
+import hashlib
+import json
+import re
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from nanobot.agent.tools.base import Tool, tool_result
+from nanobot.utils.bm25 import InvertedIndex, tokenize
+
+# "[2025-03-01 10:00] ..." or, for roll-up summaries, "[2025-03-03..2025-03-09] ..."
+ENTRY_DATE_RE = re.compile(r"\[(\d{4}-\d{2}-\d{2})(?:\.\.(\d{4}-\d{2}-\d{2}))?")
+_BLOCK_SEP_RE = re.compile(rb"\n[ \t\r]*\n")
+_EDGE_BYTES = 4096
+
+# Summary layers written by HistoryRollup, finest first, in memory/history/<layer>.md
+LAYERS = ("daily", "weekly", "monthly")
+
+
+class HistoryArchive:
+    """
+    Compressed store of raw history entries that were rolled up, by day.
+
+    Each archived day is one gzip member appended to a monthly segment
+    (``YYYY-MM.md.gz``); ``index.json`` records the byte offset and length
+    of every member, so a day is read back by seeking to it and
+    decompressing only that member.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.index_file = directory / "index.json"
+
+    def days(self) -> dict[str, list[list[Any]]]:
+        """Archived days: "YYYY-MM-DD" -> [[segment, offset, length], ...]."""
+        try:
+            return json.loads(self.index_file.read_text(encoding="utf-8")).get("days", {})
+        except (OSError, ValueError):
+            return {}
+
+    def append(self, day: str, text: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        segment = f"{day[:7]}.md.gz"
+        data = gzip.compress(text.encode("utf-8"))
+        with open(self.directory / segment, "ab") as f:
+            offset = f.tell()
+            f.write(data)
+        days = self.days()
+        days.setdefault(day, []).append([segment, offset, len(data)])
+        tmp = self.index_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"days": days}, separators=(",", ":")), encoding="utf-8")
+        tmp.replace(self.index_file)
+
+    def read(self, day: str) -> str | None:
+        members = self.days().get(day)
+        if not members:
+            return None
+        parts = []
+        for segment, offset, length in members:
+            with open(self.directory / segment, "rb") as f:
+                f.seek(offset)
+                parts.append(gzip.decompress(f.read(length)).decode("utf-8", errors="replace").strip())
+        return "\n\n".join(parts)
+
+
+class HistoryIndex:
+    """
+    Inverted index over the entries of a history file, kept next to it on disk.
+
+    Entries are blank-line separated blocks that start with a ``[YYYY-MM-DD``
+    timestamp or a ``[YYYY-MM-DD..YYYY-MM-DD]`` range; blocks without one
+    belong to the entry before them. Since the file is append-only, each
+    update only reads and indexes the bytes after the saved offset, up to
+    the last complete entry. If the file shrank or the start or end of the
+    indexed part changed (it was edited, replaced or rolled up), the index
+    is rebuilt.
+    """
+
+    VERSION = 2
+
+    def __init__(self, history_file: Path, index_file: Path):
+        self.history_file = history_file
+        self.index_file = index_file
+        self.offset = 0
+        self.head = ""
+        self.entries: list[list[Any]] = []  # [start byte, end byte, first day, last day]; days may be ""
+        self.index = InvertedIndex()
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def update(self) -> None:
+        """Index entries appended since the last update."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+            try:
+                size = self.history_file.stat().st_size
+            except OSError:
+                size = 0
+            if size < self.offset or (self.offset and self._edge_hash(self.offset) != self.head):
+                logger.info(f"{self.history_file.name} was rewritten; rebuilding its index")
+                self._reset()
+            if size > self.offset and self._index_from(self.offset):
+                self._save()
+
+    def read(self, entry: list[Any]) -> str:
+        with open(self.history_file, "rb") as f:
+            f.seek(entry[0])
+            return f.read(entry[1] - entry[0]).decode("utf-8", errors="replace").strip()
+
+    def _reset(self) -> None:
+        self.offset = 0
+        self.head = ""
+        self.entries = []
+        self.index = InvertedIndex()
+
+    def _edge_hash(self, length: int) -> str:
+        """Hash of the first and last bytes of the file's first ``length`` bytes."""
+        try:
+            with open(self.history_file, "rb") as f:
+                digest = hashlib.sha1(f.read(min(length, _EDGE_BYTES)))
+                f.seek(max(length - _EDGE_BYTES, 0))
+                digest.update(f.read(min(length, _EDGE_BYTES)))
+                return digest.hexdigest()
+        except OSError:
+            return ""
+
+    def _index_from(self, offset: int) -> bool:
+        with open(self.history_file, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # Stop at the last blank line: anything after it may still be being written
+        cut = data.rfind(b"\n\n")
+        if cut < 0:
+            return False
+        data = data[:cut + 2]
+
+        last_date = self.entries[-1][3] if self.entries else ""
+        current: list[Any] | None = None
+        pos = 0
+        for sep in [*_BLOCK_SEP_RE.finditer(data), None]:
+            end = sep.start() if sep else len(data)
+            block = data[pos:end]
+            if block.strip():
+                text = block.decode("utf-8", errors="replace").lstrip()
+                m = ENTRY_DATE_RE.match(text)
+                if m or current is None:
+                    if current:
+                        self._add(current)
+                    first = m.group(1) if m else last_date
+                    last_date = (m.group(2) or first) if m else last_date
+                    current = [offset + pos, offset + end, first, last_date]
+                else:
+                    current[1] = offset + end
+            if sep is None:
+                break
+            pos = sep.end()
+        if current:
+            self._add(current)
+
+        self.offset = offset + len(data)
+        self.head = self._edge_hash(self.offset)
+        return True
+
+    def _add(self, entry: list[Any]) -> None:
+        self.index.add(tokenize(self.read(entry)))
+        self.entries.append(entry)
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.index_file.read_text(encoding="utf-8"))
+            if data.get("version") != self.VERSION:
+                return
+            self.offset = data["offset"]
+            self.head = data["head"]
+            self.entries = data["entries"]
+            self.index = InvertedIndex.from_dict(data["index"])
+        except (OSError, ValueError, KeyError, TypeError):
+            self._reset()
+
+    def _save(self) -> None:
+        data = {
+            "version": self.VERSION,
+            "offset": self.offset,
+            "head": self.head,
+            "entries": self.entries,
+            "index": self.index.to_dict(),
+        }
+        try:
+            tmp = self.index_file.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+            tmp.replace(self.index_file)
+        except OSError as e:
+            logger.debug(f"Could not save history index: {e}")
+
+
+class SearchHistoryTool(Tool):
+    """Tool to search past events in memory/HISTORY.md and its roll-up summaries."""
+
+    execution_mode = "thread"
+    idempotent = True
+    MAX_LIMIT = 20
+    MIN_CHARS = 200
+
+    def __init__(self, workspace: Path):
+        memory_dir = workspace / "memory"
+        history_dir = memory_dir / "history"
+        # Recent raw entries first, then summaries from finest to coarsest
+        self._sources = [HistoryIndex(memory_dir / "HISTORY.md", memory_dir / ".history_index.json")]
+        self._sources += [
+            HistoryIndex(history_dir / f"{layer}.md", history_dir / f".{layer}_index.json") for layer in LAYERS
+        ]
+        self._archive = HistoryArchive(history_dir / "archive")
+
+    @property
+    def name(self) -> str:
+        return "search_history"
+
+    @property
+    def description(self) -> str:
+        return ("Search the history log (memory/HISTORY.md) of past conversations and events. "
+                "Older periods are kept as daily, weekly and monthly summaries, which are searched too. "
+                "Returns the best matching entries, most relevant first; without a query, "
+                "the most recent entries. Filter by date with since/until. "
+                "Pass day to get the original entries of a summarized day.")
+
+    @property
+    def parameters(self) -> dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Words to search for (empty for the most recent entries)"
+                },
+                "since": {
+                    "type": "string",
+                    "description": "Only entries on or after this date (YYYY-MM-DD)"
+                },
+                "until": {
+                    "type": "string",
+                    "description": "Only entries on or before this date (YYYY-MM-DD)"
+                },
+                "day": {
+                    "type": "string",
+                    "description": "Return the archived original entries of this date (YYYY-MM-DD) instead of searching"
+                },
+                "limit": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "maximum": self.MAX_LIMIT,
+                    "description": "Maximum number of entries (default 5)"
+                },
+                "max_chars": {
+                    "type": "integer",
+                    "minimum": self.MIN_CHARS,
+                    "description": "Maximum characters of entry text to return (default 4000)"
+                }
+            },
+        }
+
+    def memo_paths(self, params: dict[str, Any]) -> list[Path] | None:
+        return [source.history_file for source in self._sources] + [self._archive.index_file]
+
+    async def execute(
+        self,
+        query: str = "",
+        since: str | None = None,
+        until: str | None = None,
+        day: str | None = None,
+        limit: int = 5,
+        max_chars: int = 4000,
+        **kwargs: Any,
+    ) -> str:
+        try:
+            for value in (since, until, day):
+                if value:
+                    date.fromisoformat(value)
+        except ValueError:
+            return "Error: since, until and day must be dates in YYYY-MM-DD format"
+        max_chars = max(max_chars, self.MIN_CHARS)
+        if day:
+            return self._read_day(day, query, limit, max_chars)
+
+        sources = [s for s in self._sources if s.history_file.exists()]
+        if not sources:
+            return "No history yet"
+        try:
+            for source in sources:
+                source.update()
+        except OSError as e:
+            return f"Error: Could not read history: {e}"
+
+        # Candidates are (source, entry index, score); entries overlap the date range
+        candidates: list[tuple[HistoryIndex, int, float]] = []
+        tokens = tokenize(query) if query.strip() else None
+        for source in sources:
+            in_range = [
+                i for i, (_, _, first, last) in enumerate(source.entries)
+                if (not since or (last and last >= since)) and (not until or (first and first <= until))
+            ]
+            if tokens is None:
+                candidates += [(source, i, 0.0) for i in in_range]
+                continue
+            scores = source.index.search(tokens)
+            candidates += [(source, i, scores[i]) for i in in_range if i in scores]
+        total = sum(len(source.entries) for source in sources)
+        if not candidates:
+            return tool_result("No matching history entries", matches=0, entries=total)
+
+        if tokens is None:
+            # Most recent first; on the same day, detail before summaries
+            order = {id(s): n for n, s in enumerate(sources)}
+            candidates.sort(key=lambda c: (c[0].entries[c[1]][3], -order[id(c[0])], c[1]), reverse=True)
+        else:
+            candidates.sort(key=lambda c: (c[2], c[0].entries[c[1]][3]), reverse=True)
+
+        parts: list[str] = []
+        used = 0
+        for source, i, _ in candidates[:min(limit, self.MAX_LIMIT)]:
+            text = source.read(source.entries[i])
+            if used + len(text) > max_chars:
+                if parts:
+                    break
+                text = text[:max_chars].rstrip() + " ..."
+            parts.append(text)
+            used += len(text)
+        return tool_result("\n\n".join(parts), matches=len(candidates), shown=len(parts), entries=total)
+
+    def _read_day(self, day: str, query: str, limit: int, max_chars: int) -> str:
+        """Original entries of an archived day, filtered by query words if given."""
+        try:
+            text = self._archive.read(day)
+        except OSError as e:
+            return f"Error: Could not read the history archive: {e}"
+        if text is None:
+            return f"Error: No archived entries for {day}; recent days are searched with query/since/until"
+        entries = [e for e in re.split(r"\n[ \t\r]*\n", text) if e.strip()]
+        if wanted := set(tokenize(query)):
+            entries = [e for e in entries if wanted & set(tokenize(e))][:min(limit, self.MAX_LIMIT)]
+        body = "\n\n".join(entries)
+        if len(body) > max_chars:
+            body = body[:max_chars].rstrip() + " ..."
+        return tool_result(body or "No matching entries", day=day, matches=len(entries))
@@ -0,0 +1,237 @@
+"""Out-of-process plugin tools: long-lived workers speaking JSON-RPC 2.0 over stdio."""
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from nanobot.agent.tools.base import Tool, compact_json
+
+
+class PluginError(Exception):
+    """A plugin call failed (worker error, crash or timeout)."""
+
+
+class PluginWorker:
+    """
+    One plugin process, started on first use and kept running between calls.
+
+    Requests are newline-delimited JSON-RPC 2.0 objects written to the worker's
+    stdin; responses are read from its stdout and matched to callers by id, so
+    any number of calls can be in flight at once. A worker that exits is
+    restarted on the next call, unless it keeps crashing.
+
+    Request:  {"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+               "params": {"name": "<tool>", "arguments": {...}}}
+    Response: {"jsonrpc": "2.0", "id": 1, "result": "<text>"}
+              {"jsonrpc": "2.0", "id": 1, "error": {"code": -32000, "message": "..."}}
+    """
+
+    MAX_LINE = 16 * 1024 * 1024
+    MAX_RESTARTS = 3  # crashes tolerated within RESTART_WINDOW seconds
+    RESTART_WINDOW = 60.0
+
+    def __init__(
+        self,
+        name: str,
+        command: list[str],
+        cwd: str | None = None,
+        env: dict[str, str] | None = None,
+        timeout: float = 60.0,
+    ):
+        self.name = name
+        self.command = command
+        self.cwd = cwd
+        self.env = env or {}
+        self.timeout = timeout
+        self._proc: asyncio.subprocess.Process | None = None
+        self._reader: asyncio.Task | None = None
+        self._stderr: asyncio.Task | None = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._start_lock: asyncio.Lock | None = None
+        self._crashes: list[float] = []
+
+    @property
+    def running(self) -> bool:
+        return self._proc is not None and self._proc.returncode is None
+
+    async def _ensure_started(self) -> asyncio.subprocess.Process:
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self.running:
+                return self._proc
+            now = time.monotonic()
+            self._crashes = [t for t in self._crashes if now - t < self.RESTART_WINDOW]
+            if len(self._crashes) >= self.MAX_RESTARTS:
+                raise PluginError(
+                    f"plugin {self.name} crashed {len(self._crashes)} times in the last "
+                    f"{self.RESTART_WINDOW:g}s; not restarting yet"
+                )
+            self._proc = await asyncio.create_subprocess_exec(
+                *self.command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=self.cwd,
+                env={**os.environ, **self.env},
+                limit=self.MAX_LINE,
+            )
+            logger.info(f"Started plugin {self.name} (pid {self._proc.pid})")
+            self._reader = asyncio.create_task(self._read_loop(self._proc))
+            self._stderr = asyncio.create_task(self._log_stderr(self._proc))
+            return self._proc
+
+    async def _read_loop(self, proc: asyncio.subprocess.Process) -> None:
+        """Resolve pending calls from the worker's stdout until it exits."""
+        assert proc.stdout is not None
+        try:
+            while line := await proc.stdout.readline():
+                try:
+                    msg = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Plugin {self.name} wrote a non-JSON line: {line[:200]!r}")
+                    continue
+                future = self._pending.pop(msg.get("id"), None) if isinstance(msg, dict) else None
+                if future is None or future.done():
+                    continue
+                if "error" in msg:
+                    error = msg["error"] if isinstance(msg["error"], dict) else {"message": msg["error"]}
+                    future.set_exception(PluginError(str(error.get("message", error))))
+                else:
+                    future.set_result(msg.get("result"))
+        except (ValueError, asyncio.LimitOverrunError) as e:
+            logger.error(f"Plugin {self.name} response too large: {e}")
+            proc.kill()
+
+        code = await proc.wait()
+        if proc is self._proc:
+            self._crashes.append(time.monotonic())
+            logger.warning(f"Plugin {self.name} exited with code {code}")
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(PluginError(f"plugin {self.name} exited with code {code}"))
+
+    async def _log_stderr(self, proc: asyncio.subprocess.Process) -> None:
+        assert proc.stderr is not None
+        while line := await proc.stderr.readline():
+            logger.debug(f"[plugin {self.name}] {line.decode(errors='replace').rstrip()}")
+
+    async def call(self, tool: str, arguments: dict[str, Any]) -> Any:
+        """Call a tool in the worker and return its result."""
+        proc = await self._ensure_started()
+        self._next_id += 1
+        call_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[call_id] = future
+        request = {
+            "jsonrpc": "2.0",
+            "id": call_id,
+            "method": "tools/call",
+            "params": {"name": tool, "arguments": arguments},
+        }
+        try:
+            assert proc.stdin is not None
+            proc.stdin.write(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+            await proc.stdin.drain()
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        except (BrokenPipeError, ConnectionResetError):
+            raise PluginError(f"plugin {self.name} is not running")
+        except asyncio.TimeoutError:
+            raise PluginError(f"{tool} timed out after {self.timeout:g} seconds")
+        finally:
+            self._pending.pop(call_id, None)
+
+    async def close(self) -> None:
+        """Stop the worker process and wait for it to exit."""
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.returncode is None:
+            try:
+                proc.terminate()
+                await asyncio.wait_for(proc.wait(), timeout=2.0)
+            except ProcessLookupError:
+                pass
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+        for task in (self._reader, self._stderr):
+            if task and not task.done():
+                task.cancel()
+
+    def kill(self) -> None:
+        """Stop the worker process without waiting, for exits that cannot await."""
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.returncode is None:
+            try:
+                proc.terminate()
+            except ProcessLookupError:
+                pass
+
+
+class PluginTool(Tool):
+    """A tool implemented by a plugin worker."""
+
+    def __init__(self, worker: PluginWorker, name: str, description: str, parameters: dict[str, Any]):
+        self.worker = worker
+        self._name = name
+        self._description = description
+        self._parameters = parameters or {"type": "object", "properties": {}}
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def description(self) -> str:
+        return self._description
+
+    @property
+    def parameters(self) -> dict[str, Any]:
+        return self._parameters
+
+    async def execute(self, **kwargs: Any) -> str:
+        try:
+            result = await self.worker.call(self._name, kwargs)
+        except PluginError as e:
+            return f"Error: {e}"
+        if isinstance(result, str):
+            return result
+        if isinstance(result, dict) and isinstance(result.get("content"), str):
+            return result["content"]
+        return compact_json(result)
+
+
+def load_plugin_tools(spec: dict[str, Any], base_dir: Path | None = None) -> list[PluginTool]:
+    """
+    Build the tools declared by one plugin spec, sharing a single worker.
+
+    ``spec`` has ``name``, ``command`` (argv list), optional ``cwd``, ``env`` and
+    ``timeout``, and ``tools``: a list of {name, description, parameters}.
+    Tool schemas are declared up front so the worker need not start until a
+    tool is actually called. A relative ``cwd`` is resolved against ``base_dir``.
+    """
+    command = spec.get("command")
+    if isinstance(command, str):
+        command = command.split()
+    if not command or not spec.get("tools"):
+        raise ValueError(f"plugin {spec.get('name')!r} needs a command and at least one tool")
+    cwd = spec.get("cwd") or None
+    if base_dir is not None:
+        cwd = str(base_dir / cwd) if cwd else str(base_dir)
+    worker = PluginWorker(
+        name=spec.get("name") or spec["tools"][0]["name"],
+        command=[str(c) for c in command],
+        cwd=cwd,
+        env=spec.get("env") or {},
+        timeout=float(spec.get("timeout") or 60),
+    )
+    return [
+        PluginTool(worker, t["name"], t.get("description", ""), t.get("parameters") or {})
+        for t in spec["tools"]
+    ]
@@ -1,8 +1,85 @@
 """Tool registry for dynamic tool management."""
 
+import asyncio
+import fnmatch
+import json
+import multiprocessing
+import os
+import pickle
+import signal
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
 from typing import Any
 
+from loguru import logger
+
 from nanobot.agent.tools.base import Tool
+from nanobot.utils.bm25 import BM25, tokenize
+
+
+@dataclass
+class _MemoEntry:
+    """A memoized tool result and what it depended on."""
+    paths: list[Path]
+    fingerprint: tuple
+    result: str
+    created: float
+    turn: int
+
+
+def _run_tool(tool: Tool, params: dict[str, Any]) -> str:
+    """Run a tool's execute() to completion on a fresh event loop (worker thread or process)."""
+    return asyncio.run(tool.execute(**params))
+
+
+class _CallTimeout(BaseException):
+    """
+    Raised in a process worker when a call exceeds its timeout.
+
+    A BaseException, so a tool's own ``except Exception`` does not swallow it.
+    """
+
+
+def _on_alarm(signum: int, frame: Any) -> None:
+    raise _CallTimeout()
+
+
+def _run_tool_in_process(tool: Tool, params: dict[str, Any], timeout: float) -> str:
+    """
+    Run a tool in a pool worker, interrupting it after ``timeout`` seconds.
+
+    The alarm (Unix only) stops the call inside the worker, so the worker
+    stays usable and nothing has to be killed from outside.
+    """
+    if not hasattr(signal, "setitimer"):
+        return _run_tool(tool, params)
+    signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return _run_tool(tool, params)
+    except _CallTimeout:
+        return f"Error: {tool.name} timed out after {timeout:g} seconds"
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _noop() -> None:
+    """Pool warm-up task."""
+
+
+def _fingerprint(paths: list[Path]) -> tuple:
+    """Stat signature of the given paths (None for missing ones)."""
+    sig = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            sig.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        except OSError:
+            sig.append(None)
+    return tuple(sig)
 
 
 class ToolRegistry:
@@ -10,18 +87,60 @@ class ToolRegistry:
     Registry for agent tools.
     
     Allows dynamic registration and execution of tools.
+
+    Results of idempotent tools are memoized, keyed by the call arguments and
+    the stats of the files they depend on. Repeating a call within the same
+    turn returns a short reference to the earlier result instead of the full
+    content; in later turns the cached result is returned without redoing
+    the I/O. Calls that write files drop the affected entries.
+
+    Tools that cannot work (``Tool.unavailable_reason``) or that match a
+    ``disabled`` pattern are left out of the definitions sent to the model
+    and refuse calls. Availability is re-checked by ``refresh_availability``.
     """
+
+    MEMO_MAX_ENTRIES = 256
+    MEMO_MAX_CHARS = 4_000_000
+    # Extra wait for a process call the worker alarm could not interrupt (e.g. stuck in C code)
+    PROCESS_GRACE = 5.0
+    DEFINITIONS_CACHE_MAX = 32
     
-    def __init__(self):
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        process_timeout: float = 120.0,
+        max_process_arg_bytes: int = 8 * 1024 * 1024,
+        disabled: list[str] | None = None,
+    ):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.process_timeout = process_timeout
+        self.max_process_arg_bytes = max_process_arg_bytes
+        self.disabled = list(disabled or [])  # fnmatch patterns of tool names
+        self._pool: ProcessPoolExecutor | None = None
         self._tools: dict[str, Tool] = {}
+        # Built definition lists, keyed by the selected names (None = all enabled)
+        self._definitions: dict[frozenset[str] | None, list[dict[str, Any]]] = {}
+        self._unavailable: dict[str, str] | None = None  # name -> reason
+        self._index: tuple[tuple[str, ...], BM25] | None = None
+        self._memo: OrderedDict[str, _MemoEntry] = OrderedDict()
+        self._memo_chars = 0
+        self._turn = 0
     
     def register(self, tool: Tool) -> None:
-        """Register a tool."""
+        """Register a tool and compile its parameter validator."""
+        tool.compile_validator()
         self._tools[tool.name] = tool
+        self._changed()
     
     def unregister(self, name: str) -> None:
         """Unregister a tool by name."""
-        self._tools.pop(name, None)
+        if self._tools.pop(name, None) is not None:
+            self._changed()
+    
+    def _changed(self) -> None:
+        self._definitions = {}
+        self._unavailable = None
+        self._index = None
     
     def get(self, name: str) -> Tool | None:
         """Get a tool by name."""
@@ -31,10 +150,170 @@ class ToolRegistry:
         """Check if a tool is registered."""
         return name in self._tools
     
-    def get_definitions(self) -> list[dict[str, Any]]:
-        """Get all tool definitions in OpenAI format."""
-        return [tool.to_schema() for tool in self._tools.values()]
+    def unavailable(self) -> dict[str, str]:
+        """Tools that are registered but hidden, with the reason."""
+        if self._unavailable is None:
+            self._unavailable = {}
+            for name, tool in self._tools.items():
+                if any(fnmatch.fnmatchcase(name, pattern) for pattern in self.disabled):
+                    self._unavailable[name] = "disabled by workspace policy"
+                else:
+                    reason = tool.unavailable_reason()
+                    if reason:
+                        self._unavailable[name] = reason
+        return self._unavailable
+    
+    def refresh_availability(self) -> None:
+        """Re-check tool availability (e.g. once per turn); cached definitions survive if nothing changed."""
+        previous = self._unavailable
+        self._unavailable = None
+        if self.unavailable() != previous:
+            self._definitions = {}
+            self._index = None
+            if previous is not None:
+                logger.info(f"Tool availability changed; hidden tools: {sorted(self._unavailable)}")
+    
+    def enabled_names(self) -> list[str]:
+        """Names of the tools offered to the model, sorted."""
+        hidden = self.unavailable()
+        return sorted(name for name in self._tools if name not in hidden)
+    
+    def get_definitions(self, names: list[str] | None = None) -> list[dict[str, Any]]:
+        """
+        Get tool definitions in OpenAI format.
+
+        Args:
+            names: Only include these tools (see select). None includes every
+                available tool.
+
+        Each list is built once and reused until the tools or their
+        availability change; callers must treat it as read-only. Tools are
+        sorted by name and every object's keys are sorted, so the serialized
+        definitions are byte-identical across runs (a prerequisite for
+        prompt caching).
+        """
+        key = None if names is None else frozenset(names)
+        definitions = self._definitions.get(key)
+        if definitions is None:
+            if len(self._definitions) >= self.DEFINITIONS_CACHE_MAX:
+                self._definitions = {}
+            definitions = self._definitions[key] = [
+                json.loads(json.dumps(self._tools[name].to_schema(), sort_keys=True, ensure_ascii=False))
+                for name in self.enabled_names() if key is None or name in key
+            ]
+        return definitions
     
+    def select(self, query: str, max_tools: int, core: list[str] | None = None) -> list[str] | None:
+        """
+        Pick the tools to offer for one turn.
+
+        The ``core`` tools are always kept; the remaining slots go to the tools
+        whose name and description best match ``query`` (BM25). Returns None
+        (all tools) when the available tools already fit in ``max_tools``.
+        """
+        enabled = self.enabled_names()
+        if max_tools <= 0 or len(enabled) <= max_tools:
+            return None
+        pinned = [name for name in enabled if name in set(core or [])]
+        if self._index is None or self._index[0] != tuple(enabled):
+            documents = [
+                tokenize(f"{name.replace('_', ' ')} {self._tools[name].description}") for name in enabled
+            ]
+            self._index = (tuple(enabled), BM25(documents))
+        scores = dict(zip(enabled, self._index[1].scores(tokenize(query))))
+        ranked = sorted((n for n in enabled if scores[n] > 0 and n not in pinned), key=lambda n: -scores[n])
+        return sorted(pinned + ranked[:max(max_tools - len(pinned), 0)])
+    
+    def begin_turn(self) -> None:
+        """Mark the start of a new agent turn (results from earlier turns are no longer in context)."""
+        self._turn += 1
+
+    def clear_memo(self) -> None:
+        """Forget all memoized results."""
+        self._memo.clear()
+        self._memo_chars = 0
+
+    def _memo_drop(self, key: str) -> None:
+        entry = self._memo.pop(key, None)
+        if entry is not None:
+            self._memo_chars -= len(entry.result)
+
+    def _memo_store(self, key: str, entry: _MemoEntry) -> None:
+        self._memo_drop(key)
+        self._memo[key] = entry
+        self._memo_chars += len(entry.result)
+        while self._memo and (len(self._memo) > self.MEMO_MAX_ENTRIES or self._memo_chars > self.MEMO_MAX_CHARS):
+            self._memo_drop(next(iter(self._memo)))
+
+    def _invalidate(self, written: list[Path] | None) -> None:
+        """Drop memo entries that depend on written paths (all file-backed ones if unknown)."""
+        stale = []
+        for key, entry in self._memo.items():
+            if not entry.paths:
+                continue
+            if written is None or any(
+                p == w or p in w.parents for w in written for p in entry.paths
+            ):
+                stale.append(key)
+        for key in stale:
+            self._memo_drop(key)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Create the process pool on first use and start all workers up front."""
+        if self._pool is None:
+            # spawn: the loop process runs threads (litellm, asyncio), which fork does not mix with
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+            for _ in range(self.max_workers):
+                self._pool.submit(_noop)
+        return self._pool
+
+    def warm(self) -> None:
+        """Start the process pool now if any registered tool uses it."""
+        if any(t.execution_mode == "process" for t in self._tools.values()):
+            self._get_pool()
+
+    def close(self) -> None:
+        """Shut down the process pool."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _retire_pool(self) -> None:
+        """
+        Replace the process pool after a call could not be interrupted.
+
+        A running call cannot be cancelled, so the old pool is shut down
+        without waiting: calls already on it (the overrunning one and any
+        from other sessions) finish there and its workers exit afterwards,
+        while new calls go to a fresh pool.
+        """
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=False)
+
+    async def _dispatch(self, tool: Tool, params: dict[str, Any]) -> str:
+        """Run a tool according to its execution mode."""
+        mode = tool.execution_mode
+        if mode == "thread":
+            return await asyncio.to_thread(_run_tool, tool, params)
+        if mode != "process":
+            return await tool.execute(**params)
+
+        size = len(pickle.dumps((tool, params)))
+        if size > self.max_process_arg_bytes:
+            return (f"Error: Arguments for {tool.name} are too large for process execution "
+                    f"({size} > {self.max_process_arg_bytes} bytes)")
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_pool(), _run_tool_in_process, tool, params, self.process_timeout)
+        try:
+            return await asyncio.wait_for(future, timeout=self.process_timeout + self.PROCESS_GRACE)
+        except asyncio.TimeoutError:
+            logger.warning(f"Tool {tool.name} timed out after {self.process_timeout}s; moving on to a new process pool")
+            self._retire_pool()
+            return f"Error: {tool.name} timed out after {self.process_timeout:g} seconds"
+
     async def execute(self, name: str, params: dict[str, Any]) -> str:
         """
         Execute a tool by name with given parameters.
@@ -52,12 +331,39 @@ class ToolRegistry:
         tool = self._tools.get(name)
         if not tool:
             return f"Error: Tool '{name}' not found"
+        reason = self.unavailable().get(name)
+        if reason:
+            return f"Error: Tool '{name}' is not available: {reason}"
 
         try:
             errors = tool.validate_params(params)
             if errors:
                 return f"Error: Invalid parameters for tool '{name}': " + "; ".join(errors)
-            return await tool.execute(**params)
+
+            key = paths = fingerprint = None
+            if tool.idempotent:
+                paths = tool.memo_paths(params)
+            if paths is not None:
+                key = f"{name}:{json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)}"
+                fingerprint = _fingerprint(paths)
+                entry = self._memo.get(key)
+                if entry is not None:
+                    expired = tool.memo_ttl is not None and time.monotonic() - entry.created > tool.memo_ttl
+                    if not expired and entry.fingerprint == fingerprint:
+                        self._memo.move_to_end(key)
+                        if entry.turn == self._turn:
+                            return (f"(Unchanged since the previous {name} call with the same arguments "
+                                    f"earlier in this turn; refer to that result.)")
+                        entry.turn = self._turn
+                        return entry.result
+
+            result = await self._dispatch(tool, params)
+
+            if key is not None and not result.startswith("Error"):
+                self._memo_store(key, _MemoEntry(paths, fingerprint, result, time.monotonic(), self._turn))
+            elif not tool.idempotent:
+                self._invalidate(tool.written_paths(params))
+            return result
         except Exception as e:
             return f"Error executing {name}: {str(e)}"
     
@@ -0,0 +1,366 @@
+"""File search tools: glob over a cached directory tree."""
+
+import fnmatch
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from nanobot.agent.tools.base import Tool
+from nanobot.agent.tools.filesystem import DEFAULT_IGNORES, _resolve_path
+
+IGNORE_FILES = (".gitignore", ".ignore")
+
+# Directories modified this recently are rescanned on every refresh, since a
+# second change within the same mtime tick would otherwise go unnoticed.
+_RACY_NS = 2_000_000_000
+
+
+class _DirNode:
+    """Snapshot of one directory: its mtime at scan time, file names and child nodes."""
+
+    __slots__ = ("mtime_ns", "files", "dirs")
+
+    def __init__(self) -> None:
+        self.mtime_ns = -1
+        self.files: list[str] = []
+        self.dirs: dict[str, "_DirNode"] = {}
+
+
+class _IgnoreRules:
+    """Minimal gitignore-style matcher for the ignore files at a tree root."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._stamp: tuple[tuple[str, int], ...] = ()
+        self._rules: list[tuple[bool, bool, bool, str]] = []  # (negate, dir_only, anchored, pattern)
+
+    def refresh(self) -> bool:
+        """Reload the ignore files if any changed. Returns True when the rules changed."""
+        stamp = []
+        for name in IGNORE_FILES:
+            try:
+                stamp.append((name, os.stat(self.root / name).st_mtime_ns))
+            except OSError:
+                continue
+        stamp = tuple(stamp)
+        if stamp == self._stamp:
+            return False
+
+        rules = []
+        for name, _ in stamp:
+            try:
+                lines = (self.root / name).read_text(encoding="utf-8", errors="replace").splitlines()
+            except OSError:
+                continue
+            for line in lines:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                negate = line.startswith("!")
+                line = line.lstrip("!")
+                dir_only = line.endswith("/")
+                line = line.rstrip("/")
+                anchored = "/" in line
+                if line:
+                    rules.append((negate, dir_only, anchored, line.lstrip("/")))
+        self._stamp, self._rules = stamp, rules
+        return True
+
+    def ignored(self, rel: str, name: str, is_dir: bool) -> bool:
+        """Check a path (relative to the root, posix separators) against the rules."""
+        if is_dir and name in DEFAULT_IGNORES:
+            return True
+        result = False
+        for negate, dir_only, anchored, pattern in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if fnmatch.fnmatchcase(rel if anchored else name, pattern):
+                result = not negate
+        return result
+
+
+class _Tree:
+    """
+    In-memory snapshot of a directory tree.
+
+    Directories are listed with ``os.scandir`` and reused as long as their
+    mtime is unchanged, so a refresh costs one ``stat`` per visited directory
+    instead of a full re-listing. Searches refresh the nodes they visit,
+    so they go through ``find``, which runs one search at a time.
+    """
+
+    def __init__(self, root: Path, respect_ignore: bool = True):
+        self.root = root
+        self.node = _DirNode()
+        self.ignore = _IgnoreRules(root) if respect_ignore else None
+        self._lock = threading.Lock()
+
+    def find(
+        self, rel: str, max_depth: int | None, keep: Callable[[str, bool], Any],
+    ) -> list[tuple[str, bool]] | None:
+        """Entries below ``rel`` (see ``walk``) that ``keep`` accepts; None if ``rel`` is not in the tree."""
+        with self._lock:
+            node = self.locate(rel)
+            if node is None:
+                return None
+            return [(sub, is_dir) for sub, is_dir in self.walk(rel, node, max_depth) if keep(sub, is_dir)]
+
+    def _scan(self, path: str, rel: str, node: _DirNode) -> None:
+        """Refresh a single directory node if its mtime moved."""
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            node.mtime_ns, node.files, node.dirs = -1, [], {}
+            return
+        if mtime_ns == node.mtime_ns and time.time_ns() - mtime_ns > _RACY_NS:
+            return
+
+        files, dirs = [], {}
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    child_rel = f"{rel}/{entry.name}" if rel else entry.name
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if self.ignore and self.ignore.ignored(child_rel, entry.name, is_dir):
+                        continue
+                    if is_dir:
+                        dirs[entry.name] = node.dirs.get(entry.name) or _DirNode()
+                    else:
+                        files.append(entry.name)
+        except OSError:
+            # Unreadable directories (e.g. no permission) are skipped, and
+            # retried on the next refresh since a chmod leaves mtime alone.
+            node.mtime_ns, node.files, node.dirs = -1, [], {}
+            return
+        files.sort()
+        node.mtime_ns, node.files, node.dirs = mtime_ns, files, dict(sorted(dirs.items()))
+
+    def locate(self, rel: str) -> _DirNode | None:
+        """Find the node for a directory relative to the root, refreshing ancestors."""
+        if self.ignore and self.ignore.refresh():
+            self.node = _DirNode()
+        node, path, cur = self.node, str(self.root), ""
+        self._scan(path, cur, node)
+        for part in (p for p in rel.split("/") if p):
+            node = node.dirs.get(part)
+            if node is None:
+                return None
+            path, cur = os.path.join(path, part), f"{cur}/{part}" if cur else part
+            self._scan(path, cur, node)
+        return node
+
+    def walk(self, rel: str, node: _DirNode, max_depth: int | None) -> Iterator[tuple[str, bool]]:
+        """Yield (path relative to ``rel``, is_dir) for every entry below ``node``."""
+        base = os.path.join(str(self.root), rel) if rel else str(self.root)
+        stack: list[tuple[str, str, _DirNode, int]] = [(base, "", node, 1)]
+        while stack:
+            path, sub, cur, depth = stack.pop()
+            for name in cur.files:
+                yield (f"{sub}/{name}" if sub else name), False
+            for name, child in reversed(cur.dirs.items()):
+                child_sub = f"{sub}/{name}" if sub else name
+                yield child_sub, True
+                if max_depth is None or depth < max_depth:
+                    child_rel = f"{rel}/{child_sub}" if rel else child_sub
+                    self._scan(os.path.join(path, name), child_rel, child)
+                    stack.append((os.path.join(path, name), child_sub, child, depth + 1))
+
+
+def _glob_to_regex(pattern: str) -> re.Pattern[str]:
+    """Translate a glob with ``**`` support into a regex over posix relative paths."""
+    out, i, n = [], 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            j = pattern.find("]", i + 2 if pattern[i + 1:i + 2] in ("!", "]") else i + 1)
+            if j == -1:
+                out.append(re.escape(c))
+                i += 1
+            else:
+                body = pattern[i + 1:j]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = j + 1
+        elif c == "{":
+            j = pattern.find("}", i)
+            if j == -1:
+                out.append(re.escape(c))
+                i += 1
+            else:
+                alts = pattern[i + 1:j].split(",")
+                out.append("(?:" + "|".join(re.escape(a) for a in alts) + ")")
+                i = j + 1
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return re.compile("".join(out) + r"\Z")
+
+
+def _split_pattern(pattern: str) -> tuple[str, str, int | None]:
+    """Split a pattern into a literal directory prefix, the remaining glob and its max depth."""
+    parts = [p for p in pattern.strip().split("/") if p and p != "."]
+    prefix = []
+    while len(parts) > 1 and not any(ch in parts[0] for ch in "*?[{"):
+        prefix.append(parts.pop(0))
+    rest = "/".join(parts)
+    depth = None if "**" in rest else len(parts)
+    return "/".join(prefix), rest, depth
+
+
+class GlobTool(Tool):
+    """Tool to find files by glob pattern using a cached directory tree."""
+
+    execution_mode = "thread"
+    MAX_LIMIT = 1000
+    MAX_TREES = 8
+
+    def __init__(self, workspace: Path, allowed_dir: Path | None = None):
+        self._workspace = workspace.expanduser().resolve()
+        self._allowed_dir = allowed_dir
+        self._trees: dict[tuple[Path, bool], _Tree] = {}
+        self._trees_lock = threading.Lock()  # calls run in worker threads
+
+    @property
+    def name(self) -> str:
+        return "glob"
+
+    @property
+    def description(self) -> str:
+        return (
+            "Find files matching a glob pattern in one call. Supports *, ?, [abc], {a,b} "
+            "and ** for any number of directories (e.g. '**/*.py', 'src/**/test_*.py'). "
+            "Skips .git, node_modules and paths listed in .gitignore."
+        )
+
+    @property
+    def parameters(self) -> dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "pattern": {
+                    "type": "string",
+                    "description": "Glob pattern relative to path, e.g. '**/*.md'"
+                },
+                "path": {
+                    "type": "string",
+                    "description": "Directory to search in (default: workspace)"
+                },
+                "sort": {
+                    "type": "string",
+                    "enum": ["name", "mtime"],
+                    "description": "Sort by path name or by modification time (newest first)"
+                },
+                "limit": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "maximum": self.MAX_LIMIT,
+                    "description": "Maximum number of results (default 100)"
+                },
+                "include_dirs": {
+                    "type": "boolean",
+                    "description": "Also return matching directories"
+                },
+                "no_ignore": {
+                    "type": "boolean",
+                    "description": "Do not apply .gitignore / .ignore rules"
+                }
+            },
+            "required": ["pattern"]
+        }
+
+    def _tree_for(self, root: Path, respect_ignore: bool) -> _Tree:
+        """Return the cached tree rooted at ``root``, keeping the most recently used ones."""
+        key = (root, respect_ignore)
+        with self._trees_lock:
+            tree = self._trees.pop(key, None) or _Tree(root, respect_ignore)
+            self._trees[key] = tree
+            while len(self._trees) > self.MAX_TREES:
+                self._trees.pop(next(iter(self._trees)))
+        return tree
+
+    async def execute(
+        self,
+        pattern: str,
+        path: str | None = None,
+        sort: str = "name",
+        limit: int = 100,
+        include_dirs: bool = False,
+        no_ignore: bool = False,
+        **kwargs: Any,
+    ) -> str:
+        try:
+            base = _resolve_path(path, self._allowed_dir) if path else self._workspace
+            if not base.is_dir():
+                return f"Error: Not a directory: {path}"
+
+            prefix, rest, max_depth = _split_pattern(pattern)
+            if not rest:
+                return "Error: Empty pattern"
+            regex = _glob_to_regex(rest)
+
+            def _keep(sub: str, is_dir: bool) -> bool:
+                return (include_dirs or not is_dir) and regex.match(sub) is not None
+
+            start = (base / prefix).resolve() if prefix else base
+            # The literal prefix may contain '..'; it must not leave the allowed directory
+            if self._allowed_dir:
+                allowed = self._allowed_dir.resolve()
+                if start != allowed and allowed not in start.parents:
+                    return f"Error: Pattern {pattern} is outside allowed directory {self._allowed_dir}"
+            # Searches inside the workspace share one snapshot; anything else
+            # (or an ignored directory named explicitly) gets its own tree.
+            found = None
+            if start == self._workspace or self._workspace in start.parents:
+                tree = self._tree_for(self._workspace, not no_ignore)
+                start_rel = start.relative_to(self._workspace).as_posix() if start != self._workspace else ""
+                found = tree.find(start_rel, max_depth, _keep)
+            if found is None:
+                if not start.is_dir():
+                    return f"No matches for {pattern}"
+                found = self._tree_for(start, not no_ignore).find("", max_depth, _keep) or []
+
+            matches = [(f"{prefix}/{sub}" if prefix else sub, is_dir) for sub, is_dir in found]
+
+            if not matches:
+                return f"No matches for {pattern}"
+
+            if sort == "mtime":
+                def _mtime(match: tuple[str, bool]) -> float:
+                    try:
+                        return os.stat(base / match[0]).st_mtime
+                    except OSError:
+                        return 0.0
+                matches.sort(key=_mtime, reverse=True)
+            else:
+                matches.sort()
+
+            limit = min(max(limit, 1), self.MAX_LIMIT)
+            shown = matches[:limit]
+            lines = [f"{m}/" if is_dir else m for m, is_dir in shown]
+            if len(matches) > limit:
+                lines.append(f"... {len(matches) - limit} more matches not shown "
+                             f"(narrow the pattern or raise limit)")
+            return "\n".join(lines)
+        except PermissionError as e:
+            return f"Error: {e}"
+        except Exception as e:
+            return f"Error searching files: {str(e)}"
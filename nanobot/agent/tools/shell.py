@@ -7,6 +7,7 @@ from pathlib import Path
 from typing import Any
 
 from nanobot.agent.tools.base import Tool
+from nanobot.agent.tools.spill import SpillStore
 
 
 class ExecTool(Tool):
@@ -19,6 +20,7 @@ class ExecTool(Tool):
         deny_patterns: list[str] | None = None,
         allow_patterns: list[str] | None = None,
         restrict_to_workspace: bool = False,
+        spill: SpillStore | None = None,
     ):
         self.timeout = timeout
         self.working_dir = working_dir
@@ -35,6 +37,7 @@ class ExecTool(Tool):
         ]
         self.allow_patterns = allow_patterns or []
         self.restrict_to_workspace = restrict_to_workspace
+        self.spill = spill
     
     @property
     def name(self) -> str:
@@ -105,16 +108,27 @@ class ExecTool(Tool):
             
             result = "\n".join(output_parts) if output_parts else "(no output)"
             
-            # Truncate very long output
-            max_len = 10000
+            # Truncate very long output, keeping the full text in the spill store
+            max_len = self.spill.threshold if self.spill else 10000
             if len(result) > max_len:
-                result = result[:max_len] + f"\n... (truncated, {len(result) - max_len} more chars)"
+                if self.spill:
+                    result = self.spill.excerpt(result, max_len)
+                else:
+                    result = result[:max_len] + f"\n... (truncated, {len(result) - max_len} more chars)"
             
             return result
             
         except Exception as e:
             return f"Error executing command: {str(e)}"
 
+    def written_paths(self, params: dict[str, Any]) -> list[Path] | None:
+        # Arbitrary commands can touch any file
+        return None
+
+    def check_command(self, command: str) -> str | None:
+        """Guard verdict for a command run outside this tool (e.g. typed into a terminal); None if allowed."""
+        return self._guard_command(command, self.working_dir or os.getcwd())
+
     def _guard_command(self, command: str, cwd: str) -> str | None:
         """Best-effort safety guard for potentially destructive commands."""
         cmd = command.strip()
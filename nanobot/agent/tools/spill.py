@@ -0,0 +1,160 @@
+"""Spill store for oversized tool output, plus the read_output paging tool."""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from nanobot.agent.tools.base import Tool
+from nanobot.utils.helpers import ensure_dir
+
+
+class SpillStore:
+    """
+    Content-addressed store for full tool outputs that are too large to inline.
+
+    Each output is saved once under its SHA-256 prefix, so re-running the same
+    command does not duplicate it. The least recently used outputs are evicted
+    once the store grows past ``max_bytes``.
+    """
+
+    HANDLE_LEN = 12
+
+    def __init__(self, root: Path, threshold: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.root = root
+        self.threshold = threshold
+        self.max_bytes = max_bytes
+
+    def _path(self, handle: str) -> Path | None:
+        if len(handle) != self.HANDLE_LEN or not all(c in "0123456789abcdef" for c in handle):
+            return None
+        return self.root / f"{handle}.txt"
+
+    def put(self, text: str) -> str:
+        """Store text and return its handle."""
+        data = text.encode("utf-8")
+        handle = hashlib.sha256(data).hexdigest()[:self.HANDLE_LEN]
+        path = ensure_dir(self.root) / f"{handle}.txt"
+        if path.exists():
+            os.utime(path)
+        else:
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            self._evict(keep=path)
+        return handle
+
+    def get(self, handle: str) -> str | None:
+        """Load stored text by handle, marking it as recently used."""
+        path = self._path(handle)
+        if path is None or not path.exists():
+            return None
+        os.utime(path)
+        return path.read_text(encoding="utf-8")
+
+    def _evict(self, keep: Path) -> None:
+        """Delete least recently used outputs until the store fits in max_bytes."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.root):
+            if entry.name.endswith(".txt") and entry.is_file():
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            if path == str(keep):
+                continue
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            logger.debug(f"Spill store evicted {path}")
+            if total <= self.max_bytes:
+                break
+
+    def excerpt(self, text: str, limit: int | None = None, handle: str | None = None) -> str:
+        """
+        Return text unchanged if it fits in ``limit`` chars, otherwise store it
+        and return head and tail excerpts around a read_output pointer.
+        """
+        limit = limit or self.threshold
+        if len(text) <= limit:
+            return text
+        handle = handle or self.put(text)
+        head_len = limit * 2 // 3
+        tail_len = limit - head_len
+        head, tail = text[:head_len], text[-tail_len:] if tail_len else ""
+        # Prefer cutting on line boundaries when one is close by
+        cut = head.rfind("\n", max(head_len - 200, 0))
+        if cut > 0:
+            head = head[:cut + 1]
+        cut = tail.find("\n", 0, 200)
+        if cut >= 0:
+            tail = tail[cut + 1:]
+        omitted_from = len(head)
+        omitted = len(text) - len(head) - len(tail)
+        return (
+            f"{head}\n... [{omitted} chars omitted; full output ({len(text)} chars) saved as "
+            f"handle {handle}. Use read_output(handle=\"{handle}\", offset={omitted_from}) to page through it] ...\n"
+            f"{tail}"
+        )
+
+
+class ReadOutputTool(Tool):
+    """Tool to page through tool output saved in the spill store."""
+
+    idempotent = True  # handles are content-addressed
+    MAX_LIMIT = 50000
+
+    def __init__(self, store: SpillStore):
+        self._store = store
+
+    @property
+    def name(self) -> str:
+        return "read_output"
+
+    @property
+    def description(self) -> str:
+        return ("Read part of a large tool output that was cut short. "
+                "Pass the handle from the truncation notice plus a character offset and limit.")
+
+    @property
+    def parameters(self) -> dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "handle": {
+                    "type": "string",
+                    "description": "Output handle from the truncation notice"
+                },
+                "offset": {
+                    "type": "integer",
+                    "minimum": 0,
+                    "description": "Character offset to start from (default 0)"
+                },
+                "limit": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "maximum": self.MAX_LIMIT,
+                    "description": "Number of characters to return (default 10000)"
+                }
+            },
+            "required": ["handle"]
+        }
+
+    async def execute(self, handle: str, offset: int = 0, limit: int = 10000, **kwargs: Any) -> str:
+        text = self._store.get(handle.strip())
+        if text is None:
+            return f"Error: No stored output with handle {handle} (it may have been evicted)"
+        total = len(text)
+        if offset >= total:
+            return f"Error: Offset {offset} is past the end ({total} chars)"
+        end = min(offset + min(limit, self.MAX_LIMIT), total)
+        footer = f"\n[chars {offset}-{end} of {total}"
+        footer += f"; continue with offset={end}]" if end < total else "; end of output]"
+        return text[offset:end] + footer
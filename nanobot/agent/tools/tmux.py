@@ -0,0 +1,260 @@
+"""tmux tool: send keys, capture panes and wait for output without polling."""
+
+import asyncio
+import os
+import re
+import shutil
+import tempfile
+import time
+from typing import Any, Callable
+
+from nanobot.agent.tools.base import Tool
+
+# CSI / OSC / two-byte escape sequences emitted by terminal programs
+_ANSI_RE = re.compile(r"\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)|\x1b[@-Z\\-_]")
+
+
+def strip_ansi(text: str) -> str:
+    """Remove terminal escape sequences and carriage returns from pane output."""
+    return _ANSI_RE.sub("", text).replace("\r", "")
+
+
+class TmuxTool(Tool):
+    """
+    Tool to drive interactive programs running in tmux panes.
+
+    ``wait_for`` attaches ``tmux pipe-pane`` to a FIFO and matches the pane's
+    output as it arrives, so it returns as soon as the pattern shows up instead
+    of re-capturing the pane on a timer.
+
+    Typed keys end up running in a shell, so ``guard`` (ExecTool's
+    ``check_command``) vets them like an exec command before they are sent.
+    """
+
+    MAX_TIMEOUT = 600
+    MAX_LINES = 5000
+    # New output is matched together with this much of the preceding text,
+    # so patterns split across reads are still found.
+    OVERLAP = 4096
+    MAX_BUFFER = 256 * 1024
+    requires_bins = ("tmux",)
+
+    def __init__(self, socket: str | None = None, guard: Callable[[str], str | None] | None = None):
+        self.socket = socket
+        self.guard = guard
+
+    @property
+    def name(self) -> str:
+        return "tmux"
+
+    @property
+    def description(self) -> str:
+        return (
+            "Control tmux panes running interactive programs. "
+            "send_keys: type text (and optionally Enter) into a pane. "
+            "capture: return recent pane text. "
+            "wait_for: block until a regex (or fixed string) appears in the pane's output, "
+            "returning immediately on match."
+        )
+
+    @property
+    def parameters(self) -> dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "action": {
+                    "type": "string",
+                    "enum": ["send_keys", "capture", "wait_for"],
+                    "description": "Operation to perform"
+                },
+                "target": {
+                    "type": "string",
+                    "description": "Pane target: session, session:window or session:window.pane"
+                },
+                "socket": {
+                    "type": "string",
+                    "description": "tmux socket path (tmux -S); default server if omitted"
+                },
+                "keys": {
+                    "type": "string",
+                    "description": "send_keys: text to type, or key names (e.g. 'C-c') with literal=false"
+                },
+                "literal": {
+                    "type": "boolean",
+                    "description": "send_keys: send keys as literal text (default true)"
+                },
+                "enter": {
+                    "type": "boolean",
+                    "description": "send_keys: press Enter afterwards (default true)"
+                },
+                "pattern": {
+                    "type": "string",
+                    "description": "wait_for: regex to wait for"
+                },
+                "fixed": {
+                    "type": "boolean",
+                    "description": "wait_for: treat pattern as a plain string"
+                },
+                "new_only": {
+                    "type": "boolean",
+                    "description": "wait_for: ignore text already on screen and only match new output"
+                },
+                "timeout": {
+                    "type": "number",
+                    "minimum": 0,
+                    "maximum": self.MAX_TIMEOUT,
+                    "description": "wait_for: seconds to wait (default 15)"
+                },
+                "lines": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "maximum": self.MAX_LINES,
+                    "description": "capture: history lines to return (default 200); wait_for: lines of context returned (default 20)"
+                }
+            },
+            "required": ["action", "target"]
+        }
+
+    async def _tmux(self, socket: str | None, *args: str) -> tuple[int, str]:
+        """Run one tmux command, returning (exit code, stdout or stderr)."""
+        cmd = ["tmux"]
+        if socket or self.socket:
+            cmd += ["-S", os.path.expanduser(socket or self.socket)]
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await proc.communicate()
+        if proc.returncode:
+            return proc.returncode, stderr.decode(errors="replace").strip()
+        return 0, stdout.decode(errors="replace")
+
+    async def _capture(self, socket: str | None, target: str, lines: int | None) -> tuple[int, str]:
+        args = ["capture-pane", "-p", "-J", "-t", target]
+        if lines:
+            args += ["-S", f"-{lines}"]
+        code, out = await self._tmux(socket, *args)
+        return code, out.rstrip("\n") if code == 0 else out
+
+    async def execute(
+        self,
+        action: str,
+        target: str,
+        socket: str | None = None,
+        keys: str | None = None,
+        literal: bool = True,
+        enter: bool = True,
+        pattern: str | None = None,
+        fixed: bool = False,
+        new_only: bool = False,
+        timeout: float = 15,
+        lines: int | None = None,
+        **kwargs: Any,
+    ) -> str:
+        if not shutil.which("tmux"):
+            return "Error: tmux is not installed"
+        try:
+            if action == "send_keys":
+                if not keys and not enter:
+                    return "Error: send_keys needs keys or enter=true"
+                if keys and self.guard:
+                    guard_error = self.guard(keys)
+                    if guard_error:
+                        return guard_error
+                args: list[str] = []
+                if keys:
+                    args += ["send-keys", "-t", target] + (["-l", "--", keys] if literal else keys.split())
+                if enter:
+                    args += ([";"] if args else []) + ["send-keys", "-t", target, "Enter"]
+                code, out = await self._tmux(socket, *args)
+                return f"Error: {out}" if code else f"Sent to {target}"
+
+            if action == "capture":
+                code, out = await self._capture(socket, target, min(lines or 200, self.MAX_LINES))
+                return f"Error: {out}" if code else out
+
+            if action == "wait_for":
+                if not pattern:
+                    return "Error: wait_for needs a pattern"
+                try:
+                    regex = re.compile(re.escape(pattern) if fixed else pattern, re.MULTILINE)
+                except re.error as e:
+                    return f"Error: Invalid pattern: {e}"
+                return await self._wait_for(
+                    socket, target, regex, new_only,
+                    min(max(timeout, 0), self.MAX_TIMEOUT), min(lines or 20, self.MAX_LINES),
+                )
+
+            return f"Error: Unknown action: {action}"
+        except Exception as e:
+            return f"Error running tmux: {str(e)}"
+
+    async def _wait_for(
+        self, socket: str | None, target: str, regex: re.Pattern[str],
+        new_only: bool, timeout: float, lines: int,
+    ) -> str:
+        start = time.monotonic()
+        tmpdir = tempfile.mkdtemp(prefix="nanobot-tmux-")
+        fifo = os.path.join(tmpdir, "pane.fifo")
+        os.mkfifo(fifo, 0o600)
+        # Hold a write end open ourselves so the reader never sees EOF while
+        # pipe-pane's writer is starting up or gets restarted.
+        read_fd = os.open(fifo, os.O_RDONLY | os.O_NONBLOCK)
+        write_fd = os.open(fifo, os.O_WRONLY | os.O_NONBLOCK)
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(read_fd, "rb", buffering=0),
+        )
+        piped = False
+        try:
+            code, out = await self._tmux(socket, "pipe-pane", "-O", "-t", target, f"cat >> '{fifo}'")
+            if code:
+                return f"Error: {out}"
+            piped = True
+
+            # Pipe first, then look at the screen, so nothing printed in between is missed
+            if not new_only:
+                code, screen = await self._capture(socket, target, None)
+                if code:
+                    return f"Error: {screen}"
+                match = regex.search(screen)
+                if match:
+                    return await self._matched(socket, target, match, start, lines)
+
+            buf, scanned = "", 0
+            deadline = start + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    chunk = await asyncio.wait_for(reader.read(65536), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if not chunk:
+                    break
+                buf += strip_ansi(chunk.decode(errors="replace"))
+                match = regex.search(buf, max(scanned - self.OVERLAP, 0))
+                if match:
+                    return await self._matched(socket, target, match, start, lines)
+                scanned = len(buf)
+                if len(buf) > self.MAX_BUFFER:
+                    cut = len(buf) - self.MAX_BUFFER // 2
+                    buf, scanned = buf[cut:], scanned - cut
+
+            _, screen = await self._capture(socket, target, lines)
+            return (f"Error: Timed out after {timeout:g}s waiting for {regex.pattern!r}. "
+                    f"Last {lines} lines of {target}:\n{screen}")
+        finally:
+            if piped:
+                await self._tmux(socket, "pipe-pane", "-t", target)
+            transport.close()
+            os.close(write_fd)
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    async def _matched(
+        self, socket: str | None, target: str, match: re.Match[str], start: float, lines: int,
+    ) -> str:
+        elapsed = time.monotonic() - start
+        _, screen = await self._capture(socket, target, lines)
+        return f"Matched {match.group(0)!r} after {elapsed:.1f}s. Last {lines} lines of {target}:\n{screen}"
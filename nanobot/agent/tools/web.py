@@ -1,7 +1,6 @@
 """Web tools: web_search and web_fetch."""
 
 import html
-import json
 import os
 import re
 from typing import Any
@@ -9,7 +8,8 @@ from urllib.parse import urlparse
 
 import httpx
 
-from nanobot.agent.tools.base import Tool
+from nanobot.agent.tools.base import Tool, compact_json, tool_result
+from nanobot.agent.tools.spill import SpillStore
 
 # Shared constants
 USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_7_2) AppleWebKit/537.36"
@@ -61,6 +61,9 @@ class WebSearchTool(Tool):
         self.api_key = api_key or os.environ.get("BRAVE_API_KEY", "")
         self.max_results = max_results
     
+    def unavailable_reason(self) -> str | None:
+        return None if self.api_key else "BRAVE_API_KEY not configured"
+    
     async def execute(self, query: str, count: int | None = None, **kwargs: Any) -> str:
         if not self.api_key:
             return "Error: BRAVE_API_KEY not configured"
@@ -93,6 +96,8 @@ class WebSearchTool(Tool):
 class WebFetchTool(Tool):
     """Fetch and extract content from a URL using Readability."""
     
+    idempotent = True
+    memo_ttl = 300.0
     name = "web_fetch"
     description = "Fetch URL and extract readable content (HTML → markdown/text)."
     parameters = {
@@ -105,8 +110,9 @@ class WebFetchTool(Tool):
         "required": ["url"]
     }
     
-    def __init__(self, max_chars: int = 50000):
+    def __init__(self, max_chars: int = 50000, spill: SpillStore | None = None):
         self.max_chars = max_chars
+        self.spill = spill
     
     async def execute(self, url: str, extractMode: str = "markdown", maxChars: int | None = None, **kwargs: Any) -> str:
         from readability import Document
@@ -116,7 +122,7 @@ class WebFetchTool(Tool):
         # Validate URL before fetching
         is_valid, error_msg = _validate_url(url)
         if not is_valid:
-            return json.dumps({"error": f"URL validation failed: {error_msg}", "url": url})
+            return f"Error: URL validation failed: {error_msg} ({url})"
 
         try:
             async with httpx.AsyncClient(
@@ -131,7 +137,7 @@ class WebFetchTool(Tool):
             
             # JSON
             if "application/json" in ctype:
-                text, extractor = json.dumps(r.json(), indent=2), "json"
+                text, extractor = compact_json(r.json()), "json"
             # HTML
             elif "text/html" in ctype or r.text[:256].lower().startswith(("<!doctype", "<html")):
                 doc = Document(r.text)
@@ -141,14 +147,23 @@ class WebFetchTool(Tool):
             else:
                 text, extractor = r.text, "raw"
             
-            truncated = len(text) > max_chars
-            if truncated:
+            full_length = len(text)
+            truncated = full_length > max_chars
+            handle = None
+            if truncated and self.spill:
+                handle = self.spill.put(text)
+                text = self.spill.excerpt(text, max_chars, handle=handle)
+            elif truncated:
                 text = text[:max_chars]
             
-            return json.dumps({"url": url, "finalUrl": str(r.url), "status": r.status_code,
-                              "extractor": extractor, "truncated": truncated, "length": len(text), "text": text})
+            final_url = str(r.url)
+            return tool_result(
+                text, url=url, final_url=final_url if final_url != url else None, status=r.status_code,
+                extractor=extractor, truncated=truncated, length=len(text),
+                full_length=full_length if truncated else None, handle=handle,
+            )
         except Exception as e:
-            return json.dumps({"error": str(e), "url": url})
+            return f"Error fetching {url}: {e}"
     
     def _to_markdown(self, html: str) -> str:
         """Convert HTML to markdown."""
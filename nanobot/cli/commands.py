@@ -1,6 +1,7 @@
 """CLI commands for nanobot - simplified version."""
 
 import asyncio
+import json
 import os
 import signal
 from pathlib import Path
@@ -279,6 +280,8 @@ def agent(
     from nanobot.config.loader import load_config, get_data_dir
     from nanobot.bus.queue import MessageBus
     from nanobot.agent.loop import AgentLoop
+    from nanobot.session.manager import SessionManager
+    from nanobot.session.store import create_session_store
     from loguru import logger
 
     config = load_config()
@@ -300,9 +303,24 @@ def agent(
         max_tokens=config.agents.defaults.max_tokens,
         max_iterations=config.agents.defaults.max_tool_iterations,
         memory_window=config.agents.defaults.memory_window,
+        context_window=config.agents.defaults.context_window,
+        turn_budget=config.agents.defaults.turn_budget,
+        full_turns=config.agents.defaults.full_turns,
+        consolidation_concurrency=config.agents.defaults.consolidation_concurrency,
+        memory_max_chars=config.agents.defaults.memory_max_chars,
+        memory_budget=config.agents.defaults.memory_budget,
+        history_recent_days=config.agents.defaults.history_recent_days,
         brave_api_key=config.tools.web.search.api_key or None,
         exec_config=config.tools.exec,
         restrict_to_workspace=config.tools.restrict_to_workspace,
+        session_manager=SessionManager(
+            config.workspace_path, create_session_store(config.workspace_path, config.sessions.store),
+            tail_messages=config.agents.defaults.memory_window,
+        ),
+        spill_config=config.tools.spill,
+        process_pool_config=config.tools.process_pool,
+        plugin_configs=config.tools.plugins,
+        tool_policy=config.tools.policy,
     )
 
     def _thinking_ctx():
@@ -316,9 +334,12 @@ def agent(
 
     if message:
         async def run_once():
-            with _thinking_ctx():
-                response = await agent_loop.process_direct(message, session_id, on_progress=_cli_progress)
-            _print_agent_response(response, render_markdown=markdown)
+            try:
+                with _thinking_ctx():
+                    response = await agent_loop.process_direct(message, session_id, on_progress=_cli_progress)
+                _print_agent_response(response, render_markdown=markdown)
+            finally:
+                await agent_loop.close()
 
         asyncio.run(run_once())
     else:
@@ -328,9 +349,12 @@ def agent(
         def _exit_on_sigint(signum, frame):
             _restore_terminal()
             console.print("\nGoodbye!")
+            agent_loop.close_now()
             os._exit(0)
 
         signal.signal(signal.SIGINT, _exit_on_sigint)
+        # Start tool worker processes while the user types the first message
+        agent_loop.tools.warm()
 
         async def run_interactive():
             try:
@@ -359,7 +383,7 @@ def agent(
                         console.print("\nGoodbye!")
                         break
             finally:
-                pass
+                await agent_loop.close()
 
         asyncio.run(run_interactive())
 
@@ -457,5 +481,102 @@ def skills_show(
     console.print(content)
 
 
+# ============================================================================
+# Session Commands
+# ============================================================================
+
+
+sessions_app = typer.Typer(help="Manage stored sessions")
+app.add_typer(sessions_app, name="sessions")
+
+
+@sessions_app.command("migrate")
+def sessions_migrate(
+    overwrite: bool = typer.Option(False, "--overwrite", help="Replace sessions already in the database"),
+):
+    """Import JSONL session files into the SQLite session store."""
+    from nanobot.config.loader import load_config
+    from nanobot.session.store import create_session_store, migrate_sessions
+
+    config = load_config()
+    source = create_session_store(config.workspace_path, "jsonl")
+    target = create_session_store(config.workspace_path, "sqlite")
+    try:
+        copied, skipped = migrate_sessions(source, target, overwrite=overwrite)
+    finally:
+        target.close()
+
+    console.print(f"{__logo__} Imported {copied} session(s) into {target.path}")
+    if skipped:
+        console.print(f"[yellow]Skipped {skipped} session(s) already in the database (use --overwrite)[/yellow]")
+    if config.sessions.store != "sqlite":
+        console.print('Set [cyan]"sessions": {"store": "sqlite"}[/cyan] in config.json to use it.')
+
+
+@sessions_app.command("read")
+def sessions_read(
+    key: str = typer.Argument(..., help="Session key, e.g. telegram:12345"),
+    index: int = typer.Argument(..., help="Message index (negative counts from the end)"),
+):
+    """Print the full content of one stored message."""
+    from nanobot.config.loader import load_config
+    from nanobot.session.store import create_session_store
+
+    config = load_config()
+    store = create_session_store(config.workspace_path, config.sessions.store)
+    try:
+        messages = store.read_messages(key, index, index + 1 if index != -1 else None)
+    finally:
+        store.close()
+
+    if not messages:
+        console.print(f"[red]No message {index} in session {key}[/red]")
+        raise typer.Exit(1)
+    content = messages[0].get("content")
+    typer.echo(content if isinstance(content, str) else json.dumps(content, ensure_ascii=False))
+
+
+# ============================================================================
+# Stats Commands
+# ============================================================================
+
+
+stats_app = typer.Typer(help="Show usage statistics")
+app.add_typer(stats_app, name="stats")
+
+
+@stats_app.command("prompt")
+def stats_prompt(
+    last: int = typer.Option(200, "--last", "-n", help="Number of recent LLM calls to include"),
+    session: str = typer.Option(None, "--session", "-s", help="Only calls from this session"),
+):
+    """Show what fills the prompt: token percentiles per section."""
+    from rich.table import Table
+    from nanobot.config.loader import load_config
+    from nanobot.agent.stats import PromptStatsLog, summarize
+
+    config = load_config()
+    records = PromptStatsLog(config.workspace_path).read(limit=last if not session else 100_000)
+    if session:
+        records = [r for r in records if r.get("session") == session][-last:]
+    if not records:
+        console.print("No prompt statistics recorded yet.")
+        return
+
+    table = Table(title=f"Prompt size over {len(records)} LLM calls (estimated tokens)")
+    table.add_column("Section", style="cyan")
+    table.add_column("p50", justify="right")
+    table.add_column("p90", justify="right")
+    table.add_column("max", justify="right")
+    table.add_column("Share", justify="right", style="yellow")
+    table.add_column("Calls", justify="right", style="dim")
+
+    for row in summarize(records):
+        share = f"{row['share']:.1%}" if row["share"] is not None else ""
+        table.add_row(row["section"], str(row["p50"]), str(row["p90"]), str(row["max"]), share, str(row["calls"]))
+
+    console.print(table)
+
+
 if __name__ == "__main__":
     app()
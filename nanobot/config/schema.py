@@ -1,6 +1,8 @@
 """Configuration schema using Pydantic."""
 
 from pathlib import Path
+from typing import Any
+
 from pydantic import BaseModel, Field, ConfigDict
 from pydantic_settings import BaseSettings
 
@@ -20,6 +22,13 @@ class AgentDefaults(Base):
     temperature: float = 0.7
     max_tool_iterations: int = 20
     memory_window: int = 50
+    context_window: int = 0  # model input tokens; 0 = look up from the model name
+    turn_budget: int = 0  # prompt tokens within a turn before used tool results are compacted; 0 = half the context window
+    full_turns: int = 4  # recent turns replayed verbatim; large messages in older turns are elided
+    consolidation_concurrency: int = 1  # memory consolidation jobs running at once across sessions
+    memory_max_chars: int = 32000  # size of MEMORY.md above which the facts reinforced longest ago move to HISTORY.md; 0 = no limit
+    memory_budget: int = 2000  # tokens of MEMORY.md in the prompt; beyond this only relevant entries are included; 0 = all
+    history_recent_days: int = 7  # days of raw HISTORY.md entries kept; older ones are rolled up into summaries; 0 = never
 
 
 class AgentsConfig(Base):
@@ -61,20 +70,67 @@ class ExecToolConfig(Base):
     timeout: int = 60
 
 
+class SpillConfig(Base):
+    """Storage for tool output too large to return inline."""
+
+    threshold: int = 10000  # chars of exec output returned inline
+    max_store_mb: int = 64
+
+
+class ProcessPoolConfig(Base):
+    """Worker processes for CPU-bound tools (execution_mode = "process")."""
+
+    max_workers: int = 0  # 0 = min(4, CPU count)
+    timeout: int = 120  # seconds per call
+    max_arg_mb: int = 8  # pickled argument size limit
+
+
+class PluginConfig(Base):
+    """A long-lived plugin worker process and the tools it serves."""
+
+    name: str = ""
+    command: list[str] = Field(default_factory=list)  # argv, e.g. ["python", "tools.py"]
+    cwd: str = ""
+    env: dict[str, str] = Field(default_factory=dict)
+    timeout: int = 60  # seconds per call
+    tools: list[dict[str, Any]] = Field(default_factory=list)  # {name, description, parameters}
+
+
+class ToolPolicyConfig(Base):
+    """Which tools are offered to the model."""
+
+    disabled: list[str] = Field(default_factory=list)  # tool names or fnmatch patterns, e.g. "jira_*"
+    max_tools: int = 0  # tools offered per turn, chosen by relevance to the message; 0 = all
+    core: list[str] = Field(default_factory=lambda: [
+        "read_file", "write_file", "edit_file", "list_dir", "exec", "read_output",
+    ])  # always offered when max_tools applies
+
+
 class ToolsConfig(Base):
     """Tools configuration."""
 
     web: WebToolsConfig = Field(default_factory=WebToolsConfig)
     exec: ExecToolConfig = Field(default_factory=ExecToolConfig)
+    spill: SpillConfig = Field(default_factory=SpillConfig)
+    process_pool: ProcessPoolConfig = Field(default_factory=ProcessPoolConfig)
+    plugins: list[PluginConfig] = Field(default_factory=list)
+    policy: ToolPolicyConfig = Field(default_factory=ToolPolicyConfig)
     restrict_to_workspace: bool = False
 
 
+class SessionsConfig(Base):
+    """Session storage configuration."""
+
+    store: str = "jsonl"  # "jsonl" (one file per session) or "sqlite" (sessions/sessions.db)
+
+
 class Config(BaseSettings):
     """Root configuration for nanobot."""
 
     agents: AgentsConfig = Field(default_factory=AgentsConfig)
     providers: ProvidersConfig = Field(default_factory=ProvidersConfig)
     tools: ToolsConfig = Field(default_factory=ToolsConfig)
+    sessions: SessionsConfig = Field(default_factory=SessionsConfig)
 
     @property
     def workspace_path(self) -> Path:
@@ -10,6 +10,8 @@ from litellm import acompletion
 
 from nanobot.providers.base import LLMProvider, LLMResponse, ToolCallRequest
 
+_EPHEMERAL = {"type": "ephemeral"}
+
 
 class LiteLLMProvider(LLMProvider):
     """LLM provider using LiteLLM for OpenRouter and Ollama."""
@@ -53,6 +55,9 @@ class LiteLLMProvider(LLMProvider):
         model = model or self.default_model
         max_tokens = max(1, max_tokens)
 
+        if self._supports_cache_control(model):
+            messages = self._with_cache_control(messages)
+
         kwargs: dict[str, Any] = {
             "model": model,
             "messages": messages,
@@ -81,6 +86,40 @@ class LiteLLMProvider(LLMProvider):
                 finish_reason="error",
             )
 
+    @staticmethod
+    def _supports_cache_control(model: str) -> bool:
+        """Whether the model takes Anthropic-style cache_control breakpoints (directly or via OpenRouter)."""
+        name = model.lower()
+        return "claude" in name or "anthropic/" in name
+
+    @staticmethod
+    def _with_cache_control(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Return a copy of messages with cache breakpoints on the system prompt
+        and on the last message that has content.
+
+        The first breakpoint caches tools + system prompt; the second caches
+        the conversation so far, which the next request (a tool loop iteration
+        or the next turn) extends. The input list is not modified.
+        """
+        out = list(messages)
+        targets = set()
+        if out and out[0].get("role") == "system" and out[0].get("content"):
+            targets.add(0)
+        last = next((i for i in range(len(out) - 1, -1, -1) if out[i].get("content")), None)
+        if last is not None:
+            targets.add(last)
+        for i in targets:
+            msg, content = out[i], out[i]["content"]
+            if isinstance(content, str):
+                blocks = [{"type": "text", "text": content, "cache_control": _EPHEMERAL}]
+            elif isinstance(content, list) and isinstance(content[-1], dict):
+                blocks = [*content[:-1], {**content[-1], "cache_control": _EPHEMERAL}]
+            else:
+                continue
+            out[i] = {**msg, "content": blocks}
+        return out
+
     def _parse_response(self, response: Any) -> LLMResponse:
         """Parse LiteLLM response."""
         choice = response.choices[0]
@@ -105,6 +144,14 @@ class LiteLLMProvider(LLMProvider):
                 "completion_tokens": response.usage.completion_tokens,
                 "total_tokens": response.usage.total_tokens,
             }
+            # Prompt cache hits/writes, where the provider reports them
+            details = getattr(response.usage, "prompt_tokens_details", None)
+            cached = getattr(details, "cached_tokens", None) or getattr(response.usage, "cache_read_input_tokens", None)
+            if cached:
+                usage["cached_tokens"] = cached
+            written = getattr(response.usage, "cache_creation_input_tokens", None)
+            if written:
+                usage["cache_write_tokens"] = written
 
         return LLMResponse(
             content=message.content,
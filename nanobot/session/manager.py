@@ -1,14 +1,105 @@
 """Session management for conversation history."""
 
 import json
+import shlex
 from pathlib import Path
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any
+from typing import TYPE_CHECKING, Any, Callable, Iterator
 
-from loguru import logger
+from nanobot.utils.tokens import message_tokens
 
-from nanobot.utils.helpers import ensure_dir, safe_filename
+if TYPE_CHECKING:
+    from nanobot.session.store import SessionStore
+
+
+class MessageLog:
+    """
+    Message list of a session loaded tail first.
+
+    Only the last messages are decoded on load. The older ones (the head)
+    are read with ``load_head`` the first time an index before the tail is
+    accessed, e.g. by consolidation of old messages or by a full export.
+    Supports the list operations sessions use: len, indexing, slicing,
+    iteration and append.
+    """
+
+    def __init__(
+        self,
+        tail: list[dict[str, Any]],
+        head_count: int,
+        head_user_turns: int,
+        load_head: Callable[[], list[dict[str, Any]]],
+        head_ref: Any = None,
+    ):
+        self._head: list[dict[str, Any]] | None = None if head_count else []
+        self._tail = tail
+        self.head_count = head_count
+        self.head_user_turns = head_user_turns
+        self._load_head = load_head
+        self.head_ref = head_ref  # where the store keeps the head (backend-specific)
+
+    @property
+    def loaded(self) -> bool:
+        """True once the head has been read."""
+        return self._head is not None
+
+    @property
+    def tail(self) -> list[dict[str, Any]]:
+        """Messages from index ``head_count`` on."""
+        return self._tail
+
+    def load(self) -> None:
+        """Read the head now."""
+        if self._head is None:
+            head = self._load_head()
+            if len(head) != self.head_count:
+                raise ValueError(f"Session store returned {len(head)} older messages, expected {self.head_count}")
+            self._head = head
+
+    def __len__(self) -> int:
+        return self.head_count + len(self._tail)
+
+    def __getitem__(self, index: int | slice) -> Any:
+        n = self.head_count
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1 and start >= n:
+                return self._tail[start - n:max(stop - n, 0)]
+            self.load()
+            return (self._head + self._tail)[index]
+        if index < 0:
+            index += len(self)
+        if index >= n:
+            return self._tail[index - n]
+        if index < 0:
+            raise IndexError("message index out of range")
+        self.load()
+        return self._head[index]
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        self.load()
+        yield from self._head
+        yield from self._tail
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (MessageLog, list)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def append(self, message: dict[str, Any]) -> None:
+        self._tail.append(message)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else f"{self.head_count} not loaded"
+        return f"MessageLog({len(self)} messages, head {state})"
+
+
+def count_user_turns(messages: "list[dict[str, Any]] | MessageLog") -> int:
+    """Number of user messages, without reading an unloaded head."""
+    if isinstance(messages, MessageLog) and not messages.loaded:
+        return messages.head_user_turns + sum(1 for m in messages.tail if m["role"] == "user")
+    return sum(1 for m in messages if m["role"] == "user")
 
 
 @dataclass
@@ -16,7 +107,7 @@ class Session:
     """
     A conversation session.
 
-    Stores messages in JSONL format for easy reading and persistence.
+    Persisted by a SessionStore (JSONL files by default).
 
     Important: Messages are append-only for LLM cache efficiency.
     The consolidation process writes summaries to MEMORY.md/HISTORY.md
@@ -24,11 +115,22 @@ class Session:
     """
 
     key: str  # channel:chat_id
-    messages: list[dict[str, Any]] = field(default_factory=list)
+    messages: list[dict[str, Any]] | MessageLog = field(default_factory=list)
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
     metadata: dict[str, Any] = field(default_factory=dict)
     last_consolidated: int = 0  # Number of messages already consolidated to files
+    source: str | None = field(default=None, repr=False)  # On-disk record, for elision pointers
+    _elided: dict[int, tuple[str, int]] = field(default_factory=dict, repr=False, compare=False)
+    _stored: int | None = field(default=None, repr=False, compare=False)  # leading messages already in the store
+
+    # Messages from older turns longer than ELIDE_CHARS are replayed as their
+    # first lines plus a pointer to the full record. The boundary of "older"
+    # advances ELIDE_BLOCK turns at a time so the replayed prefix stays
+    # byte-identical (and cacheable) between those steps.
+    ELIDE_CHARS = 2000
+    ELIDE_LINES = 6
+    ELIDE_BLOCK = 4
     
     def add_message(self, role: str, content: str, **kwargs: Any) -> None:
         """Add a message to the session."""
@@ -38,14 +140,92 @@ class Session:
             "timestamp": datetime.now().isoformat(),
             **kwargs
         }
+        # Cached with the record so history selection never re-tokenizes
+        msg["tokens"] = message_tokens(msg)
         self.messages.append(msg)
         self.updated_at = datetime.now()
     
-    def get_history(self, max_messages: int = 500) -> list[dict[str, Any]]:
-        """Get recent messages in LLM format, preserving tool metadata."""
+    def _elision_boundary(self, keep_turns: int) -> int:
+        """Index before which large messages are elided (0 = none)."""
+        messages = self.messages
+        first = skipped = 0
+        if isinstance(messages, MessageLog) and not messages.loaded:
+            # Count the unread head's user turns so the alignment is the same as for a full list
+            first, skipped = messages.head_count, messages.head_user_turns
+        user_turns = [i for i in range(first, len(messages)) if messages[i]["role"] == "user"]
+        old = skipped + len(user_turns) - keep_turns
+        old -= old % self.ELIDE_BLOCK
+        if old <= 0:
+            return 0
+        if old < skipped:
+            messages.load()
+            return self._elision_boundary(keep_turns)
+        return user_turns[old - skipped]
+    
+    def _elide(self, index: int) -> tuple[str, int]:
+        """Compact form of a large message: its first lines and where to find the rest."""
+        if index not in self._elided:
+            content = self.messages[index]["content"]
+            head = "\n".join(content.splitlines()[:self.ELIDE_LINES])[:self.ELIDE_CHARS // 2]
+            if self.source:
+                # Record 0 of the session file is the metadata line. The row is
+                # returned JSON-encoded, so size the budget from the encoded text.
+                size = len(json.dumps(content, ensure_ascii=False))
+                where = (f'query_data(path="{self.source}", op="head", offset={index + 1}, limit=1, '
+                         f'select=["content"], max_chars={size + 200})')
+            else:
+                # Stores without a readable file (SQLite) are read through the CLI
+                where = f'exec(command="nanobot sessions read {shlex.quote(self.key)} {index}")'
+            text = (f"{head}\n[... {len(content) - len(head)} more chars of this earlier message elided; "
+                    f"full text: {where}]")
+            self._elided[index] = (text, message_tokens({"content": text}))
+        return self._elided[index]
+    
+    def get_history(
+        self,
+        max_messages: int = 500,
+        max_tokens: int | None = None,
+        keep_turns: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Get recent messages in LLM format, preserving tool metadata.
+
+        With ``max_tokens``, takes the most recent messages that fit in that
+        many tokens (at most ``max_messages``), using each message's cached
+        token count, and starts the window at a user turn where possible.
+
+        With ``keep_turns``, the last ``keep_turns`` user turns are replayed
+        verbatim and large messages before them are elided; the stored
+        messages are not changed.
+        """
+        n = len(self.messages)
+        lo = max(n - max_messages, 0)
+        boundary = self._elision_boundary(keep_turns) if keep_turns is not None else 0
+
+        def render(i: int) -> tuple[Any, int]:
+            m = self.messages[i]
+            content = m.get("content", "")
+            if i < boundary and isinstance(content, str) and len(content) > self.ELIDE_CHARS:
+                return self._elide(i)
+            if "tokens" not in m:  # records written before token caching
+                m["tokens"] = message_tokens(m)
+            return content, m["tokens"]
+
+        start = lo
+        if max_tokens is not None:
+            start, used = n, 0
+            while start > lo:
+                tokens = render(start - 1)[1]
+                if used + tokens > max_tokens:
+                    break
+                used += tokens
+                start -= 1
+            start = next((i for i in range(start, n) if self.messages[i]["role"] == "user"), start)
+
         out: list[dict[str, Any]] = []
-        for m in self.messages[-max_messages:]:
-            entry: dict[str, Any] = {"role": m["role"], "content": m.get("content", "")}
+        for i in range(start, n):
+            m = self.messages[i]
+            entry: dict[str, Any] = {"role": m["role"], "content": render(i)[0]}
             for k in ("tool_calls", "tool_call_id", "name"):
                 if k in m:
                     entry[k] = m[k]
@@ -55,6 +235,8 @@ class Session:
     def clear(self) -> None:
         """Clear all messages and reset session to initial state."""
         self.messages = []
+        self._elided = {}
+        self._stored = None
         self.last_consolidated = 0
         self.updated_at = datetime.now()
 
@@ -63,25 +245,24 @@ class SessionManager:
     """
     Manages conversation sessions.
 
-    Sessions are stored as JSONL files in the sessions directory.
+    Sessions are kept in memory once loaded and persisted through a
+    SessionStore: JSONL files in the sessions directory by default.
+    Loading decodes only the last ``tail_messages`` messages (plus up to
+    as many more that are not consolidated yet); older messages are read
+    when first accessed. The agent sets ``tail_messages`` to its
+    memory_window: that many messages make up the replayed history, and
+    consolidation starts once that many are unconsolidated, so twice the
+    window covers both in normal operation.
     """
 
-    def __init__(self, workspace: Path):
+    def __init__(self, workspace: Path, store: "SessionStore | None" = None, tail_messages: int = 50):
+        from nanobot.session.store import create_session_store
+
         self.workspace = workspace
-        self.sessions_dir = ensure_dir(self.workspace / "sessions")
-        self.legacy_sessions_dir = Path.home() / ".nanobot" / "sessions"
+        self.store = store or create_session_store(workspace)
+        self.tail_messages = tail_messages
         self._cache: dict[str, Session] = {}
     
-    def _get_session_path(self, key: str) -> Path:
-        """Get the file path for a session."""
-        safe_key = safe_filename(key.replace(":", "_"))
-        return self.sessions_dir / f"{safe_key}.jsonl"
-
-    def _get_legacy_session_path(self, key: str) -> Path:
-        """Legacy global session path (~/.nanobot/sessions/)."""
-        safe_key = safe_filename(key.replace(":", "_"))
-        return self.legacy_sessions_dir / f"{safe_key}.jsonl"
-    
     def get_or_create(self, key: str) -> Session:
         """
         Get an existing session or create a new one.
@@ -95,74 +276,17 @@ class SessionManager:
         if key in self._cache:
             return self._cache[key]
         
-        session = self._load(key)
+        session = self.store.load(key, tail=self.tail_messages)
         if session is None:
             session = Session(key=key)
+        session.source = self.store.source(key)
         
         self._cache[key] = session
         return session
     
-    def _load(self, key: str) -> Session | None:
-        """Load a session from disk."""
-        path = self._get_session_path(key)
-        if not path.exists():
-            legacy_path = self._get_legacy_session_path(key)
-            if legacy_path.exists():
-                import shutil
-                shutil.move(str(legacy_path), str(path))
-                logger.info(f"Migrated session {key} from legacy path")
-
-        if not path.exists():
-            return None
-
-        try:
-            messages = []
-            metadata = {}
-            created_at = None
-            last_consolidated = 0
-
-            with open(path) as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    data = json.loads(line)
-
-                    if data.get("_type") == "metadata":
-                        metadata = data.get("metadata", {})
-                        created_at = datetime.fromisoformat(data["created_at"]) if data.get("created_at") else None
-                        last_consolidated = data.get("last_consolidated", 0)
-                    else:
-                        messages.append(data)
-
-            return Session(
-                key=key,
-                messages=messages,
-                created_at=created_at or datetime.now(),
-                metadata=metadata,
-                last_consolidated=last_consolidated
-            )
-        except Exception as e:
-            logger.warning(f"Failed to load session {key}: {e}")
-            return None
-    
     def save(self, session: Session) -> None:
-        """Save a session to disk."""
-        path = self._get_session_path(session.key)
-
-        with open(path, "w") as f:
-            metadata_line = {
-                "_type": "metadata",
-                "created_at": session.created_at.isoformat(),
-                "updated_at": session.updated_at.isoformat(),
-                "metadata": session.metadata,
-                "last_consolidated": session.last_consolidated
-            }
-            f.write(json.dumps(metadata_line) + "\n")
-            for msg in session.messages:
-                f.write(json.dumps(msg) + "\n")
-
+        """Save a session to the store."""
+        self.store.save(session)
         self._cache[session.key] = session
     
     def invalidate(self, key: str) -> None:
@@ -171,22 +295,8 @@ class SessionManager:
     
     def list_sessions(self) -> list[dict[str, Any]]:
         """List all sessions."""
-        sessions = []
-
-        for path in self.sessions_dir.glob("*.jsonl"):
-            try:
-                with open(path) as f:
-                    first_line = f.readline().strip()
-                    if first_line:
-                        data = json.loads(first_line)
-                        if data.get("_type") == "metadata":
-                            sessions.append({
-                                "key": path.stem,
-                                "created_at": data.get("created_at"),
-                                "updated_at": data.get("updated_at"),
-                                "path": str(path)
-                            })
-            except Exception:
-                continue
-
-        return sorted(sessions, key=lambda x: x.get("updated_at", ""), reverse=True)
+        return self.store.list_sessions()
+
+    def close(self) -> None:
+        """Close the store."""
+        self.store.close()
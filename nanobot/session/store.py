@@ -0,0 +1,451 @@
+"""Storage backends for sessions: JSONL files (default) or a SQLite database."""
+
+import json
+import shutil
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from nanobot.session.manager import MessageLog, Session, count_user_turns
+from nanobot.utils.helpers import ensure_dir, safe_filename
+
+_BLOCK = 1 << 16
+
+
+def _tail_start(count: int, last_consolidated: int, tail: int) -> int:
+    """
+    First message to decode for a tail-first load: the last ``tail``
+    messages, extended by up to ``tail`` more so that messages not
+    consolidated yet are usually in memory too.
+
+    With ``tail`` set to the memory window, the extension covers the
+    unconsolidated backlog until consolidation (triggered at one window)
+    catches up; a larger backlog reads the head once, when consolidation
+    first reaches into it.
+    """
+    return max(min(count - tail, last_consolidated), count - 2 * tail, 0)
+
+
+class SessionStore(ABC):
+    """
+    Persistence backend behind SessionManager.
+
+    Backends load and save whole sessions and list what they hold; range
+    reads let callers fetch part of a long session without loading it.
+    """
+
+    @abstractmethod
+    def load(self, key: str, tail: int | None = None) -> Session | None:
+        """
+        Load a session, or None if it does not exist (or cannot be read).
+
+        With ``tail``, only about the last ``tail`` messages are decoded;
+        the session's messages are then a MessageLog that reads the older
+        ones on first access.
+        """
+
+    @abstractmethod
+    def save(self, session: Session) -> None:
+        """Persist a session's metadata and messages."""
+
+    @abstractmethod
+    def list_sessions(self) -> list[dict[str, Any]]:
+        """Stored sessions as {key, created_at, updated_at, path} dicts, newest first."""
+
+    @abstractmethod
+    def read_messages(self, key: str, start: int = 0, end: int | None = None) -> list[dict[str, Any]]:
+        """Messages ``start:end`` of a stored session (negative indexes count from the end)."""
+
+    def source(self, key: str) -> str | None:
+        """File a session's messages can be read from with query_data, if there is one."""
+        return None
+
+    def close(self) -> None:
+        """Release resources (connections, handles)."""
+
+
+class JsonlSessionStore(SessionStore):
+    """
+    One JSONL file per session: a metadata line, then one line per message.
+
+    The metadata line records the message and user turn counts, so a tail
+    load reads it and then the file backwards from the end in blocks until
+    it has the tail lines; the head is only remembered by its byte length.
+    Saving rewrites the file, copying an unread head byte for byte.
+    """
+
+    def __init__(self, sessions_dir: Path, legacy_sessions_dir: Path | None = None):
+        self.sessions_dir = ensure_dir(sessions_dir)
+        self.legacy_sessions_dir = legacy_sessions_dir
+
+    def _get_session_path(self, key: str) -> Path:
+        """Get the file path for a session."""
+        safe_key = safe_filename(key.replace(":", "_"))
+        return self.sessions_dir / f"{safe_key}.jsonl"
+
+    def _get_legacy_session_path(self, key: str) -> Path | None:
+        """Legacy global session path (~/.nanobot/sessions/)."""
+        if self.legacy_sessions_dir is None:
+            return None
+        safe_key = safe_filename(key.replace(":", "_"))
+        return self.legacy_sessions_dir / f"{safe_key}.jsonl"
+
+    def source(self, key: str) -> str | None:
+        return str(self._get_session_path(key))
+
+    def load(self, key: str, tail: int | None = None) -> Session | None:
+        path = self._get_session_path(key)
+        if not path.exists():
+            legacy_path = self._get_legacy_session_path(key)
+            if legacy_path and legacy_path.exists():
+                shutil.move(str(legacy_path), str(path))
+                logger.info(f"Migrated session {key} from legacy path")
+
+        if not path.exists():
+            return None
+
+        if tail is not None:
+            try:
+                session = self._load_tail(key, path, tail)
+                if session is not None:
+                    return session
+            except Exception as e:
+                logger.warning(f"Failed to load the tail of session {key}, loading all of it: {e}")
+
+        try:
+            messages = []
+            metadata = {}
+            created_at = None
+            last_consolidated = 0
+
+            with open(path) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+
+                    data = json.loads(line)
+
+                    if data.get("_type") == "metadata":
+                        metadata = data.get("metadata", {})
+                        created_at = datetime.fromisoformat(data["created_at"]) if data.get("created_at") else None
+                        last_consolidated = data.get("last_consolidated", 0)
+                    else:
+                        messages.append(data)
+
+            return Session(
+                key=key,
+                messages=messages,
+                created_at=created_at or datetime.now(),
+                metadata=metadata,
+                last_consolidated=last_consolidated
+            )
+        except Exception as e:
+            logger.warning(f"Failed to load session {key}: {e}")
+            return None
+
+    def _load_tail(self, key: str, path: Path, tail: int) -> Session | None:
+        """Decode the metadata line and the tail; None if a full load is needed (or as cheap)."""
+        with open(path, "rb") as f:
+            first = f.readline()
+            meta = json.loads(first)
+            if meta.get("_type") != "metadata" or "message_count" not in meta or "user_turns" not in meta:
+                return None  # written before the counts were recorded
+            count = meta["message_count"]
+            start = _tail_start(count, meta.get("last_consolidated", 0), tail)
+            if start == 0:
+                return None
+            n = count - start
+
+            # Read blocks backwards until the buffer holds n whole lines
+            head_start = len(first)
+            size = pos = f.seek(0, 2)
+            buf = b""
+            while pos > head_start and buf.count(b"\n") <= n:
+                step = min(_BLOCK, pos - head_start)
+                pos -= step
+                f.seek(pos)
+                buf = f.read(step) + buf
+
+        lines = buf.split(b"\n")
+        if lines[-1]:
+            return None  # no trailing newline: not written by save()
+        lines = lines[-n - 1:-1]
+        if len(lines) < n or not all(lines):
+            return None
+        tail_messages = [json.loads(line) for line in lines]
+        head_bytes = size - head_start - sum(len(line) + 1 for line in lines)
+
+        messages = MessageLog(
+            tail_messages,
+            head_count=start,
+            head_user_turns=meta["user_turns"] - sum(1 for m in tail_messages if m["role"] == "user"),
+            load_head=lambda: [json.loads(line) for line in self._read_head(path, head_bytes).splitlines() if line],
+            head_ref=head_bytes,
+        )
+        created_at = meta.get("created_at")
+        return Session(
+            key=key,
+            messages=messages,
+            created_at=datetime.fromisoformat(created_at) if created_at else datetime.now(),
+            metadata=meta.get("metadata", {}),
+            last_consolidated=meta.get("last_consolidated", 0),
+        )
+
+    @staticmethod
+    def _read_head(path: Path, length: int) -> bytes:
+        """The first ``length`` bytes of messages after the metadata line."""
+        with open(path, "rb") as f:
+            f.readline()
+            data = f.read(length)
+        if len(data) != length or (data and not data.endswith(b"\n")):
+            raise ValueError(f"{path.name} changed since it was loaded")
+        return data
+
+    def save(self, session: Session) -> None:
+        path = self._get_session_path(session.key)
+        messages = session.messages
+        lazy = isinstance(messages, MessageLog) and not messages.loaded
+
+        metadata_line = {
+            "_type": "metadata",
+            "key": session.key,
+            "created_at": session.created_at.isoformat(),
+            "updated_at": session.updated_at.isoformat(),
+            "metadata": session.metadata,
+            "last_consolidated": session.last_consolidated,
+            "message_count": len(messages),
+            "user_turns": count_user_turns(messages),
+        }
+        # The unread head is copied from the current file, so write a new one and swap it in
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write((json.dumps(metadata_line) + "\n").encode())
+            if lazy:
+                f.write(self._read_head(path, messages.head_ref))
+            for msg in messages.tail if lazy else messages:
+                f.write((json.dumps(msg) + "\n").encode())
+        tmp.replace(path)
+
+    def read_messages(self, key: str, start: int = 0, end: int | None = None) -> list[dict[str, Any]]:
+        # A window at the end only needs a tail load
+        session = self.load(key, tail=-start if start < 0 else None)
+        return list(session.messages[start:end]) if session else []
+
+    def list_sessions(self) -> list[dict[str, Any]]:
+        sessions = []
+
+        for path in self.sessions_dir.glob("*.jsonl"):
+            try:
+                with open(path) as f:
+                    first_line = f.readline().strip()
+                    if first_line:
+                        data = json.loads(first_line)
+                        if data.get("_type") == "metadata":
+                            sessions.append({
+                                "key": data.get("key", path.stem),
+                                "created_at": data.get("created_at"),
+                                "updated_at": data.get("updated_at"),
+                                "path": str(path)
+                            })
+            except Exception:
+                continue
+
+        return sorted(sessions, key=lambda x: x.get("updated_at", ""), reverse=True)
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    All sessions in one SQLite database, in WAL mode.
+
+    Session metadata is one row per session in ``sessions``; messages are
+    rows of ``messages`` keyed by (session key, seq). Saving a session only
+    inserts the messages added since it was loaded or last saved, in one
+    transaction, so the cost of a save does not grow with the session.
+    A session whose stored messages no longer form a prefix of its list
+    (after ``clear()``) is rewritten. A tail load is a range query on
+    (key, seq); the head is read by another one when first needed.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        key TEXT PRIMARY KEY,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        last_consolidated INTEGER NOT NULL DEFAULT 0,
+        message_count INTEGER NOT NULL DEFAULT 0,
+        metadata TEXT NOT NULL DEFAULT '{}',
+        user_turns INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS messages (
+        key TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        data TEXT NOT NULL,
+        PRIMARY KEY (key, seq)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at);
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        ensure_dir(path.parent)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+        if "user_turns" not in columns:  # databases created before user turns were counted
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN user_turns INTEGER")
+        self._lock = threading.RLock()
+
+    def load(self, key: str, tail: int | None = None) -> Session | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, updated_at, last_consolidated, metadata, message_count, user_turns "
+                "FROM sessions WHERE key = ?", (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            created_at, updated_at, last_consolidated, metadata, count, user_turns = row
+            start = _tail_start(count, last_consolidated, tail) if tail is not None else 0
+            rows = self._conn.execute(
+                "SELECT data FROM messages WHERE key = ? AND seq >= ? ORDER BY seq", (key, start),
+            ).fetchall()
+            messages: list[dict[str, Any]] | MessageLog = [json.loads(data) for data, in rows]
+            if start:
+                tail_user_turns = sum(1 for m in messages if m["role"] == "user")
+                if user_turns is None:
+                    user_turns = tail_user_turns + self._conn.execute(
+                        "SELECT COUNT(*) FROM messages WHERE key = ? AND seq < ? "
+                        "AND json_extract(data, '$.role') = 'user'", (key, start),
+                    ).fetchone()[0]
+                messages = MessageLog(
+                    messages,
+                    head_count=start,
+                    head_user_turns=user_turns - tail_user_turns,
+                    load_head=lambda: self.read_messages(key, 0, start),
+                )
+        session = Session(
+            key=key,
+            messages=messages,
+            created_at=datetime.fromisoformat(created_at),
+            updated_at=datetime.fromisoformat(updated_at),
+            metadata=json.loads(metadata),
+            last_consolidated=last_consolidated,
+        )
+        session._stored = len(session.messages)
+        return session
+
+    def save(self, session: Session) -> None:
+        messages = session.messages
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT message_count, user_turns FROM sessions WHERE key = ?", (session.key,),
+                ).fetchone()
+                stored, user_turns = row if row else (0, 0)
+                if session._stored != stored or stored > len(messages):
+                    # Not a pure append (new object, cleared or rewritten): replace everything
+                    if isinstance(messages, MessageLog):
+                        messages.load()  # while its rows still exist
+                    self._conn.execute("DELETE FROM messages WHERE key = ?", (session.key,))
+                    stored, user_turns = 0, 0
+                new = [messages[seq] for seq in range(stored, len(messages))]
+                if user_turns is None:
+                    user_turns = count_user_turns(messages)
+                else:
+                    user_turns += sum(1 for m in new if m["role"] == "user")
+                self._conn.executemany(
+                    "INSERT INTO messages (key, seq, data) VALUES (?, ?, ?)",
+                    ((session.key, stored + i, json.dumps(m)) for i, m in enumerate(new)),
+                )
+                self._conn.execute(
+                    "INSERT INTO sessions (key, created_at, updated_at, last_consolidated, message_count, "
+                    "metadata, user_turns) VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                    "updated_at = excluded.updated_at, last_consolidated = excluded.last_consolidated, "
+                    "message_count = excluded.message_count, metadata = excluded.metadata, "
+                    "user_turns = excluded.user_turns",
+                    (session.key, session.created_at.isoformat(), session.updated_at.isoformat(),
+                     session.last_consolidated, len(messages), json.dumps(session.metadata), user_turns),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        session._stored = len(messages)
+
+    def read_messages(self, key: str, start: int = 0, end: int | None = None) -> list[dict[str, Any]]:
+        with self._lock:
+            if start < 0 or (end is not None and end < 0):
+                row = self._conn.execute("SELECT message_count FROM sessions WHERE key = ?", (key,)).fetchone()
+                count = row[0] if row else 0
+                start = max(count + start, 0) if start < 0 else start
+                end = max(count + end, 0) if end is not None and end < 0 else end
+            rows = self._conn.execute(
+                "SELECT data FROM messages WHERE key = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                (key, start, end if end is not None else 2**62),
+            ).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def list_sessions(self) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, created_at, updated_at FROM sessions ORDER BY updated_at DESC",
+            ).fetchall()
+        return [
+            {"key": key, "created_at": created_at, "updated_at": updated_at, "path": str(self.path)}
+            for key, created_at, updated_at in rows
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_session_store(workspace: Path, backend: str = "jsonl") -> SessionStore:
+    """Session store for a workspace: "jsonl" (sessions/*.jsonl) or "sqlite" (sessions/sessions.db)."""
+    sessions_dir = workspace / "sessions"
+    if backend == "jsonl":
+        return JsonlSessionStore(sessions_dir, Path.home() / ".nanobot" / "sessions")
+    if backend == "sqlite":
+        return SqliteSessionStore(sessions_dir / "sessions.db")
+    raise ValueError(f"Unknown session store {backend!r} (expected 'jsonl' or 'sqlite')")
+
+
+def migrate_sessions(source: JsonlSessionStore, target: SessionStore, overwrite: bool = False) -> tuple[int, int]:
+    """
+    Copy every session of a JSONL store into another store.
+
+    Files written before the session key was recorded in their metadata
+    line are keyed by the file name, with the first "_" taken as the
+    "channel:" separator.
+
+    Returns:
+        (sessions copied, sessions skipped because the target already had them).
+    """
+    copied = skipped = 0
+    for info in source.list_sessions():
+        path = Path(info["path"])
+        try:
+            with open(path, encoding="utf-8") as f:
+                key = json.loads(f.readline()).get("key") or path.stem.replace("_", ":", 1)
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Skipping unreadable session file {path.name}: {e}")
+            continue
+        if not overwrite and target.load(key) is not None:
+            skipped += 1
+            continue
+        session = source.load(path.stem)
+        if session is None:
+            logger.warning(f"Skipping unreadable session file {path.name}")
+            continue
+        session.key = key
+        target.save(session)
+        copied += 1
+    return copied, skipped
@@ -0,0 +1,120 @@
+"""Small BM25 indexes for ranking documents against a query."""
+
+import math
+import re
+from collections import Counter
+
+# Latin words and digits, or runs of CJK characters (which have no spaces between words)
+_TOKEN_RE = re.compile(r"[a-z0-9]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do for from has have how i in is it me my of on or "
+    "please so that the this to use using was what when where which who why will with you your".split()
+)
+
+
+def _stem(token: str) -> str:
+    # Plural "s" only; enough for "session"/"sessions", "ticket"/"tickets"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens without stopwords and single letters; CJK runs become character bigrams."""
+    tokens = []
+    for t in _TOKEN_RE.findall(text.lower()):
+        if t[0] >= "\u3040":
+            tokens.extend([t] if len(t) == 1 else [t[i:i + 2] for i in range(len(t) - 1)])
+        elif len(t) > 1 and t not in STOPWORDS:
+            tokens.append(_stem(t))
+    return tokens
+
+
+class BM25:
+    """
+    Okapi BM25 over a fixed list of tokenized documents.
+
+    Scores are not normalized: a query term found in one document out of
+    ten contributes about 2, a term found in every document close to 0.
+    """
+
+    def __init__(self, documents: list[list[str]], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.tf = [Counter(doc) for doc in documents]
+        self.lengths = [len(doc) for doc in documents]
+        self.avg_length = sum(self.lengths) / len(documents) if documents else 0.0
+        df: Counter[str] = Counter()
+        for counts in self.tf:
+            df.update(counts.keys())
+        n = len(documents)
+        self.idf = {term: math.log((n - f + 0.5) / (f + 0.5) + 1) for term, f in df.items()}
+
+    def scores(self, query: list[str]) -> list[float]:
+        """Score of every document for the query tokens, in document order."""
+        terms = [t for t in set(query) if t in self.idf]
+        result = []
+        for counts, length in zip(self.tf, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_length) if self.avg_length else self.k1
+            score = 0.0
+            for term in terms:
+                f = counts.get(term)
+                if f:
+                    score += self.idf[term] * f * (self.k1 + 1) / (f + norm)
+            result.append(score)
+        return result
+
+
+class InvertedIndex:
+    """
+    Okapi BM25 over a growing collection, scored through postings lists.
+
+    Documents are only ever appended, so a search touches just the
+    documents that contain a query term. ``to_dict``/``from_dict`` allow
+    the index to be saved and extended later.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, list[list[int]]] = {}  # term -> [[doc id, term frequency], ...]
+        self.lengths: list[int] = []
+        self.total_length = 0
+
+    def add(self, tokens: list[str]) -> int:
+        """Add a document; returns its id (ids are consecutive from 0)."""
+        doc_id = len(self.lengths)
+        for term, f in Counter(tokens).items():
+            self.postings.setdefault(term, []).append([doc_id, f])
+        self.lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        return doc_id
+
+    def search(self, query: list[str]) -> dict[int, float]:
+        """Scores of the documents that contain at least one query term."""
+        n = len(self.lengths)
+        if not n:
+            return {}
+        avg_length = self.total_length / n or 1.0
+        scores: dict[int, float] = {}
+        for term in set(query):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log((n - len(postings) + 0.5) / (len(postings) + 0.5) + 1)
+            for doc_id, f in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * f * (self.k1 + 1) / (f + norm)
+        return scores
+
+    def to_dict(self) -> dict:
+        return {"postings": self.postings, "lengths": self.lengths}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "InvertedIndex":
+        index = cls()
+        index.postings = data["postings"]
+        index.lengths = data["lengths"]
+        index.total_length = sum(index.lengths)
+        return index
@@ -0,0 +1,79 @@
+"""Token counting and model context sizes."""
+
+import importlib.util
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+# Used when a model is not in litellm's model map and no context_window is configured
+DEFAULT_CONTEXT_WINDOW = 32_000
+
+# Per-message overhead for role and framing in chat formats
+MESSAGE_OVERHEAD = 4
+
+
+@lru_cache(maxsize=1)
+def _encoder() -> Any:
+    """Load the cl100k tokenizer, or None if it cannot be loaded offline."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    # litellm ships the BPE file; point tiktoken at it so no download is needed
+    if "TIKTOKEN_CACHE_DIR" not in os.environ:
+        spec = importlib.util.find_spec("litellm")
+        if spec and spec.origin:
+            bundled = Path(spec.origin).parent / "litellm_core_utils" / "tokenizers"
+            if bundled.is_dir():
+                os.environ["TIKTOKEN_CACHE_DIR"] = str(bundled)
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Count tokens in text (cl100k; roughly 4 chars per token if unavailable)."""
+    if not text:
+        return 0
+    enc = _encoder()
+    if enc is None:
+        return len(text) // 4 + 1
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def message_tokens(message: dict[str, Any]) -> int:
+    """Estimate the prompt tokens of one chat message, including tool calls."""
+    content = message.get("content")
+    if isinstance(content, list):  # multimodal blocks: count the text parts
+        content = "".join(b.get("text", "") for b in content if isinstance(b, dict))
+    total = MESSAGE_OVERHEAD + estimate_tokens(content or "")
+    if message.get("tool_calls"):
+        total += estimate_tokens(json.dumps(message["tool_calls"], ensure_ascii=False))
+    return total
+
+
+@lru_cache(maxsize=32)
+def context_window(model: str) -> int:
+    """
+    Input context size of a model in tokens, from litellm's model map.
+
+    Provider prefixes are stripped one at a time until a known name is found
+    (``openrouter/anthropic/claude-x`` -> ``anthropic/claude-x`` -> ``claude-x``).
+    """
+    try:
+        import litellm
+    except ImportError:
+        return DEFAULT_CONTEXT_WINDOW
+    parts = model.split("/")
+    for i in range(len(parts)):
+        try:
+            info = litellm.get_model_info("/".join(parts[i:]))
+        except Exception:
+            continue
+        size = info.get("max_input_tokens") or info.get("max_tokens")
+        if size:
+            return int(size)
+    return DEFAULT_CONTEXT_WINDOW
@@ -0,0 +1,96 @@
+"""
+Microbenchmarks for tool parameter validation.
+
+Compares the compiled validators against a straightforward recursive schema
+walk (the approach used before validators were compiled) on large arguments.
+
+Run with: python tests/benchmarks/bench_tool_validation.py
+"""
+
+import timeit
+from typing import Any
+
+from nanobot.agent.tools.base import Tool, _TYPE_MAP
+from nanobot.agent.tools.filesystem import WriteFileTool
+
+
+def _walk(val: Any, schema: dict[str, Any], path: str) -> list[str]:
+    """Reference recursive validator: re-walks the schema on every call."""
+    t, label = schema.get("type"), path or "parameter"
+    if t in _TYPE_MAP and not isinstance(val, _TYPE_MAP[t]):
+        return [f"{label} should be {t}"]
+    errors = []
+    if "enum" in schema and val not in schema["enum"]:
+        errors.append(f"{label} must be one of {schema['enum']}")
+    if t == "object":
+        props = schema.get("properties", {})
+        for k in schema.get("required", []):
+            if k not in val:
+                errors.append(f"missing required {path + '.' + k if path else k}")
+        for k, v in val.items():
+            if k in props:
+                errors.extend(_walk(v, props[k], path + '.' + k if path else k))
+    if t == "array" and "items" in schema:
+        for i, item in enumerate(val):
+            errors.extend(_walk(item, schema["items"], f"{path}[{i}]" if path else f"[{i}]"))
+    return errors
+
+
+class _BatchTool(Tool):
+    name = "batch"
+    description = "benchmark tool"
+    parameters = {
+        "type": "object",
+        "properties": {
+            "tags": {"type": "array", "items": {"type": "string"}},
+            "rows": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "integer"},
+                        "name": {"type": "string"},
+                        "mode": {"type": "string", "enum": ["a", "b"]},
+                        "meta": {"type": "object", "properties": {"x": {"type": "number"}}},
+                    },
+                    "required": ["id", "name"],
+                },
+            },
+            "env": {"type": "object"},
+        },
+    }
+
+    async def execute(self, **kwargs: Any) -> str:
+        return ""
+
+
+CASES = {
+    "write_file 1 MB content": (
+        WriteFileTool(), {"path": "out.txt", "content": "x" * (1 << 20)},
+    ),
+    "10k string array": (
+        _BatchTool(), {"tags": [f"t{i}" for i in range(10_000)]},
+    ),
+    "2k nested objects": (
+        _BatchTool(), {"rows": [{"id": i, "name": "n", "mode": "a", "meta": {"x": 1.5}} for i in range(2_000)]},
+    ),
+    "5k-key object": (
+        _BatchTool(), {"env": {f"K{i}": str(i) for i in range(5_000)}},
+    ),
+}
+
+
+def main() -> None:
+    print(f"{'case':<26}{'recursive':>14}{'compiled':>14}{'speedup':>10}")
+    for label, (tool, params) in CASES.items():
+        schema = tool.parameters
+        tool.compile_validator()
+        assert tool.validate_params(params) == _walk(params, schema, "")
+        n = 200
+        walk = min(timeit.repeat(lambda: _walk(params, schema, ""), number=n, repeat=3)) / n
+        compiled = min(timeit.repeat(lambda: tool.validate_params(params), number=n, repeat=3)) / n
+        print(f"{label:<26}{walk * 1e6:>11.1f} us{compiled * 1e6:>11.1f} us{walk / compiled:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import json
+
+import httpx
+
+from nanobot.agent.tools.base import compact_json, tool_result
+from nanobot.agent.tools.web import WebFetchTool
+
+
+def test_compact_json_keeps_utf8() -> None:
+    assert compact_json({"城市": "東京", "n": [1, 2]}) == '{"城市":"東京","n":[1,2]}'
+
+
+def test_tool_result_header() -> None:
+    assert tool_result("body", a="x", b=None, ok=True, n=3) == "[a=x ok=true n=3]\nbody"
+    assert tool_result("", title="two words") == '[title="two words"]'
+
+
+async def test_web_fetch_returns_raw_utf8(monkeypatch) -> None:
+    payload = {"name": "東京タワー", "items": [{"id": 1}]}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/json":
+            return httpx.Response(200, json=payload)
+        return httpx.Response(200, text="<html><head><title>日本語</title></head><body><p>こんにちは世界</p></body></html>",
+                              headers={"content-type": "text/html; charset=utf-8"})
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(httpx, "AsyncClient",
+                        lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs))
+    tool = WebFetchTool()
+
+    result = await tool.execute(url="https://example.com/json")
+    header, body = result.split("\n", 1)
+    assert header == f"[url=https://example.com/json status=200 extractor=json truncated=false length={len(body)}]"
+    assert json.loads(body) == payload and "\\u" not in body and " " not in body
+
+    result = await tool.execute(url="https://example.com/page")
+    assert "extractor=readability" in result and "こんにちは世界" in result
+
+    assert (await tool.execute(url="ftp://example.com")).startswith("Error: URL validation failed")
@@ -0,0 +1,165 @@
+import asyncio
+import json
+from pathlib import Path
+
+from nanobot.agent.consolidation import ConsolidationSupervisor, MemoryConsolidator
+from nanobot.agent.loop import AgentLoop
+from nanobot.agent.memory import MemoryStore
+from nanobot.bus.queue import MessageBus
+from nanobot.providers.base import LLMProvider, LLMResponse
+from nanobot.session.manager import Session
+
+
+async def test_single_flight_and_coalescing(tmp_path: Path) -> None:
+    runs: list[str] = []
+    release = asyncio.Event()
+
+    async def run(key: str) -> None:
+        runs.append(key)
+        await release.wait()
+
+    supervisor = ConsolidationSupervisor(run, tmp_path / "jobs.json", max_concurrent=1)
+    supervisor.trigger("a")
+    supervisor.trigger("b")
+    await asyncio.sleep(0)
+    assert runs == ["a"]  # "b" waits for the concurrency slot
+    for _ in range(5):
+        supervisor.trigger("a")
+    assert json.loads((tmp_path / "jobs.json").read_text()) == {"sessions": ["a", "b"]}
+
+    release.set()
+    await supervisor.drain()
+    # Five triggers for "a" while it ran coalesce into a single re-run
+    assert sorted(runs) == ["a", "a", "b"]
+    assert supervisor.active == []
+    assert not (tmp_path / "jobs.json").exists()
+
+
+async def test_interrupted_job_resumes(tmp_path: Path) -> None:
+    async def hang(key: str) -> None:
+        await asyncio.sleep(3600)
+
+    supervisor = ConsolidationSupervisor(hang, tmp_path / "jobs.json")
+    supervisor.trigger("cli:x")
+    await asyncio.sleep(0)
+    await supervisor.drain(timeout=0.05)
+    assert json.loads((tmp_path / "jobs.json").read_text()) == {"sessions": ["cli:x"]}
+
+    resumed: list[str] = []
+
+    async def record(key: str) -> None:
+        resumed.append(key)
+
+    supervisor = ConsolidationSupervisor(record, tmp_path / "jobs.json")
+    supervisor.resume()
+    await supervisor.drain()
+    assert resumed == ["cli:x"]
+    assert not (tmp_path / "jobs.json").exists()
+
+
+class SlowConsolidator(LLMProvider):
+    """Answers chat turns immediately; consolidation calls block until released."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.consolidations = 0
+        self.release = asyncio.Event()
+
+    async def chat(self, messages, tools=None, model=None, max_tokens=4096, temperature=0.7):
+        if "memory consolidation agent" in messages[0]["content"]:
+            self.consolidations += 1
+            await self.release.wait()
+            return LLMResponse(content=json.dumps({
+                "history_entry": "[2026-01-01 10:00] chat",
+                "memory_ops": [{"op": "add", "section": "User", "fact": "Likes tea"}],
+            }))
+        return LLMResponse(content="ok")
+
+    def get_default_model(self) -> str:
+        return "test-model"
+
+
+async def test_loop_runs_one_consolidation_and_drains_on_close(tmp_path: Path) -> None:
+    provider = SlowConsolidator()
+    loop = AgentLoop(MessageBus(), provider, tmp_path, memory_window=4, context_window=100_000)
+    for i in range(6):
+        await loop.process_direct(f"message {i}", session_key="cli:t")
+        await asyncio.sleep(0.01)
+    assert provider.consolidations == 1
+
+    provider.release.set()
+    await loop.close()
+    session = loop.sessions.get_or_create("cli:t")
+    # The offset is computed before the LLM call, so turns added meanwhile stay unconsolidated
+    assert 0 < session.last_consolidated <= len(session.messages) - 2
+    assert (tmp_path / "memory" / "MEMORY.md").read_text() == "## User\n- Likes tea\n"
+    loop.sessions.invalidate("cli:t")
+    assert loop.sessions.get_or_create("cli:t").last_consolidated == session.last_consolidated
+
+
+class ChunkProvider(LLMProvider):
+    """Summarizes parts (tracking concurrency), then merges; optionally fails one part."""
+
+    def __init__(self, fail_part: str | None = None) -> None:
+        super().__init__()
+        self.fail_part = fail_part
+        self.running = self.peak = 0
+        self.reduce_prompts: list[str] = []
+
+    async def chat(self, messages, tools=None, model=None, max_tokens=4096, temperature=0.7):
+        prompt = messages[1]["content"]
+        if "## Conversation Part" in prompt:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            await asyncio.sleep(0.01)
+            self.running -= 1
+            first = prompt.split("USER: ")[1].split("\n")[0]
+            if first == self.fail_part:
+                return LLMResponse(content="not json at all")
+            return LLMResponse(content=json.dumps({"summary": f"part from {first}", "facts": [f"fact {first}"]}))
+        self.reduce_prompts.append(prompt)
+        return LLMResponse(content=json.dumps({
+            "history_entry": "[2026-01-01 10:00] merged",
+            "memory_ops": [{"op": "add", "section": "Notes", "fact": "merged fact"}],
+        }))
+
+    def get_default_model(self) -> str:
+        return "test-model"
+
+
+def _big_session(n: int) -> Session:
+    session = Session(key="cli:big")
+    for i in range(n):
+        session.add_message("user", f"m{i} " + "word " * 200)
+        session.add_message("assistant", "reply " * 200)
+    return session
+
+
+async def test_map_reduce_chunks_concurrently(tmp_path: Path) -> None:
+    provider = ChunkProvider()
+    session = _big_session(20)
+    saves: list[int] = []
+    consolidator = MemoryConsolidator(provider, "test-model", MemoryStore(tmp_path), chunk_tokens=1000)
+    assert await consolidator.consolidate(session, 0, 40, save=lambda s: saves.append(s.last_consolidated))
+
+    assert 1 < provider.peak <= MemoryConsolidator.MAP_CONCURRENCY
+    assert session.last_consolidated == 40
+    assert saves == sorted(saves) and saves[-1] == 40  # advanced chunk by chunk
+    reduce_prompt = provider.reduce_prompts[0]
+    assert reduce_prompt.index("part from m0 ") < reduce_prompt.index("part from m18 ")
+    assert "fact m0 " in reduce_prompt
+    assert (tmp_path / "memory" / "MEMORY.md").read_text() == "## Notes\n- merged fact\n"
+    assert MemoryConsolidator.STAGE_KEY not in session.metadata
+
+
+async def test_failed_chunk_keeps_earlier_progress(tmp_path: Path) -> None:
+    session = _big_session(20)
+    consolidator = MemoryConsolidator(ChunkProvider(fail_part="m10 " + "word " * 200),
+                                      "test-model", MemoryStore(tmp_path), chunk_tokens=1000)
+    chunks = consolidator._chunk(session.messages, 0, 40)
+    failed = next(i for i, (a, _) in enumerate(chunks) if session.messages[a]["content"].startswith("m10 "))
+    await consolidator.consolidate(session, 0, 40, save=lambda s: None)
+
+    # Everything before the failed chunk is consolidated; the rest waits for the next run
+    assert session.last_consolidated == chunks[failed][0]
+    assert "merged" in (tmp_path / "memory" / "HISTORY.md").read_text()
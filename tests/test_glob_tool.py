@@ -0,0 +1,103 @@
+import os
+from pathlib import Path
+
+from nanobot.agent.tools.search import GlobTool, _glob_to_regex
+
+
+def _touch(path: Path, text: str = "") -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_glob_to_regex_double_star() -> None:
+    rx = _glob_to_regex("**/*.py")
+    assert rx.match("a.py")
+    assert rx.match("pkg/sub/a.py")
+    assert not rx.match("pkg/a.pyc")
+    assert _glob_to_regex("src/*.{md,txt}").match("src/readme.md")
+    assert not _glob_to_regex("*.py").match("pkg/a.py")
+
+
+async def test_glob_recursive_and_ignores(tmp_path: Path) -> None:
+    _touch(tmp_path / "a.py")
+    _touch(tmp_path / "pkg" / "b.py")
+    _touch(tmp_path / "pkg" / "deep" / "c.py")
+    _touch(tmp_path / "node_modules" / "x.py")
+    _touch(tmp_path / "build" / "gen.py")
+    _touch(tmp_path / ".gitignore", "build/\n")
+
+    tool = GlobTool(workspace=tmp_path)
+    result = await tool.execute(pattern="**/*.py")
+    assert result.splitlines() == ["a.py", "pkg/b.py", "pkg/deep/c.py"]
+
+    result = await tool.execute(pattern="**/*.py", no_ignore=True)
+    assert "build/gen.py" in result and "node_modules/x.py" in result
+
+    result = await tool.execute(pattern="*.py", path=str(tmp_path / "pkg"))
+    assert result == "b.py"
+
+
+async def test_glob_sees_new_files_after_refresh(tmp_path: Path) -> None:
+    _touch(tmp_path / "pkg" / "a.txt")
+    tool = GlobTool(workspace=tmp_path)
+    assert await tool.execute(pattern="**/*.txt") == "pkg/a.txt"
+
+    _touch(tmp_path / "pkg" / "new" / "b.txt")
+    assert (await tool.execute(pattern="**/*.txt")).splitlines() == ["pkg/a.txt", "pkg/new/b.txt"]
+
+
+async def test_glob_sort_by_mtime_and_limit(tmp_path: Path) -> None:
+    for i, name in enumerate(["old.log", "mid.log", "new.log"]):
+        _touch(tmp_path / name)
+        os.utime(tmp_path / name, (1_000_000 + i, 1_000_000 + i))
+
+    tool = GlobTool(workspace=tmp_path)
+    result = await tool.execute(pattern="*.log", sort="mtime", limit=2)
+    lines = result.splitlines()
+    assert lines[:2] == ["new.log", "mid.log"]
+    assert "1 more matches not shown" in lines[2]
+
+
+async def test_glob_prefix_cannot_escape_allowed_dir(tmp_path: Path) -> None:
+    _touch(tmp_path / "secret.txt")
+    _touch(tmp_path / "ws" / "sub" / "a.txt")
+    tool = GlobTool(workspace=tmp_path / "ws", allowed_dir=tmp_path / "ws")
+
+    assert (await tool.execute(pattern="../*.txt")).startswith("Error:")
+    assert (await tool.execute(pattern="sub/../../*.txt")).startswith("Error:")
+    assert await tool.execute(pattern="sub/../sub/*.txt") == "sub/../sub/a.txt"
+
+
+async def test_glob_skips_unreadable_directories(tmp_path: Path, monkeypatch) -> None:
+    _touch(tmp_path / "open" / "a.txt")
+    _touch(tmp_path / "locked" / "b.txt")
+    scandir = os.scandir
+
+    def guarded_scandir(path):
+        if Path(path).name == "locked":
+            raise PermissionError(13, "Permission denied", path)
+        return scandir(path)
+    monkeypatch.setattr(os, "scandir", guarded_scandir)
+
+    tool = GlobTool(workspace=tmp_path)
+    assert await tool.execute(pattern="**/*.txt") == "open/a.txt"
+
+
+def test_glob_concurrent_calls_share_the_tree(tmp_path: Path) -> None:
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    for i in range(20):
+        _touch(tmp_path / f"d{i}" / "sub" / f"f{i}.txt")
+    expected = "\n".join(sorted(f"d{i}/sub/f{i}.txt" for i in range(20)))
+    tool = GlobTool(workspace=tmp_path)
+
+    # execution_mode is "thread": each call runs in its own worker thread
+    def call(n: int) -> str:
+        path = str(tmp_path / f"d{n % 20}") if n % 3 == 0 else None
+        return asyncio.run(tool.execute(pattern="**/*.txt", path=path, no_ignore=n % 2 == 0))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(call, range(64)))
+    for n, result in enumerate(results):
+        assert result == (f"sub/f{n % 20}.txt" if n % 3 == 0 else expected)
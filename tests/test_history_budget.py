@@ -0,0 +1,72 @@
+from pathlib import Path
+
+from nanobot.agent.context import ContextBuilder
+from nanobot.session.manager import Session, SessionManager
+from nanobot.utils import tokens
+from nanobot.utils.tokens import estimate_tokens, message_tokens
+
+
+def _session(sizes: list[int]) -> Session:
+    session = Session(key="t")
+    for i, size in enumerate(sizes):
+        session.add_message("user" if i % 2 == 0 else "assistant", f"m{i} " + "word " * size)
+    return session
+
+
+def test_token_count_cached_on_write(tmp_path: Path) -> None:
+    session = _session([10, 20])
+    assert [m["tokens"] for m in session.messages] == [message_tokens(m) for m in session.messages]
+
+    manager = SessionManager(tmp_path)
+    manager.save(session)
+    manager.invalidate("t")
+    assert manager.get_or_create("t").messages[1]["tokens"] == session.messages[1]["tokens"]
+
+
+def test_history_selected_by_token_budget() -> None:
+    session = _session([5, 5, 5, 400, 5, 5])
+    full = session.get_history(max_messages=50)
+    assert len(full) == 6
+
+    # The large 4th message does not fit, so history starts after it at a user turn
+    budget = sum(m["tokens"] for m in session.messages[4:]) + 10
+    history = session.get_history(max_messages=50, max_tokens=budget)
+    assert [h["content"].split()[0] for h in history] == ["m4", "m5"]
+    assert "tokens" not in history[0]
+
+    # max_messages still caps the window
+    assert session.get_history(max_messages=2, max_tokens=10**6)[0]["content"].startswith("m4")
+
+
+def test_legacy_records_without_token_counts() -> None:
+    session = Session(key="t", messages=[{"role": "user", "content": "hello there"}])
+    assert session.get_history(max_tokens=100)[0]["content"] == "hello there"
+    assert session.messages[0]["tokens"] == message_tokens(session.messages[0])
+    assert session.get_history(max_tokens=1) == []
+
+
+def test_estimate_tokens_fallback(monkeypatch) -> None:
+    monkeypatch.setattr(tokens, "_encoder", lambda: None)
+    assert estimate_tokens("a" * 400) == 101
+    assert estimate_tokens("") == 0
+
+
+def test_context_builder_history_budget(tmp_path: Path) -> None:
+    builder = ContextBuilder(tmp_path)
+    system = estimate_tokens(builder.build_system_prompt())
+    budget = builder.history_budget(context_window=100_000, reserved_tokens=8_000, current_message="hi")
+    assert budget == 95_000 - 8_000 - system - message_tokens({"role": "user", "content": "hi"})
+    assert builder.history_budget(context_window=1_000, reserved_tokens=8_000, current_message="hi") == 0
+
+
+def test_prepared_turn_is_built_once(tmp_path: Path, monkeypatch) -> None:
+    builder = ContextBuilder(tmp_path)
+    calls = []
+    monkeypatch.setattr(builder.memory, "get_relevant_memory", lambda query, budget: calls.append(query) or "")
+
+    turn = builder.prepare(memory_query="hi")
+    budget = builder.history_budget(context_window=100_000, reserved_tokens=8_000, current_message="hi", turn=turn)
+    messages = builder.build_messages([], "hi", turn=turn)
+    assert calls == ["hi"]
+    assert budget == builder.history_budget(context_window=100_000, reserved_tokens=8_000, current_message="hi")
+    assert messages[0]["content"] == turn.system_prompt
@@ -0,0 +1,95 @@
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+from nanobot.session.manager import Session, SessionManager
+
+
+def _fill(session: Session, turns: int, size: int = 5000) -> None:
+    for t in range(turns):
+        session.add_message("user", f"question {t}")
+        session.add_message("assistant", "\n".join(f"answer {t} line {j} " + "x" * 50 for j in range(size // 60)))
+
+
+def test_older_turns_are_elided_and_recent_kept() -> None:
+    session = Session(key="cli:test")
+    _fill(session, 10)
+    full = session.get_history()
+    history = session.get_history(keep_turns=2)
+    assert len(history) == len(full) == 20
+
+    # 10 turns, keep 2: the boundary is aligned down to a multiple of ELIDE_BLOCK (8 -> turn 8)
+    elided = [i for i, m in enumerate(history) if m["content"] != full[i]["content"]]
+    assert elided == list(range(1, 16, 2))
+    assert history[1]["content"].startswith("answer 0 line 0")
+    assert "more chars of this earlier message elided" in history[1]["content"]
+    assert history[-1] == full[-1]
+    # Short messages are never elided
+    assert history[0]["content"] == "question 0"
+
+    # The rendering is stable until the boundary advances a whole block
+    session.add_message("user", "question 10")
+    session.add_message("assistant", "short")
+    assert session.get_history(keep_turns=2)[:16] == history[:16]
+
+
+def test_token_budget_uses_elided_sizes() -> None:
+    session = Session(key="cli:test")
+    _fill(session, 10)
+    full = session.get_history(max_tokens=6000)
+    elided = session.get_history(max_tokens=6000, keep_turns=2)
+    assert len(elided) > len(full)
+
+
+def test_pointer_reads_back_the_full_record(tmp_path: Path) -> None:
+    manager = SessionManager(tmp_path)
+    session = manager.get_or_create("cli:test")
+    _fill(session, 6)
+    manager.save(session)
+
+    session = SessionManager(tmp_path).get_or_create("cli:test")
+    content = session.get_history(keep_turns=1)[1]["content"]
+    pointer = content.split("full text: ")[1]
+    assert pointer.startswith(f'query_data(path="{session.source}"')
+    offset = int(pointer.split("offset=")[1].split(",")[0])
+
+    # The session file keeps the full text at that record
+    lines = Path(session.source).read_text().splitlines()
+    assert json.loads(lines[offset])["content"] == session.messages[1]["content"]
+
+
+def test_pointer_budget_fits_the_encoded_record(tmp_path: Path) -> None:
+    manager = SessionManager(tmp_path)
+    session = manager.get_or_create("cli:test")
+    session.add_message("user", "question")
+    session.add_message("assistant", '"quoted"\n' * 1000)  # JSON escaping doubles it
+    _fill(session, 5)
+    manager.save(session)
+
+    pointer = session.get_history(keep_turns=1)[1]["content"].split("full text: ")[1]
+    max_chars = int(pointer.split("max_chars=")[1].rstrip(")]"))
+    assert max_chars > len(json.dumps(session.messages[1]["content"]))
+
+
+def test_sqlite_pointer_reads_back_through_the_cli(tmp_path: Path) -> None:
+    from typer.testing import CliRunner
+
+    from nanobot.cli.commands import app
+    from nanobot.config.schema import Config
+    from nanobot.session.store import SqliteSessionStore
+
+    store = SqliteSessionStore(tmp_path / "sessions" / "sessions.db")
+    session = SessionManager(tmp_path, store=store).get_or_create("cli:test")
+    _fill(session, 6)
+    store.save(session)
+    store.close()
+
+    pointer = session.get_history(keep_turns=1)[1]["content"].split("full text: ")[1]
+    assert pointer == 'exec(command="nanobot sessions read cli:test 1")]'
+
+    config = Config()
+    config.agents.defaults.workspace = str(tmp_path)
+    config.sessions.store = "sqlite"
+    with patch("nanobot.config.loader.load_config", return_value=config):
+        result = CliRunner().invoke(app, ["sessions", "read", "cli:test", "1"])
+    assert result.exit_code == 0 and result.stdout == session.messages[1]["content"] + "\n"
@@ -0,0 +1,125 @@
+from datetime import date, timedelta
+from pathlib import Path
+
+from nanobot.agent.memory import MemoryStore
+from nanobot.agent.rollup import HistoryRollup, parse_entries
+from nanobot.agent.tools.history import SearchHistoryTool
+from nanobot.providers.base import LLMProvider, LLMResponse
+
+
+class Summarizer(LLMProvider):
+    """Summarizes a period as the set of words tagged with '#' in its entries."""
+
+    def __init__(self, fail_on: str | None = None):
+        super().__init__()
+        self.calls = 0
+        self.fail_on = fail_on
+
+    async def chat(self, messages, tools=None, model=None, max_tokens=4096, temperature=0.7):
+        self.calls += 1
+        prompt = messages[-1]["content"]
+        if self.fail_on and self.fail_on in prompt:
+            # What LiteLLMProvider returns when the call fails
+            return LLMResponse(content="Error calling LLM: rate limited", finish_reason="error")
+        tags = sorted({w for w in prompt.split() if w.startswith("#") and w[1:2].isalnum()})
+        return LLMResponse(content="Summary: " + " ".join(tags))
+
+    def get_default_model(self) -> str:
+        return "test-model"
+
+
+TODAY = date(2025, 6, 30)
+
+
+def _history(tmp_path: Path, days: list[int]) -> MemoryStore:
+    store = MemoryStore(tmp_path)
+    for n in days:
+        day = TODAY - timedelta(days=n)
+        store.append_history(f"[{day} 09:00] Morning note #d{n}.")
+        store.append_history(f"[{day} 17:00] Evening note #e{n}.\n\nWith a second paragraph.")
+    return store
+
+
+async def test_rolls_old_days_into_daily_summaries_and_archive(tmp_path: Path) -> None:
+    store = _history(tmp_path, [10, 9, 3, 0])
+    provider = Summarizer()
+    rollup = HistoryRollup(provider, "test-model", store, recent_days=7)
+    assert rollup.due(TODAY)
+
+    assert await rollup.run(TODAY)
+    assert not rollup.due(TODAY) and provider.calls == 2
+
+    recent = parse_entries(store.history_file.read_text())
+    assert [e[0] for e in recent] == [str(TODAY - timedelta(days=n)) for n in (3, 3, 0, 0)]
+    daily = rollup.layer_file("daily").read_text()
+    assert f"[{TODAY - timedelta(days=10)}] Summary: #d10. #e10." in daily
+
+    # The original entries are archived and readable by day
+    archived = rollup.archive.read(str(TODAY - timedelta(days=9)))
+    assert "#d9" in archived and "With a second paragraph." in archived
+
+    # A second run the same day has nothing to do
+    assert not await rollup.run(TODAY) and provider.calls == 2
+
+
+async def test_layers_merge_into_weeks_and_months(tmp_path: Path) -> None:
+    store = _history(tmp_path, [250, 249, 100, 99, 20])
+    rollup = HistoryRollup(Summarizer(), "test-model", store, recent_days=7)
+    await rollup.run(TODAY)
+
+    # 250/249 days ago: day -> week -> month; 100/99 days ago: day -> week; 20 days ago stays daily
+    monthly = parse_entries(rollup.layer_file("monthly").read_text())
+    weekly = parse_entries(rollup.layer_file("weekly").read_text())
+    daily = parse_entries(rollup.layer_file("daily").read_text())
+    assert [e[2].count("#d2") for e in monthly] == [2]
+    assert monthly[0][0].endswith("-01") and monthly[0][0] < monthly[0][1]
+    assert all("#d10" not in e[2] for e in monthly) and any("#d100" in e[2] for e in weekly)
+    assert [e[0] for e in daily] == [str(TODAY - timedelta(days=20))]
+    assert store.history_file.read_text() == ""
+
+
+async def test_failed_days_stay_and_new_entries_survive(tmp_path: Path) -> None:
+    store = _history(tmp_path, [12, 11])
+    provider = Summarizer(fail_on="#d12")
+    rollup = HistoryRollup(provider, "test-model", store, recent_days=7)
+
+    original = provider.chat
+
+    async def chat_and_append(*args, **kwargs):
+        # Consolidation of another session appends while the roll-up runs
+        store.append_history(f"[{TODAY} 12:00] Appended during roll-up.")
+        return await original(*args, **kwargs)
+    provider.chat = chat_and_append
+
+    await rollup.run(TODAY)
+    text = store.history_file.read_text()
+    assert "#d12" in text and "#d11" not in text
+    assert text.count("Appended during roll-up.") == 2
+    assert rollup.archive.read(str(TODAY - timedelta(days=12))) is None
+    assert "Error calling LLM" not in rollup.layer_file("daily").read_text()
+
+    # The failed day is retried on the next run
+    assert rollup.due(TODAY)
+    provider.fail_on = None
+    assert await rollup.run(TODAY) and not rollup.due(TODAY)
+    assert "#d12" not in store.history_file.read_text()
+
+
+async def test_search_covers_layers_and_archived_days(tmp_path: Path) -> None:
+    store = _history(tmp_path, [40, 2])
+    tool = SearchHistoryTool(tmp_path)
+    assert "#d40" in await tool.execute(query="d40")
+
+    await HistoryRollup(Summarizer(), "test-model", store, recent_days=7).run(TODAY)
+    week = (TODAY - timedelta(days=40 + (TODAY - timedelta(days=40)).weekday()))
+
+    result = await tool.execute(query="e40")
+    assert "matches=1" in result and f"[{week}.." in result
+    result = await tool.execute(query="e40", since=str(TODAY - timedelta(days=40)))
+    assert "matches=1" in result
+    result = await tool.execute(limit=20)
+    assert "entries=3" in result and result.index("#d2") < result.index("#d40")
+
+    result = await tool.execute(day=str(TODAY - timedelta(days=40)), query="evening")
+    assert "Evening note #e40." in result and "Morning" not in result
+    assert (await tool.execute(day=str(TODAY))).startswith("Error:")
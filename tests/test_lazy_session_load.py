@@ -0,0 +1,96 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from nanobot.session.manager import MessageLog, Session, SessionManager
+from nanobot.session.store import JsonlSessionStore, SqliteSessionStore
+
+
+def _session(key: str, turns: int) -> Session:
+    session = Session(key=key)
+    for t in range(turns):
+        session.add_message("user", f"question {t}")
+        # Every third answer is long enough to be elided in older turns
+        size = 3000 if t % 3 == 0 else 10
+        session.add_message("assistant", f"answer {t}\n" + "x" * size)
+    return session
+
+
+@pytest.fixture(params=["jsonl", "sqlite"])
+def store(request, tmp_path: Path):
+    if request.param == "jsonl":
+        yield JsonlSessionStore(tmp_path / "sessions")
+    else:
+        store = SqliteSessionStore(tmp_path / "sessions.db")
+        yield store
+        store.close()
+
+
+def test_loads_only_the_tail(store, tmp_path: Path) -> None:
+    session = _session("cli:big", 1500)
+    session.last_consolidated = 2900
+    store.save(session)
+    full = store.load("cli:big")
+    full.source = store.source("cli:big")  # as SessionManager sets it, for identical elision pointers
+
+    lazy = SessionManager(tmp_path, store=store, tail_messages=50).get_or_create("cli:big")
+    messages = lazy.messages
+    assert isinstance(messages, MessageLog) and not messages.loaded
+    # The last 50 messages, extended back to last_consolidated (at most 50 more)
+    assert messages.head_count == 2900 and len(messages.tail) == 100
+    assert len(messages) == 3000 and messages[-1]["content"].startswith("answer 1499")
+
+    # History and elision are the same as for the fully loaded session
+    assert lazy.get_history(max_messages=50, keep_turns=4) == full.get_history(max_messages=50, keep_turns=4)
+    assert lazy.get_history(max_messages=50, max_tokens=3000, keep_turns=2) == \
+        full.get_history(max_messages=50, max_tokens=3000, keep_turns=2)
+    assert lazy.messages[-10:] == full.messages[-10:]
+    assert not messages.loaded
+
+    # Saving appends without reading the head
+    lazy.add_message("user", "one more")
+    store.save(lazy)
+    assert not messages.loaded
+    reloaded = store.load("cli:big")
+    assert len(reloaded.messages) == 3001 and reloaded.messages == list(full.messages) + [lazy.messages[-1]]
+
+    # Older messages are read on first access, e.g. by consolidation
+    assert [m["content"] for m in lazy.messages[10:12]] == ["question 5", full.messages[11]["content"]]
+    assert messages.loaded and list(lazy.messages) == list(reloaded.messages)
+
+
+def test_unconsolidated_window_and_small_sessions_load_fully(store, tmp_path: Path) -> None:
+    small = _session("cli:small", 10)
+    store.save(small)
+    assert isinstance(store.load("cli:small", tail=50).messages, list)
+
+    big = _session("cli:big", 200)
+    big.last_consolidated = 0
+    store.save(big)
+    messages = store.load("cli:big", tail=50).messages
+    # Nothing consolidated: the tail is extended by at most another 50 messages
+    assert messages.head_count == 300 and len(messages.tail) == 100
+    assert [m["content"][:10] for m in store.read_messages("cli:big", -3)] == ["answer 198", "question 1", "answer 199"]
+
+
+def test_jsonl_files_without_counts_load_fully(tmp_path: Path) -> None:
+    store = JsonlSessionStore(tmp_path / "sessions")
+    meta = {"_type": "metadata", "created_at": "2025-01-01T00:00:00", "metadata": {}, "last_consolidated": 0}
+    lines = [meta] + [{"role": "user", "content": f"m{i}"} for i in range(300)]
+    (tmp_path / "sessions" / "cli_old.jsonl").write_text("".join(json.dumps(line) + "\n" for line in lines))
+
+    session = store.load("cli:old", tail=10)
+    assert isinstance(session.messages, list) and len(session.messages) == 300
+    # Saving records the counts, so the next load is tail-first
+    store.save(session)
+    assert store.load("cli:old", tail=10).messages.head_count == 280
+
+
+def test_changed_file_is_detected(tmp_path: Path) -> None:
+    store = JsonlSessionStore(tmp_path / "sessions")
+    store.save(_session("cli:x", 100))
+    lazy = store.load("cli:x", tail=10)
+    (tmp_path / "sessions" / "cli_x.jsonl").write_text("{}\n")
+    with pytest.raises(ValueError):
+        lazy.messages[0]
@@ -0,0 +1,46 @@
+from pathlib import Path
+
+from nanobot.agent.tools.filesystem import ListDirTool
+
+
+def _make_tree(root: Path) -> None:
+    (root / "pkg" / "sub").mkdir(parents=True)
+    (root / "pkg" / "a.py").write_text("a")
+    (root / "pkg" / "sub" / "b.py").write_text("bb")
+    (root / "z.txt").write_text("hello")
+
+
+async def test_list_dir_compact_format(tmp_path: Path) -> None:
+    _make_tree(tmp_path)
+    result = await ListDirTool().execute(path=str(tmp_path))
+    assert result.splitlines() == ["pkg/", "z.txt"]
+
+
+async def test_list_dir_depth(tmp_path: Path) -> None:
+    _make_tree(tmp_path)
+    result = await ListDirTool().execute(path=str(tmp_path), depth=3)
+    assert result.splitlines() == ["pkg/", "pkg/a.py", "pkg/sub/", "pkg/sub/b.py", "z.txt"]
+
+
+async def test_list_dir_pagination_reports_omitted(tmp_path: Path) -> None:
+    for i in range(10):
+        (tmp_path / f"f{i:02d}.txt").write_text("x")
+    (tmp_path / "zdir").mkdir()
+
+    tool = ListDirTool()
+    result = await tool.execute(path=str(tmp_path), limit=4)
+    lines = result.splitlines()
+    assert lines[:4] == ["f00.txt", "f01.txt", "f02.txt", "f03.txt"]
+    assert "7 more entries omitted (1 dirs, 6 files)" in lines[-1]
+    assert "offset=4" in lines[-1]
+
+    result = await tool.execute(path=str(tmp_path), offset=8, limit=4)
+    lines = result.splitlines()
+    assert lines[0] == "(entries 9-11 of 11)"
+    assert lines[1:] == ["f08.txt", "f09.txt", "zdir/"]
+
+
+async def test_list_dir_size_column(tmp_path: Path) -> None:
+    _make_tree(tmp_path)
+    result = await ListDirTool().execute(path=str(tmp_path), show_size=True)
+    assert result.splitlines() == ["      -  pkg/", "     5B  z.txt"]
@@ -0,0 +1,110 @@
+from pathlib import Path
+
+from nanobot.agent.memory import MemoryStore
+
+MEMORY = """# Memory
+
+## User
+- Lives in Berlin
+- Prefers dark mode
+
+## Project
+The API service.
+- Uses OAuth2
+"""
+
+
+def test_ops_edit_facts_in_place(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path)
+    store.write_long_term(MEMORY)
+    assert store.format_facts() == "### User\n[1] Lives in Berlin\n[2] Prefers dark mode\n### Project\n[3] Uses OAuth2"
+
+    counts = store.apply_ops([
+        {"op": "update", "id": 1, "fact": "Lives in Munich"},
+        {"op": "delete", "id": 2},
+        {"op": "add", "section": "project", "fact": "Deploys on Fridays"},
+        {"op": "add", "section": "Pets", "fact": "Has a cat"},
+        {"op": "add", "section": "User", "fact": "uses  OAUTH2"},  # duplicate -> reinforce
+        {"op": "delete", "id": 2},  # already gone
+        {"op": "delete", "id": 0},
+        {"op": "explode"},
+    ])
+    assert counts == {"add": 2, "update": 1, "delete": 1, "reinforce": 1, "evicted": 0}
+    assert store.read_long_term() == (
+        "# Memory\n\n## User\n- Lives in Munich\n\n## Project\nThe API service.\n- Uses OAuth2\n"
+        "- Deploys on Fridays\n\n## Pets\n- Has a cat\n"
+    )
+
+
+def test_budget_evicts_least_recently_reinforced(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(MemoryStore, "MAX_CHARS", 100)
+    store = MemoryStore(tmp_path)
+    store.apply_ops([{"op": "add", "section": "Facts", "fact": f"fact number {i} " + "x" * 10}
+                     for i in range(3)], now=100)
+    store.apply_ops([{"op": "reinforce", "id": 1}], now=200)
+    counts = store.apply_ops([{"op": "add", "section": "Facts", "fact": "brand new fact " + "y" * 10}], now=300)
+
+    assert counts["evicted"] >= 1
+    memory = store.read_long_term()
+    assert len(memory) <= 100
+    # fact 0 was reinforced later than facts 1 and 2, so they go first
+    assert "fact number 0" in memory and "brand new fact" in memory and "fact number 1" not in memory
+    assert "fact number 1" in store.history_file.read_text()
+
+
+def test_upgrade_keeps_an_oversized_memory_file(tmp_path: Path) -> None:
+    # A MEMORY.md written before the size limit existed, with no reinforcement times
+    facts = "\n".join(f"- Old fact number {i} " + "z" * 60 for i in range(200))
+    store = MemoryStore(tmp_path, max_chars=8000)
+    store.write_long_term(f"# Memory\n\n## Core\n- Name is Ada\n\n## Notes\n{facts}\n")
+    size = len(store.read_long_term())
+    assert size > 15000
+
+    # The first consolidation after the upgrade evicts nothing
+    counts = store.apply_ops([{"op": "add", "section": "Notes", "fact": "Likes tea"}], now=1000)
+    assert counts["evicted"] == 0 and "Old fact number 0 " in store.read_long_term()
+
+    # Later additions only push out as much as they add, oldest (earliest) first
+    batch = [{"op": "add", "section": "Notes", "fact": f"New fact {i} " + "n" * 60} for i in range(3)]
+    counts = store.apply_ops(batch, now=2000)
+    memory = store.read_long_term()
+    assert counts["evicted"] == 3 and len(memory) <= size + 100
+    assert "Old fact number 0 " not in memory and "Old fact number 3 " in memory
+    assert all(f"New fact {i} " in memory for i in range(3)) and "Likes tea" in memory
+    assert "- Name is Ada" in memory
+
+
+def test_eviction_spares_the_current_batch_and_pinned_sections(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path, max_chars=120)
+    store.write_long_term("## Core\n- " + "c" * 80 + "\n")
+    store.apply_ops([], now=0)
+    counts = store.apply_ops([{"op": "add", "section": "Notes", "fact": f"fact {i} " + "x" * 30}
+                              for i in range(3)], now=100)
+    memory = store.read_long_term()
+    assert counts["evicted"] == 0 and memory.count("fact ") == 3 and "c" * 80 in memory
+
+    counts = store.apply_ops([{"op": "add", "section": "Notes", "fact": "fact 3"}], now=200)
+    memory = store.read_long_term()
+    # Over the limit since the last batch: only the new fact's size is made up for
+    assert counts["evicted"] == 1 and "fact 0 " not in memory and "fact 3" in memory and "c" * 80 in memory
+
+    assert MemoryStore(tmp_path, max_chars=0).apply_ops(
+        [{"op": "add", "fact": "y" * 500}], now=300)["evicted"] == 0
+
+
+def test_ops_target_the_facts_shown_in_the_prompt(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path)
+    store.write_long_term("## Notes\n- Likes tea\n- Lives in Paris\n- Prefers dark mode\n")
+    snapshot = store.facts()
+    ids = {fact_id: text for fact_id, _, text in snapshot}
+
+    # The agent edits MEMORY.md while the consolidation prompt is in flight
+    store.write_long_term("## Notes\n- Has a cat\n- Likes tea\n- Lives in Paris\n- Prefers dark mode in the editor\n")
+    counts = store.apply_ops([
+        {"op": "delete", "id": 2},
+        {"op": "update", "id": 3, "fact": "Prefers light mode"},  # changed since the prompt -> skipped
+        {"op": "reinforce", "id": 9},
+    ], ids=ids)
+
+    assert counts["delete"] == 1 and counts["update"] == 0 and counts["reinforce"] == 0
+    assert store.read_long_term() == "## Notes\n- Has a cat\n- Likes tea\n- Prefers dark mode in the editor\n"
@@ -0,0 +1,53 @@
+from pathlib import Path
+
+from nanobot.agent.context import ContextBuilder
+from nanobot.agent.memory import MemoryStore
+
+
+def _memory(n: int) -> str:
+    lines = ["# Memory", "", "## Core", "- The user's name is Mika", ""]
+    for i in range(n):
+        lines += [f"## Topic {i}", f"- Fact about subject{i} " + "detail " * 20, ""]
+    lines += ["## Garden", "- The tomatoes are planted along the south fence", ""]
+    return "\n".join(lines)
+
+
+def test_small_memory_is_included_whole(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path)
+    store.write_long_term(_memory(2))
+    assert store.get_memory_context(budget_tokens=5000) == f"## Long-term Memory\n{_memory(2)}"
+    assert store.get_relevant_memory("tomatoes", budget_tokens=5000) == ""
+
+
+def test_large_memory_is_retrieved_within_budget(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path)
+    store.write_long_term(_memory(100))
+    core = store.get_memory_context(budget_tokens=200)
+    assert "The user's name is Mika" in core and "tomatoes" not in core  # pinned core only
+
+    relevant = store.get_relevant_memory("how are my tomatoes doing?", budget_tokens=200)
+    assert "## Garden\n- The tomatoes are planted" in relevant
+    assert "subject5 " not in relevant and "Mika" not in relevant
+    assert "Showing 1 of 103 memory entries" in relevant
+
+    # The index is reused until the file changes
+    index = store._index
+    store.get_relevant_memory("subject7", budget_tokens=200)
+    assert store._index is index
+    store.write_long_term(_memory(100) + "\n## Cars\n- Drives a red bike\n")
+    assert "red bike" in store.get_relevant_memory("bike", budget_tokens=200)
+    assert store._index is not index
+
+
+def test_retrieved_memory_goes_with_the_current_message(tmp_path: Path) -> None:
+    MemoryStore(tmp_path).write_long_term(_memory(100))
+    builder = ContextBuilder(tmp_path, memory_budget=300)
+    first = builder.build_messages([], "hi", memory_query="subject42")
+    second = builder.build_messages([], "hi", memory_query="tomatoes")
+
+    # The system prompt stays the same from turn to turn
+    assert first[0] == second[0] and "Mika" in first[0]["content"] and "subject42" not in first[0]["content"]
+    assert "subject42" in first[-1]["content"] and "subject43 " not in first[-1]["content"]
+    assert "tomatoes" in second[-1]["content"] and second[-1]["content"].endswith("\n\nhi")
+    # Without a budget the whole file is in the system prompt, as before
+    assert "subject43 " in ContextBuilder(tmp_path).build_system_prompt()
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from nanobot.agent.skills import SkillsLoader
+from nanobot.agent.tools.plugin import load_plugin_tools
+
+WORKER = r'''
+import asyncio, json, os, sys
+
+async def handle(req, writer):
+    args = req["params"]["arguments"]
+    if args.get("crash"):
+        os._exit(3)
+    await asyncio.sleep(args.get("delay", 0))
+    if args.get("fail"):
+        resp = {"jsonrpc": "2.0", "id": req["id"], "error": {"code": -32000, "message": "boom"}}
+    else:
+        resp = {"jsonrpc": "2.0", "id": req["id"], "result": f"{os.getpid()}:{args.get('text', '')}"}
+    writer.write(json.dumps(resp) + "\n")
+    writer.flush()
+
+async def main():
+    loop = asyncio.get_running_loop()
+    tasks = set()
+    while line := await loop.run_in_executor(None, sys.stdin.readline):
+        task = asyncio.create_task(handle(json.loads(line), sys.stdout))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+asyncio.run(main())
+'''
+
+
+def _spec(tmp_path: Path, **extra) -> dict:
+    script = tmp_path / "worker.py"
+    script.write_text(WORKER)
+    return {
+        "name": "echo",
+        "command": [sys.executable, str(script)],
+        "tools": [{"name": "echo", "description": "Echo text",
+                   "parameters": {"type": "object", "properties": {"text": {"type": "string"}}}}],
+        **extra,
+    }
+
+
+async def test_lazy_start_and_concurrent_calls(tmp_path: Path) -> None:
+    [tool] = load_plugin_tools(_spec(tmp_path))
+    assert not tool.worker.running
+    try:
+        # Slow call first: responses are matched by id, not by order
+        slow, fast = await asyncio.gather(
+            tool.execute(text="slow", delay=0.5),
+            tool.execute(text="fast"),
+        )
+        pid = slow.split(":")[0]
+        assert slow == f"{pid}:slow" and fast == f"{pid}:fast"
+        assert tool.worker.running
+        assert await tool.execute(text="again") == f"{pid}:again"
+
+        assert await tool.execute(fail=True) == "Error: boom"
+    finally:
+        await tool.worker.close()
+
+
+async def test_crashed_worker_is_restarted(tmp_path: Path) -> None:
+    [tool] = load_plugin_tools(_spec(tmp_path))
+    try:
+        first = (await tool.execute(text="x")).split(":")[0]
+        assert await tool.execute(crash=True) == "Error: plugin echo exited with code 3"
+        second = (await tool.execute(text="y")).split(":")[0]
+        assert second != first
+    finally:
+        await tool.worker.close()
+
+
+async def test_call_timeout(tmp_path: Path) -> None:
+    [tool] = load_plugin_tools(_spec(tmp_path, timeout=0.2))
+    try:
+        assert await tool.execute(delay=5) == "Error: echo timed out after 0.2 seconds"
+    finally:
+        await tool.worker.close()
+
+
+def test_skill_metadata_plugins(tmp_path: Path) -> None:
+    skill = tmp_path / "skills" / "echoer"
+    skill.mkdir(parents=True)
+    meta = {"nanobot": {"plugins": [{"name": "echo", "command": ["python", "worker.py"],
+                                     "tools": [{"name": "echo", "description": "Echo"}]}]}}
+    (skill / "SKILL.md").write_text(
+        f"---\nname: echoer\ndescription: Echo things\nmetadata: {json.dumps(meta)}\n---\n\n# Echo\n"
+    )
+
+    [(spec, base_dir)] = SkillsLoader(tmp_path, builtin_skills_dir=tmp_path / "none").get_plugins()
+    [tool] = load_plugin_tools(spec, base_dir)
+    assert tool.name == "echo"
+    assert tool.worker.cwd == str(skill)
+    assert tool.to_schema()["function"]["parameters"] == {"type": "object", "properties": {}}
+
+
+async def test_config_plugins_run_from_the_workspace(tmp_path: Path) -> None:
+    from nanobot.agent.loop import AgentLoop
+    from nanobot.bus.queue import MessageBus
+    from nanobot.config.schema import PluginConfig
+    from nanobot.providers.base import LLMProvider
+
+    class NoProvider(LLMProvider):
+        async def chat(self, *args, **kwargs):
+            raise AssertionError("not called")
+
+        def get_default_model(self) -> str:
+            return "test-model"
+
+    plugins = [PluginConfig(**_spec(tmp_path)), PluginConfig(**_spec(tmp_path, name="sub", cwd="tools"))]
+    plugins[1].tools[0]["name"] = "echo_sub"
+    loop = AgentLoop(MessageBus(), NoProvider(), tmp_path / "ws", plugin_configs=plugins)
+    workers = loop._plugin_workers
+    assert [w.cwd for w in workers] == [str(tmp_path / "ws"), str(tmp_path / "ws" / "tools")]
+
+    # close_now stops started workers without awaiting, as the SIGINT handler needs
+    assert (await loop.tools.execute("echo", {"text": "hi"})).endswith(":hi")
+    proc = workers[0]._proc
+    loop.close_now()
+    assert await asyncio.wait_for(proc.wait(), timeout=5) is not None and not workers[0].running
+    await loop.close()
@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+
+from nanobot.agent.context import ContextBuilder
+from nanobot.agent.tools.filesystem import ListDirTool, ReadFileTool
+from nanobot.agent.tools.registry import ToolRegistry
+from nanobot.agent.tools.search import GlobTool
+from nanobot.providers.litellm_provider import LiteLLMProvider
+
+
+def test_system_prompt_is_stable_and_time_goes_in_user_message(tmp_path: Path, monkeypatch) -> None:
+    builder = ContextBuilder(tmp_path)
+    builder.memory.write_long_term("User likes tea.")
+    first = builder.build_messages(history=[], current_message="hi")
+
+    monkeypatch.setattr(ContextBuilder, "_get_runtime_context", staticmethod(lambda: "[Current time: later]"))
+    second = builder.build_messages(history=[], current_message="hi")
+
+    assert first[0] == second[0]
+    system = first[0]["content"]
+    assert "Current Time" not in system
+    # Memory comes after the stable parts
+    assert system.index("# nanobot") < system.index("# Skills") < system.index("User likes tea.")
+    assert first[-1]["content"].startswith("[Current time: ") and first[-1]["content"].endswith("\n\nhi")
+    assert second[-1]["content"] == "[Current time: later]\n\nhi"
+
+
+def test_tool_definitions_are_canonical(tmp_path: Path) -> None:
+    a, b = ToolRegistry(), ToolRegistry()
+    tools = [ReadFileTool(), ListDirTool(), GlobTool(workspace=tmp_path)]
+    for tool in tools:
+        a.register(tool)
+    for tool in reversed(tools):
+        b.register(tool)
+    assert json.dumps(a.get_definitions()) == json.dumps(b.get_definitions())
+    assert [d["function"]["name"] for d in a.get_definitions()] == ["glob", "list_dir", "read_file"]
+    assert list(a.get_definitions()[0]) == ["function", "type"]
+
+
+def test_cache_control_breakpoints() -> None:
+    messages = [
+        {"role": "system", "content": "system prompt"},
+        {"role": "user", "content": "earlier"},
+        {"role": "assistant", "tool_calls": [{"id": "1"}]},
+        {"role": "tool", "tool_call_id": "1", "name": "x", "content": "result"},
+        {"role": "assistant", "tool_calls": [{"id": "2"}]},
+    ]
+    original = json.dumps(messages)
+    assert LiteLLMProvider._supports_cache_control("openrouter/anthropic/claude-3-5-sonnet")
+    assert not LiteLLMProvider._supports_cache_control("ollama/llama3.2")
+
+    out = LiteLLMProvider._with_cache_control(messages)
+    assert json.dumps(messages) == original  # input untouched
+    assert out[0]["content"] == [{"type": "text", "text": "system prompt", "cache_control": {"type": "ephemeral"}}]
+    assert out[3]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    assert out[1] is messages[1] and out[4] is messages[4]
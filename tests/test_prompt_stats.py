@@ -0,0 +1,75 @@
+from pathlib import Path
+from unittest.mock import patch
+
+from typer.testing import CliRunner
+
+from nanobot.agent.loop import AgentLoop
+from nanobot.agent.stats import PromptStatsLog, summarize
+from nanobot.bus.queue import MessageBus
+from nanobot.cli.commands import app
+from nanobot.config.schema import Config
+from nanobot.providers.base import LLMProvider, LLMResponse, ToolCallRequest
+
+
+class ScriptedProvider(LLMProvider):
+    """Calls list_dir once, then answers."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+
+    async def chat(self, messages, tools=None, model=None, max_tokens=4096, temperature=0.7) -> LLMResponse:
+        self.calls += 1
+        usage = {"prompt_tokens": 1000 * self.calls, "completion_tokens": 10, "total_tokens": 1000 * self.calls + 10}
+        if self.calls == 1:
+            return LLMResponse(content=None, usage=usage,
+                               tool_calls=[ToolCallRequest(id="c1", name="list_dir", arguments={"path": "."})])
+        return LLMResponse(content="done", usage=usage)
+
+    def get_default_model(self) -> str:
+        return "test-model"
+
+
+async def test_loop_records_section_sizes_per_call(tmp_path: Path) -> None:
+    (tmp_path / "AGENTS.md").write_text("Be brief. " * 50)
+    loop = AgentLoop(MessageBus(), ScriptedProvider(), tmp_path, context_window=100_000)
+    assert await loop.process_direct("hello", session_key="cli:test") == "done"
+    await loop.close()
+
+    records = PromptStatsLog(tmp_path).read()
+    assert [r["iteration"] for r in records] == [1, 2]
+    first, second = (r["sections"] for r in records)
+    assert first["bootstrap:AGENTS.md"][1] == len("## AGENTS.md\n\n" + "Be brief. " * 50)
+    assert {"identity", "skills_summary", "current_message", "tool_definitions"} <= set(first)
+    assert "tool:list_dir" not in first
+    assert second["tool:list_dir"][0] > 0 and second["assistant"][0] > 0
+    assert records[1]["usage"]["prompt_tokens"] == 2000
+    assert records[0]["session"] == "cli:test"
+
+    rows = {row["section"]: row for row in summarize(records)}
+    assert rows["tool:list_dir"]["calls"] == 1
+    assert rows["usage:prompt_tokens"]["max"] == 2000
+    assert abs(sum(r["share"] for r in rows.values() if r["share"] is not None) - 1) < 1e-9
+
+
+def test_log_rotation_and_read(tmp_path: Path, monkeypatch) -> None:
+    log = PromptStatsLog(tmp_path)
+    monkeypatch.setattr(PromptStatsLog, "MAX_BYTES", 200)
+    for i in range(15):
+        log.append({"iteration": i, "sections": {"x": [i, i]}})
+    assert log.path.with_suffix(".jsonl.1").exists()
+    assert [r["iteration"] for r in log.read(limit=7)] == [8, 9, 10, 11, 12, 13, 14]
+    assert len(log.read(limit=100)) < 15  # only the current and one rotated file are kept
+
+
+def test_stats_prompt_command(tmp_path: Path) -> None:
+    config = Config()
+    config.agents.defaults.workspace = str(tmp_path)
+    with patch("nanobot.config.loader.load_config", return_value=config):
+        result = CliRunner().invoke(app, ["stats", "prompt"])
+        assert "No prompt statistics" in result.stdout
+
+        PromptStatsLog(tmp_path).append({"session": "a", "sections": {"memory": [120, 480]}, "usage": {}})
+        result = CliRunner().invoke(app, ["stats", "prompt"])
+    assert result.exit_code == 0
+    assert "memory" in result.stdout and "120" in result.stdout
@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+
+from nanobot.agent.tools import data
+from nanobot.agent.tools.data import QueryDataTool, _parse_path
+
+
+def test_parse_path() -> None:
+    assert _parse_path("$.data.items[*].id") == ["data", "items", "*", "id"]
+    assert _parse_path("a['x y'][0]") == ["a", "x y", 0]
+
+
+async def test_json_root_streaming_with_small_chunks(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(data, "_CHUNK", 7)  # force values to straddle buffer refills
+    path = tmp_path / "doc.json"
+    items = [{"id": i, "price": i * 1000.5, "name": f"名前{i}"} for i in range(50)]
+    path.write_text(json.dumps({"meta": {"n": 50}, "data": {"items": items}}, ensure_ascii=False))
+
+    tool = QueryDataTool()
+    result = await tool.execute(path=str(path), op="count", root="$.data.items")
+    assert result == "count: 50"
+
+    result = await tool.execute(path=str(path), op="head", root="data.items",
+                                select=["id", "name"], where=["price >= 48000"])
+    assert result.splitlines() == ['{"id": 48, "name": "名前48"}', '{"id": 49, "name": "名前49"}']
+
+    result = await tool.execute(path=str(path))
+    assert "data.items[*].price: number, range 0..49024.5" in result
+
+
+async def test_jsonl_aggregate_group_by(tmp_path: Path) -> None:
+    path = tmp_path / "events.jsonl"
+    rows = [{"kind": "a", "ms": 10}, {"kind": "b", "ms": 5}, {"kind": "a", "ms": 30}]
+    path.write_text("\n".join(json.dumps(r) for r in rows) + "\nnot json\n")
+
+    result = await QueryDataTool().execute(
+        path=str(path), op="aggregate", group_by="kind", aggregates=["count", "avg:ms", "max:ms"],
+    )
+    lines = result.splitlines()
+    assert lines[0] == '"a": {"count": 2, "avg:ms": 20.0, "max:ms": 30}'
+    assert lines[1] == '"b": {"count": 1, "avg:ms": 5.0, "max:ms": 5}'
+    assert "skipped 1 unparseable lines" in lines[-1]
+
+
+async def test_csv_schema_and_budget(tmp_path: Path) -> None:
+    path = tmp_path / "table.csv"
+    path.write_text("city,pop\n" + "".join(f"city{i},{i * 100}\n" for i in range(1000)))
+
+    tool = QueryDataTool()
+    schema = await tool.execute(path=str(path))
+    assert "records: 1000" in schema
+    assert "pop: string, range 0..99900" in schema
+
+    result = await tool.execute(path=str(path), op="head", limit=1000, max_chars=300)
+    assert len(result) <= 300
+    assert "more rows over the 300-char budget" in result
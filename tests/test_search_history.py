@@ -0,0 +1,74 @@
+import json
+from pathlib import Path
+
+from nanobot.agent.memory import MemoryStore
+from nanobot.agent.tools.history import SearchHistoryTool
+from nanobot.utils.bm25 import tokenize
+
+
+def _store(tmp_path: Path) -> MemoryStore:
+    store = MemoryStore(tmp_path)
+    for day in range(1, 21):
+        store.append_history(f"[2025-03-{day:02d} 10:00] Routine check-in number {day}, nothing special.")
+    store.append_history("[2025-03-21 09:00] User booked a flight to Lisbon for the conference.")
+    store.append_history("[2025-04-02 18:30] Discussed the Lisbon hotel and dinner plans.")
+    return store
+
+
+async def test_ranks_matches_and_filters_by_date(tmp_path: Path) -> None:
+    _store(tmp_path)
+    tool = SearchHistoryTool(tmp_path)
+
+    result = await tool.execute(query="Lisbon flight")
+    header, first = result.split("\n", 2)[:2]
+    assert "matches=2" in header and "entries=22" in header
+    assert first.startswith("[2025-03-21") and "Routine" not in result
+
+    result = await tool.execute(query="lisbon", since="2025-04-01")
+    assert "matches=1" in result and "hotel" in result and "flight" not in result
+
+    result = await tool.execute(query="lisbon", until="2025-03-31")
+    assert "flight" in result and "hotel" not in result
+
+    assert (await tool.execute(query="lisbon", since="March")).startswith("Error:")
+    assert "matches=0" in await tool.execute(query="zanzibar")
+
+
+async def test_empty_query_lists_recent_entries_under_budget(tmp_path: Path) -> None:
+    _store(tmp_path)
+    tool = SearchHistoryTool(tmp_path)
+
+    result = await tool.execute(limit=2)
+    lines = result.split("\n\n")
+    assert "shown=2" in result
+    assert "hotel" in lines[0] and "flight" in lines[1]
+
+    result = await tool.execute(query="routine", limit=20, max_chars=200)
+    assert "matches=20" in result and "shown=3" in result
+    assert len(result.split("\n", 1)[1]) <= 250
+
+
+async def test_index_is_incremental_and_rebuilt_on_rewrite(tmp_path: Path) -> None:
+    store = _store(tmp_path)
+    tool = SearchHistoryTool(tmp_path)
+    await tool.execute(query="lisbon")
+    index_file = tmp_path / "memory" / ".history_index.json"
+    saved = json.loads(index_file.read_text())
+    assert saved["offset"] == store.history_file.stat().st_size and len(saved["entries"]) == 22
+
+    # Appended entries are picked up, including by a fresh tool reading the saved index
+    store.append_history("[2025-04-03 08:00] Lisbon trip cancelled.\n\nRefund requested from the airline.")
+    with open(store.history_file, "a", encoding="utf-8") as f:
+        f.write("[2025-04-04 08:00] Partially written")
+    result = await SearchHistoryTool(tmp_path).execute(query="refund airline")
+    assert "entries=23" in result and "cancelled" in result and "Partially" not in result
+
+    # A rewritten file is reindexed from scratch
+    store.history_file.write_text("[2025-05-01 12:00] Only entry about Porto.\n\n", encoding="utf-8")
+    result = await tool.execute(query="porto")
+    assert "entries=1" in result and "Porto" in result
+    assert "matches=0" in await tool.execute(query="lisbon")
+
+
+def test_tokenize_splits_cjk_into_bigrams() -> None:
+    assert tokenize("东京塔 trips") == ["东京", "京塔", "trip"]
@@ -0,0 +1,113 @@
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from nanobot.session.manager import Session, SessionManager
+from nanobot.session.store import (
+    JsonlSessionStore,
+    SqliteSessionStore,
+    create_session_store,
+    migrate_sessions,
+)
+
+
+def _session(key: str, n: int) -> Session:
+    session = Session(key=key)
+    for i in range(n):
+        session.add_message("user" if i % 2 == 0 else "assistant", f"message {i}")
+    return session
+
+
+def test_sqlite_roundtrip_appends_and_rewrites(tmp_path: Path) -> None:
+    store = SqliteSessionStore(tmp_path / "sessions.db")
+    manager = SessionManager(tmp_path, store=store)
+    session = manager.get_or_create("telegram:42")
+    assert session.source is None
+    for i in range(4):
+        session.add_message("user", f"message {i}", tools_used=["exec"] if i == 3 else None)
+    session.metadata["title"] = "Chat"
+    session.last_consolidated = 2
+    manager.save(session)
+
+    session.add_message("assistant", "one more")
+    manager.save(session)
+    store.close()
+
+    store = SqliteSessionStore(tmp_path / "sessions.db")
+    loaded = SessionManager(tmp_path, store=store).get_or_create("telegram:42")
+    assert [m["content"] for m in loaded.messages] == [f"message {i}" for i in range(4)] + ["one more"]
+    assert loaded.messages[3]["tools_used"] == ["exec"]
+    assert loaded.metadata == {"title": "Chat"} and loaded.last_consolidated == 2
+
+    # Range reads for the tail window
+    assert [m["content"] for m in store.read_messages("telegram:42", -2)] == ["message 3", "one more"]
+    assert [m["content"] for m in store.read_messages("telegram:42", 1, 3)] == ["message 1", "message 2"]
+    assert store.read_messages("missing") == []
+
+    # Clearing and refilling past the old length replaces the stored messages
+    loaded.clear()
+    for i in range(7):
+        loaded.add_message("user", f"new {i}")
+    store.save(loaded)
+    assert [m["content"] for m in store.read_messages("telegram:42")] == [f"new {i}" for i in range(7)]
+
+    # A different Session object for the same key is not mistaken for an append
+    replacement = _session("telegram:42", 9)
+    store.save(replacement)
+    assert [m["content"] for m in store.read_messages("telegram:42", 0, 2)] == ["message 0", "message 1"]
+    assert len(store.read_messages("telegram:42")) == 9
+    assert store.list_sessions()[0]["key"] == "telegram:42"
+    store.close()
+
+
+def test_sqlite_uses_wal_and_indexed_rows(tmp_path: Path) -> None:
+    store = SqliteSessionStore(tmp_path / "sessions.db")
+    store.save(_session("cli:a", 3))
+    store.close()
+
+    conn = sqlite3.connect(tmp_path / "sessions.db")
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("SELECT seq FROM messages WHERE key = 'cli:a' ORDER BY seq").fetchall() == [(0,), (1,), (2,)]
+    conn.close()
+
+
+def test_migrate_imports_jsonl_sessions(tmp_path: Path) -> None:
+    jsonl = create_session_store(tmp_path, "jsonl")
+    jsonl.save(_session("slack:C1", 3))
+    # A file written before the key was recorded in the metadata line
+    legacy = {"_type": "metadata", "created_at": "2025-01-01T00:00:00", "updated_at": "2025-01-02T00:00:00",
+              "metadata": {}, "last_consolidated": 1}
+    lines = [legacy] + [{"role": "user", "content": f"old {i}", "timestamp": "2025-01-01T00:00:00"} for i in range(2)]
+    (tmp_path / "sessions" / "cli_direct.jsonl").write_text("".join(json.dumps(line) + "\n" for line in lines))
+
+    sqlite = create_session_store(tmp_path, "sqlite")
+    # A file whose metadata line is corrupted after listing is skipped, not fatal
+    broken = tmp_path / "sessions" / "cli_broken.jsonl"
+    broken.write_text("{not json\n")
+    listed = jsonl.list_sessions() + [{"key": "cli:broken", "path": str(broken)}]
+    jsonl.list_sessions = lambda: listed
+    assert migrate_sessions(jsonl, sqlite) == (2, 0)
+    del jsonl.list_sessions
+    assert migrate_sessions(jsonl, sqlite) == (0, 2)
+
+    old = sqlite.load("cli:direct")
+    assert [m["content"] for m in old.messages] == ["old 0", "old 1"] and old.last_consolidated == 1
+    assert len(sqlite.load("slack:C1").messages) == 3
+    assert {s["key"] for s in sqlite.list_sessions()} == {"slack:C1", "cli:direct"}
+    sqlite.close()
+
+    with pytest.raises(ValueError):
+        create_session_store(tmp_path, "redis")
+
+
+def test_jsonl_store_remains_the_default(tmp_path: Path) -> None:
+    manager = SessionManager(tmp_path)
+    assert isinstance(manager.store, JsonlSessionStore)
+    session = manager.get_or_create("cli:x")
+    session.add_message("user", "hi")
+    manager.save(session)
+    assert session.source == str(tmp_path / "sessions" / "cli_x.jsonl")
+    assert manager.list_sessions()[0]["key"] == "cli:x"
+    assert manager.store.read_messages("cli:x", -1)[0]["content"] == "hi"
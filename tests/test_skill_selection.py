@@ -0,0 +1,64 @@
+import os
+from pathlib import Path
+
+from nanobot.agent.context import ContextBuilder
+from nanobot.agent.skills import SkillsLoader
+from nanobot.utils.bm25 import BM25, tokenize
+
+
+def _skill(root: Path, name: str, description: str, body: str = "", extra: str = "") -> None:
+    d = root / "skills" / name
+    d.mkdir(parents=True)
+    (d / "SKILL.md").write_text(f"---\nname: {name}\ndescription: {description}\n{extra}---\n\n{body or name + ' body'}\n")
+
+
+def test_bm25_prefers_rare_terms() -> None:
+    docs = [tokenize("weather forecast for a city"), tokenize("github issues and pull requests"),
+            tokenize("create a new skill")]
+    scores = BM25(docs).scores(tokenize("Will it rain? Check the forecast"))
+    assert scores[0] > 0 and scores[1] == scores[2] == 0
+    assert tokenize("What is the Weather?") == ["weather"]
+
+
+def test_rank_uses_triggers_and_refreshes_on_edit(tmp_path: Path) -> None:
+    _skill(tmp_path, "jira", "Manage tickets.", extra="triggers: sprint board, backlog grooming\n")
+    _skill(tmp_path, "calendar", "Manage meetings and events.")
+    loader = SkillsLoader(tmp_path, builtin_skills_dir=tmp_path / "none")
+    assert [n for n, _ in loader.rank_skills("what is left in the sprint?")] == ["jira"]
+    assert loader.rank_skills("hello") == []
+
+    skill_file = tmp_path / "skills" / "calendar" / "SKILL.md"
+    skill_file.write_text(skill_file.read_text().replace("events.", "events.\ntriggers: sprint review\n"))
+    os.utime(skill_file, (1, 1))  # make sure the mtime changes
+    assert {n for n, _ in loader.rank_skills("sprint")} == {"jira", "calendar"}
+
+
+def test_selected_skills_go_with_the_message(tmp_path: Path) -> None:
+    _skill(tmp_path, "jira", "Manage jira tickets and sprints.", body="Use the jira CLI.")
+    _skill(tmp_path, "calendar", "Manage meetings and events.")
+    context = ContextBuilder(tmp_path)
+    context.skills.builtin_skills = tmp_path / "none"
+
+    names = context.select_skills("move my jira ticket to done")
+    assert names == ["jira"]
+    messages = context.build_messages([], "move my jira ticket to done", skill_names=names)
+    assert "Use the jira CLI." in messages[-1]["content"]
+    assert messages[-1]["content"].endswith("move my jira ticket to done")
+
+    # The system prompt does not depend on what was selected
+    other = context.build_messages([], "good morning", skill_names=context.select_skills("good morning"))
+    assert messages[0] == other[0] and messages[0]["content"] == context.build_system_prompt()
+    assert "Use the jira CLI." not in other[-1]["content"]
+
+
+def test_summary_is_trimmed_with_many_skills(tmp_path: Path) -> None:
+    for i in range(ContextBuilder.SUMMARY_ALL_MAX + 3):
+        _skill(tmp_path, f"tool{i}", f"Tool number {i} for topic{i} work.")
+    context = ContextBuilder(tmp_path)
+    context.skills.builtin_skills = tmp_path / "none"
+
+    assert context.build_system_prompt().count("<skill ") == ContextBuilder.SUMMARY_ALL_MAX + 3
+    names = context.select_skills("help with topic3")
+    system, current = context.build_messages([], "help with topic3", skill_names=names)
+    assert system["content"].count("<skill ") == 0 and system["content"] == context.build_system_prompt([])
+    assert current["content"].count("<skill ") == 1 and "<name>tool3</name>" in current["content"]
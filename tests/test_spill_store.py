@@ -0,0 +1,65 @@
+import os
+from pathlib import Path
+
+from nanobot.agent.tools.shell import ExecTool
+from nanobot.agent.tools.spill import ReadOutputTool, SpillStore
+
+
+def test_excerpt_keeps_head_and_tail(tmp_path: Path) -> None:
+    store = SpillStore(tmp_path, threshold=300)
+    text = "".join(f"line {i}\n" for i in range(1000))
+
+    out = store.excerpt(text)
+    assert out.startswith("line 0\n")
+    assert out.rstrip().endswith("line 999")
+    assert "saved as handle" in out
+    assert len(out) < 600
+
+    handle = store.put(text)
+    assert store.get(handle) == text
+    assert len(list(tmp_path.glob("*.txt"))) == 1  # content-addressed, stored once
+
+
+def test_small_output_is_not_stored(tmp_path: Path) -> None:
+    store = SpillStore(tmp_path / "outputs", threshold=100)
+    assert store.excerpt("short") == "short"
+    assert not (tmp_path / "outputs").exists()
+
+
+def test_eviction_drops_least_recently_used(tmp_path: Path) -> None:
+    store = SpillStore(tmp_path, max_bytes=2500)
+    first = store.put("a" * 1000)
+    second = store.put("b" * 1000)
+    os.utime(tmp_path / f"{first}.txt", (1, 1))
+    os.utime(tmp_path / f"{second}.txt", (2, 2))
+    store.get(first)  # refresh first
+
+    store.put("c" * 1000)
+    assert store.get(first) is not None
+    assert store.get(second) is None
+
+
+async def test_read_output_pages(tmp_path: Path) -> None:
+    store = SpillStore(tmp_path)
+    handle = store.put("0123456789")
+    tool = ReadOutputTool(store)
+
+    result = await tool.execute(handle=handle, offset=2, limit=3)
+    assert result.startswith("234\n")
+    assert "continue with offset=5" in result
+
+    result = await tool.execute(handle=handle, offset=8)
+    assert result.startswith("89\n") and "end of output" in result
+
+    assert (await tool.execute(handle="0" * 12)).startswith("Error")
+
+
+async def test_exec_spills_long_output(tmp_path: Path) -> None:
+    store = SpillStore(tmp_path / "outputs", threshold=500)
+    tool = ExecTool(working_dir=str(tmp_path), spill=store)
+
+    result = await tool.execute(command="seq 1 5000")
+    assert result.startswith("1\n2\n")
+    assert result.rstrip().endswith("5000")
+    handle = result.split("saved as handle ")[1].split(".")[0]
+    assert store.get(handle).splitlines()[2500] == "2501"
@@ -0,0 +1,62 @@
+import asyncio
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from nanobot.agent.tools.tmux import TmuxTool, strip_ansi
+
+pytestmark = pytest.mark.skipif(not shutil.which("tmux"), reason="tmux not installed")
+
+
+@pytest.fixture
+def tmux(tmp_path: Path):
+    socket = str(tmp_path / "t.sock")
+    subprocess.run(["tmux", "-S", socket, "new-session", "-d", "-s", "t", "-x", "120", "-y", "30", "sh"],
+                   check=True)
+    yield TmuxTool(socket=socket)
+    subprocess.run(["tmux", "-S", socket, "kill-server"], check=False)
+
+
+def test_strip_ansi() -> None:
+    assert strip_ansi("\x1b[1;32mok\x1b[0m\r\n\x1b]0;title\x07$ ") == "ok\n$ "
+
+
+async def test_send_keys_and_wait_for_new_output(tmux: TmuxTool) -> None:
+    result = await tmux.execute(action="send_keys", target="t", keys="sleep 0.3; echo DONE-$((40+2))")
+    assert result == "Sent to t"
+
+    # The typed command is not new output yet matches only the computed value
+    result = await tmux.execute(action="wait_for", target="t", pattern=r"DONE-\d+", new_only=True, timeout=10)
+    assert result.startswith("Matched 'DONE-42' after")
+
+    captured = await tmux.execute(action="capture", target="t", lines=50)
+    assert "DONE-42" in captured
+
+
+async def test_wait_for_text_already_on_screen(tmux: TmuxTool) -> None:
+    await tmux.execute(action="send_keys", target="t", keys="echo READY")
+    await tmux.execute(action="wait_for", target="t", pattern="^READY", timeout=10)
+    result = await tmux.execute(action="wait_for", target="t", pattern="READY", fixed=True, timeout=1)
+    assert result.startswith("Matched 'READY' after 0.")
+
+
+async def test_wait_for_timeout_and_errors(tmux: TmuxTool) -> None:
+    start = asyncio.get_running_loop().time()
+    result = await tmux.execute(action="wait_for", target="t", pattern="never", new_only=True, timeout=0.5)
+    assert result.startswith("Error: Timed out after 0.5s")
+    assert asyncio.get_running_loop().time() - start < 3
+
+    assert (await tmux.execute(action="capture", target="missing")).startswith("Error:")
+    assert (await tmux.execute(action="wait_for", target="t", pattern="(")).startswith("Error: Invalid pattern")
+
+
+async def test_send_keys_goes_through_the_exec_guard(tmp_path: Path) -> None:
+    from nanobot.agent.tools.shell import ExecTool
+
+    exec_tool = ExecTool(working_dir=str(tmp_path), restrict_to_workspace=True)
+    tool = TmuxTool(socket=str(tmp_path / "none.sock"), guard=exec_tool.check_command)
+    assert "safety guard" in await tool.execute(action="send_keys", target="t", keys="rm -rf ~")
+    assert "path outside working dir" in await tool.execute(action="send_keys", target="t", keys="cat /etc/passwd")
+    assert (await tool.execute(action="send_keys", target="t", keys="", enter=False)).startswith("Error: send_keys needs")
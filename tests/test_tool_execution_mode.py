@@ -0,0 +1,124 @@
+import asyncio
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from nanobot.agent.tools.base import Tool
+from nanobot.agent.tools.data import QueryDataTool
+from nanobot.agent.tools.registry import ToolRegistry
+
+
+class WhereTool(Tool):
+    """Reports the process and thread it ran in."""
+
+    execution_mode = "inline"
+
+    @property
+    def name(self) -> str:
+        return f"where_{self.execution_mode}"
+
+    @property
+    def description(self) -> str:
+        return "where am I"
+
+    @property
+    def parameters(self) -> dict[str, Any]:
+        return {"type": "object", "properties": {"sleep": {"type": "number"}, "blob": {"type": "string"}}}
+
+    async def execute(self, sleep: float = 0, blob: str = "", **kwargs: Any) -> str:
+        if blob == "ignore_alarm":
+            import signal
+            signal.signal(signal.SIGALRM, signal.SIG_IGN)
+        if sleep:
+            import time
+            try:
+                time.sleep(sleep)
+            except Exception as e:  # like most tools, which report their own errors
+                return f"Error: {e}"
+        return f"{os.getpid()}:{threading.get_ident()}"
+
+
+class ThreadWhere(WhereTool):
+    execution_mode = "thread"
+
+
+class ProcessWhere(WhereTool):
+    execution_mode = "process"
+
+
+@pytest.fixture
+def reg():
+    reg = ToolRegistry(max_workers=1, process_timeout=10, max_process_arg_bytes=10_000)
+    for cls in (WhereTool, ThreadWhere, ProcessWhere):
+        reg.register(cls())
+    yield reg
+    reg.close()
+
+
+async def test_dispatch_by_execution_mode(reg: ToolRegistry) -> None:
+    here = f"{os.getpid()}:{threading.get_ident()}"
+    assert await reg.execute("where_inline", {}) == here
+
+    pid, tid = (await reg.execute("where_thread", {})).split(":")
+    assert int(pid) == os.getpid() and int(tid) != threading.get_ident()
+
+    pid, _ = (await reg.execute("where_process", {})).split(":")
+    assert int(pid) != os.getpid()
+    # The pool stays warm: the next call lands in the same worker
+    assert (await reg.execute("where_process", {})).split(":")[0] == pid
+
+
+async def test_thread_mode_keeps_loop_responsive(reg: ToolRegistry) -> None:
+    ticks = 0
+
+    async def ticker() -> None:
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    await reg.execute("where_thread", {"sleep": 0.3})
+    task.cancel()
+    assert ticks >= 5
+
+
+async def test_process_argument_size_limit(reg: ToolRegistry) -> None:
+    result = await reg.execute("where_process", {"blob": "x" * 20_000})
+    assert result.startswith("Error: Arguments for where_process are too large")
+
+
+async def test_process_timeout_interrupts_the_call(reg: ToolRegistry) -> None:
+    pid, _ = (await reg.execute("where_process", {})).split(":")
+    reg.process_timeout = 0.5
+    assert (await reg.execute("where_process", {"sleep": 30})) == "Error: where_process timed out after 0.5 seconds"
+    reg.process_timeout = 10
+    # The worker survived the timeout and takes the next call
+    assert (await reg.execute("where_process", {})).split(":")[0] == pid
+
+
+async def test_uninterruptible_call_moves_to_a_new_pool(reg: ToolRegistry, monkeypatch) -> None:
+    monkeypatch.setattr(ToolRegistry, "PROCESS_GRACE", 0)
+    reg.process_timeout = 0.5
+    await reg.execute("where_process", {})
+    old = reg._pool
+    # A worker that does not honour the alarm (like a call blocked in C code)
+    assert (await reg.execute("where_process", {"sleep": 3, "blob": "ignore_alarm"})).startswith("Error:")
+    assert reg._pool is None and old is not None
+    reg.process_timeout = 10
+    assert int((await reg.execute("where_process", {})).split(":")[0]) != os.getpid()
+
+
+async def test_query_data_runs_in_process(tmp_path: Path) -> None:
+    path = tmp_path / "rows.jsonl"
+    path.write_text("".join(f'{{"n": {i}}}\n' for i in range(100)))
+    reg = ToolRegistry(max_workers=1)
+    reg.register(QueryDataTool())
+    try:
+        assert QueryDataTool.execution_mode == "process"
+        assert await reg.execute("query_data", {"path": str(path), "op": "count"}) == "count: 100"
+    finally:
+        reg.close()
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+from nanobot.agent.tools.filesystem import ListDirTool, ReadFileTool, WriteFileTool
+from nanobot.agent.tools.registry import ToolRegistry
+from nanobot.agent.tools.shell import ExecTool
+
+
+class CountingRead(ReadFileTool):
+    calls = 0
+
+    async def execute(self, path: str, **kwargs) -> str:
+        CountingRead.calls += 1
+        return await super().execute(path, **kwargs)
+
+
+def _registry() -> ToolRegistry:
+    CountingRead.calls = 0
+    reg = ToolRegistry()
+    reg.register(CountingRead())
+    reg.register(WriteFileTool())
+    reg.register(ListDirTool())
+    reg.register(ExecTool())
+    return reg
+
+
+async def test_repeat_read_in_same_turn_returns_reference(tmp_path: Path) -> None:
+    f = tmp_path / "a.txt"
+    f.write_text("hello")
+    reg = _registry()
+    reg.begin_turn()
+
+    assert await reg.execute("read_file", {"path": str(f)}) == "hello"
+    again = await reg.execute("read_file", {"path": str(f)})
+    assert again.startswith("(Unchanged since the previous read_file call")
+    assert CountingRead.calls == 1
+
+    # Next turn: the earlier result is no longer in context, so return it in full
+    reg.begin_turn()
+    assert await reg.execute("read_file", {"path": str(f)}) == "hello"
+    assert CountingRead.calls == 1
+
+
+async def test_write_invalidates_file_and_parent_listing(tmp_path: Path) -> None:
+    f = tmp_path / "a.txt"
+    f.write_text("v1")
+    reg = _registry()
+    reg.begin_turn()
+
+    await reg.execute("read_file", {"path": str(f)})
+    listing = await reg.execute("list_dir", {"path": str(tmp_path)})
+    assert listing == "a.txt"
+
+    await reg.execute("write_file", {"path": str(f), "content": "v2"})
+    await reg.execute("write_file", {"path": str(tmp_path / "b.txt"), "content": "x"})
+    assert await reg.execute("read_file", {"path": str(f)}) == "v2"
+    assert await reg.execute("list_dir", {"path": str(tmp_path)}) == "a.txt\nb.txt"
+
+
+async def test_exec_invalidates_file_backed_entries(tmp_path: Path) -> None:
+    f = tmp_path / "a.txt"
+    f.write_text("v1")
+    reg = _registry()
+    reg.begin_turn()
+
+    await reg.execute("read_file", {"path": str(f)})
+    await reg.execute("exec", {"command": "true"})
+    assert await reg.execute("read_file", {"path": str(f)}) == "v1"
+    assert CountingRead.calls == 2
+
+
+async def test_errors_are_not_memoized(tmp_path: Path) -> None:
+    reg = _registry()
+    reg.begin_turn()
+    missing = str(tmp_path / "nope.txt")
+    assert (await reg.execute("read_file", {"path": missing})).startswith("Error")
+    assert (await reg.execute("read_file", {"path": missing})).startswith("Error")
+    assert CountingRead.calls == 2
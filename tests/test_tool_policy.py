@@ -0,0 +1,78 @@
+from typing import Any
+
+from nanobot.agent.tools.base import Tool
+from nanobot.agent.tools.registry import ToolRegistry
+from nanobot.agent.tools.web import WebSearchTool
+
+
+class DummyTool(Tool):
+    def __init__(self, name: str, description: str, bins: tuple[str, ...] = ()):
+        self._name = name
+        self._description = description
+        self.requires_bins = bins
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def description(self) -> str:
+        return self._description
+
+    @property
+    def parameters(self) -> dict[str, Any]:
+        return {"type": "object", "properties": {}}
+
+    async def execute(self, **kwargs: Any) -> str:
+        return f"{self._name} ran"
+
+
+def _names(definitions: list[dict]) -> list[str]:
+    return [d["function"]["name"] for d in definitions]
+
+
+async def test_unavailable_and_disabled_tools_are_hidden(monkeypatch) -> None:
+    monkeypatch.delenv("BRAVE_API_KEY", raising=False)
+    registry = ToolRegistry(disabled=["jira_*"])
+    registry.register(WebSearchTool(api_key=None))
+    registry.register(DummyTool("read_file", "Read a file"))
+    registry.register(DummyTool("jira_create", "Create a jira issue"))
+    registry.register(DummyTool("ffmpeg", "Convert video", bins=("no-such-binary-xyz",)))
+
+    assert _names(registry.get_definitions()) == ["read_file"]
+    assert registry.unavailable()["web_search"] == "BRAVE_API_KEY not configured"
+    assert "disabled" in registry.unavailable()["jira_create"]
+    result = await registry.execute("jira_create", {})
+    assert result.startswith("Error: Tool 'jira_create' is not available")
+
+
+def test_definitions_are_byte_stable_until_availability_changes() -> None:
+    registry = ToolRegistry()
+    search = WebSearchTool(api_key="")
+    registry.register(search)
+    registry.register(DummyTool("read_file", "Read a file"))
+
+    first = registry.get_definitions()
+    registry.refresh_availability()
+    assert registry.get_definitions() is first
+
+    search.api_key = "key"
+    registry.refresh_availability()
+    assert _names(registry.get_definitions()) == ["read_file", "web_search"]
+
+
+def test_select_pins_core_and_ranks_the_rest() -> None:
+    registry = ToolRegistry()
+    for name, description in [
+        ("read_file", "Read a file"), ("exec", "Run a shell command"),
+        ("jira_create", "Create a jira issue"), ("calendar_add", "Add a calendar event"),
+        ("geocode", "Coordinates for an address"),
+    ]:
+        registry.register(DummyTool(name, description))
+
+    assert registry.select("anything", max_tools=0) is None
+    assert registry.select("anything", max_tools=10) is None
+    selected = registry.select("file a jira issue about the login bug", max_tools=3, core=["read_file", "exec"])
+    assert selected == ["exec", "jira_create", "read_file"]
+    assert _names(registry.get_definitions(selected)) == selected
+    assert registry.get_definitions(selected) is registry.get_definitions(list(reversed(selected)))
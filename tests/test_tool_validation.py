@@ -86,3 +86,35 @@ async def test_registry_returns_validation_error() -> None:
     reg.register(SampleTool())
     result = await reg.execute("sample", {"query": "hi"})
     assert "Invalid parameters" in result
+
+
+def test_validate_params_array_of_objects_paths() -> None:
+    class ListTool(SampleTool):
+        @property
+        def parameters(self) -> dict[str, Any]:
+            return {
+                "type": "object",
+                "properties": {
+                    "rows": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {"id": {"type": "integer"}},
+                            "required": ["id"],
+                        },
+                    },
+                },
+            }
+
+    errors = ListTool().validate_params({"rows": [{"id": 1}, {"id": "x"}, {}]})
+    assert errors == ["rows[1].id should be integer", "missing required rows[2].id"]
+
+
+def test_registry_caches_definitions_until_changed() -> None:
+    reg = ToolRegistry()
+    reg.register(SampleTool())
+    first = reg.get_definitions()
+    assert reg.get_definitions() is first
+
+    reg.unregister("sample")
+    assert reg.get_definitions() == []
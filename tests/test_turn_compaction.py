@@ -0,0 +1,76 @@
+from pathlib import Path
+
+from nanobot.agent.compaction import COMPACTED_PREFIX, TurnCompactor
+from nanobot.agent.loop import AgentLoop
+from nanobot.agent.tools.spill import SpillStore
+from nanobot.bus.queue import MessageBus
+from nanobot.providers.base import LLMProvider, LLMResponse, ToolCallRequest
+
+
+def _turn(n_results: int, size: int) -> list[dict]:
+    messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "go"}]
+    for i in range(n_results):
+        messages.append({"role": "assistant", "reasoning_content": "thinking " * 200,
+                         "tool_calls": [{"id": f"c{i}", "type": "function",
+                                         "function": {"name": "read_file", "arguments": "{}"}}]})
+        messages.append({"role": "tool", "tool_call_id": f"c{i}", "name": "read_file",
+                         "content": "\n".join(f"line {i}.{j} " + "x" * 40 for j in range(size))})
+    return messages
+
+
+def test_compacts_oldest_consumed_results_first(tmp_path: Path) -> None:
+    messages = _turn(4, 200)
+    spill = SpillStore(tmp_path)
+    compactor = TurnCompactor(budget_tokens=10**9, spill=spill)
+    full = compactor.prompt_tokens(messages)
+    assert compactor.compact(messages, start=2) == []
+
+    compactor.budget_tokens = full // 2
+    original = [dict(m) for m in messages]
+    saved = compactor.compact(messages, start=2)
+    assert saved and compactor.prompt_tokens(messages) <= full // 2
+
+    # Structure is intact: same roles and tool_call ids, same count
+    assert [(m["role"], m.get("tool_call_id")) for m in messages] == \
+           [(m["role"], m.get("tool_call_id")) for m in original]
+    # The newest result (not yet seen by the model) and the last reasoning block are untouched
+    assert messages[-1] == original[-1]
+    assert messages[-2]["reasoning_content"] == original[-2]["reasoning_content"]
+    # The oldest result is a stub pointing at the full text
+    stub = messages[3]["content"]
+    assert stub.startswith(COMPACTED_PREFIX) and "line 0.0" in stub
+    handle = stub.split('handle="')[1].split('"')[0]
+    assert spill.get(handle) == original[3]["content"]
+    assert "reasoning_content" not in messages[2]
+
+
+async def test_loop_compacts_and_does_not_refer_to_stubbed_results(tmp_path: Path) -> None:
+    big = tmp_path / "big.txt"
+    big.write_text("\n".join(f"row {i} " + "y" * 60 for i in range(400)))
+    prompts: list[list[dict]] = []
+
+    class Reader(LLMProvider):
+        async def chat(self, messages, tools=None, model=None, max_tokens=4096, temperature=0.7):
+            prompts.append([dict(m) for m in messages])
+            n = len(prompts)
+            if n <= 4:
+                # Alternate two files so the repeat read of big.txt happens after compaction
+                path = str(big) if n in (1, 4) else str(tmp_path / f"other{n}.txt")
+                (tmp_path / f"other{n}.txt").write_text("z" * 8000)
+                return LLMResponse(content=None, tool_calls=[
+                    ToolCallRequest(id=f"c{n}", name="read_file", arguments={"path": path})])
+            return LLMResponse(content="done")
+
+        def get_default_model(self) -> str:
+            return "test-model"
+
+    loop = AgentLoop(MessageBus(), Reader(), tmp_path, context_window=100_000, turn_budget=9_000)
+    assert await loop.process_direct("read things") == "done"
+    await loop.close()
+
+    last = prompts[-1]
+    tool_msgs = [m for m in last if m["role"] == "tool"]
+    assert len(tool_msgs) == 4
+    assert tool_msgs[0]["content"].startswith(COMPACTED_PREFIX)
+    # The second read of big.txt returns the content, not a pointer to the stubbed first read
+    assert tool_msgs[3]["content"].startswith("row 0")